@@ -6,7 +6,6 @@ Main Workspace Run Script
 
 # Enable logging
 import logging
-import math
 import os
 import sys
 from subprocess import call
@@ -22,6 +21,17 @@ log = logging.getLogger(__name__)
 
 log.info("Starting...")
 
+ENV_RESOURCES_PATH = os.getenv("RESOURCES_PATH", "/resources")
+ENV_WORKSPACE_HOME = os.getenv("WORKSPACE_HOME", "/workspace")
+
+# Startup timing (startup_trace.py) and resource detection (resource_topology.py)
+sys.path.insert(0, os.path.join(ENV_RESOURCES_PATH, "scripts"))
+import resource_topology
+import startup_trace
+
+entrypoint_start = startup_trace.now()
+startup_trace.reset_trace()
+
 
 def set_env_variable(env_variable: str, value: str, ignore_if_set: bool = False):
     if ignore_if_set and os.getenv(env_variable, None):
@@ -58,40 +68,31 @@ base_url = quote(base_url, safe="/%")
 
 set_env_variable(ENV_NAME_WORKSPACE_BASE_URL, base_url)
 
+# Detect available cpu & memory resources and provide them to the jupyter server and kernels
+threads_start = startup_trace.now()
+
+topology = resource_topology.detect_resource_topology()
+try:
+    resource_topology.write_resource_topology(topology)
+    set_env_variable("RESOURCE_TOPOLOGY_FILE", resource_topology.RESOURCE_TOPOLOGY_FILE)
+except Exception:
+    log.warning("Failed to write resource topology.", exc_info=True)
+
 # Dynamically set MAX_NUM_THREADS
 ENV_MAX_NUM_THREADS = os.getenv("MAX_NUM_THREADS", None)
 if ENV_MAX_NUM_THREADS:
     # Determine the number of availabel CPU resources, but limit to a max number
     if ENV_MAX_NUM_THREADS.lower() == "auto":
-        ENV_MAX_NUM_THREADS = str(math.ceil(os.cpu_count()))
-        try:
-            # read out docker information - if docker limits cpu quota
-            cpu_count = math.ceil(
-                int(
-                    os.popen("cat /sys/fs/cgroup/cpu/cpu.cfs_quota_us")
-                    .read()
-                    .replace("\n", "")
-                )
-                / 100000
-            )
-            if cpu_count > 0 and cpu_count < os.cpu_count():
-                ENV_MAX_NUM_THREADS = str(cpu_count)
-        except:
-            pass
-        if (
-            not ENV_MAX_NUM_THREADS
-            or not ENV_MAX_NUM_THREADS.isnumeric()
-            or ENV_MAX_NUM_THREADS == "0"
-        ):
-            ENV_MAX_NUM_THREADS = "4"
-
-        if int(ENV_MAX_NUM_THREADS) > 8:
-            # there should be atleast one thread less compared to cores
-            ENV_MAX_NUM_THREADS = str(int(ENV_MAX_NUM_THREADS) - 1)
-
-        # set a maximum of 32, in most cases too many threads are adding too much overhead
-        if int(ENV_MAX_NUM_THREADS) > 32:
-            ENV_MAX_NUM_THREADS = "32"
+        # based on cpu quota (cgroup v1 & v2) and cpuset of the container
+        ENV_MAX_NUM_THREADS = str(resource_topology.get_max_num_threads(topology))
+    elif ENV_MAX_NUM_THREADS.lower() == "calibrate":
+        # benchmark candidate thread counts on first start, cached per cpu model and quota
+        import thread_calibration
+
+        ENV_MAX_NUM_THREADS = str(thread_calibration.calibrate_num_threads(topology))
+
+    # the resolved number is available at runtime (e.g. for the thread broker of the Jupyter server)
+    set_env_variable("MAX_NUM_THREADS", ENV_MAX_NUM_THREADS)
 
     # only set if it is not None or empty
     # OMP_NUM_THREADS: Suggested value: vCPUs / 2 in which vCPUs is the number of virtual CPUs.
@@ -123,8 +124,7 @@ if ENV_MAX_NUM_THREADS:
     set_env_variable("TBB_NUM_THREADS", ENV_MAX_NUM_THREADS, ignore_if_set=True)  # TBB
     # GOTO_NUM_THREADS
 
-ENV_RESOURCES_PATH = os.getenv("RESOURCES_PATH", "/resources")
-ENV_WORKSPACE_HOME = os.getenv("WORKSPACE_HOME", "/workspace")
+startup_trace.add_event("configure-threads", threads_start, startup_trace.now())
 
 # pass all script arguments to next script
 script_arguments = " " + " ".join(sys.argv[1:])
@@ -144,6 +144,8 @@ if EXECUTE_CODE:
         )
     )
 
+startup_trace.add_event("docker-entrypoint", entrypoint_start, startup_trace.now())
+
 sys.exit(
     call(
         "python " + ENV_RESOURCES_PATH + "/scripts/run_workspace.py" + script_arguments,
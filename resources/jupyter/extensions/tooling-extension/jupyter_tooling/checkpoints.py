@@ -0,0 +1,227 @@
+"""
+Compressed, deduplicated checkpoint store.
+
+Instead of a full copy in .ipynb_checkpoints next to every file, checkpoints are stored in
+~/.workspace/checkpoints: the raw file is split into content-defined chunks (cut at line
+boundaries, so an edit only changes the chunks around it), every chunk is compressed and stored
+once by its hash, and every checkpoint is a list of chunk hashes. Only the latest checkpoints of
+every file are kept (retention). Chunks are reference counted, so removing a checkpoint only touches
+its own chunks, the full store is swept once per day. Activated via COMPRESSED_CHECKPOINTS in
+jupyter_notebook_config.py.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import time
+import zlib
+from datetime import datetime, timezone
+
+from notebook.services.contents.checkpoints import Checkpoints
+from tornado.web import HTTPError
+from traitlets import Integer, Unicode
+
+HOME = os.getenv("HOME", "/home/ml")
+
+MIN_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+# a chunk ends after a line with a hash divisible by this value (once the minimum size is reached)
+CHUNK_BOUNDARY_DIVISOR = 16
+COMPRESSION_LEVEL = 6
+# the reference counts are rebuilt and unreferenced chunks (e.g. of interrupted saves) are removed
+FULL_SWEEP_INTERVAL = 24 * 60 * 60  # seconds
+
+
+def split_chunks(data: bytes) -> list:
+    """Split data into content-defined chunks at line boundaries."""
+    chunks = []
+    chunk_lines = []
+    chunk_size = 0
+    for line in data.splitlines(keepends=True):
+        chunk_lines.append(line)
+        chunk_size += len(line)
+        if chunk_size >= MAX_CHUNK_SIZE or (
+            chunk_size >= MIN_CHUNK_SIZE and zlib.crc32(line) % CHUNK_BOUNDARY_DIVISOR == 0
+        ):
+            chunks.append(b"".join(chunk_lines))
+            chunk_lines = []
+            chunk_size = 0
+    if chunk_lines:
+        chunks.append(b"".join(chunk_lines))
+    return chunks
+
+
+class CompressedCheckpoints(Checkpoints):
+    """Checkpoints stored as compressed, content-addressed chunks."""
+
+    root_dir = Unicode(
+        os.path.join(HOME, ".workspace", "checkpoints"), config=True, help="Folder of the checkpoint store."
+    )
+
+    retention = Integer(5, config=True, help="Number of checkpoints that are kept per file.")
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # chunk hash -> number of references by checkpoints, built by the full sweep
+        self._chunk_references = None
+        self._last_full_sweep = 0
+
+    def _chunk_path(self, chunk_hash: str) -> str:
+        return os.path.join(self.root_dir, "chunks", chunk_hash[:2], chunk_hash)
+
+    def _index_path(self, path: str) -> str:
+        path_hash = hashlib.sha256(path.strip("/").encode("utf-8")).hexdigest()
+        return os.path.join(self.root_dir, "index", path_hash + ".json")
+
+    def _load_index(self, path: str) -> dict:
+        index_path = self._index_path(path)
+        if not os.path.isfile(index_path):
+            return {"path": path.strip("/"), "checkpoints": []}
+        with open(index_path, "r") as file:
+            return json.load(file)
+
+    def _save_index(self, path: str, index: dict) -> None:
+        index_path = self._index_path(path)
+        if not index["checkpoints"]:
+            if os.path.exists(index_path):
+                os.remove(index_path)
+            return
+
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        temp_file = index_path + ".tmp"
+        with open(temp_file, "w") as file:
+            json.dump(index, file)
+        os.replace(temp_file, index_path)
+
+    def _store_chunks(self, data: bytes) -> list:
+        chunk_hashes = []
+        for chunk in split_chunks(data):
+            chunk_hash = hashlib.sha256(chunk).hexdigest()
+            chunk_path = self._chunk_path(chunk_hash)
+            if not os.path.exists(chunk_path):
+                os.makedirs(os.path.dirname(chunk_path), exist_ok=True)
+                temp_file = chunk_path + ".tmp"
+                with open(temp_file, "wb") as file:
+                    file.write(zlib.compress(chunk, COMPRESSION_LEVEL))
+                os.replace(temp_file, chunk_path)
+            chunk_hashes.append(chunk_hash)
+        return chunk_hashes
+
+    def _read_checkpoint(self, checkpoint_id: str, path: str) -> bytes:
+        for checkpoint in self._load_index(path)["checkpoints"]:
+            if checkpoint["id"] == checkpoint_id:
+                chunks = []
+                for chunk_hash in checkpoint["chunks"]:
+                    with open(self._chunk_path(chunk_hash), "rb") as file:
+                        chunks.append(zlib.decompress(file.read()))
+                return b"".join(chunks)
+        raise HTTPError(404, "Checkpoint does not exist: " + path + "@" + checkpoint_id)
+
+    def _sweep_chunks(self) -> None:
+        """Count the references of all checkpoints and remove all chunks that are not referenced."""
+        chunk_references = collections.Counter()
+        index_folder = os.path.join(self.root_dir, "index")
+        if os.path.isdir(index_folder):
+            for index_file in os.listdir(index_folder):
+                if not index_file.endswith(".json"):
+                    continue
+                with open(os.path.join(index_folder, index_file), "r") as file:
+                    for checkpoint in json.load(file)["checkpoints"]:
+                        chunk_references.update(checkpoint["chunks"])
+
+        chunks_folder = os.path.join(self.root_dir, "chunks")
+        if os.path.isdir(chunks_folder):
+            for prefix in os.listdir(chunks_folder):
+                for chunk_hash in os.listdir(os.path.join(chunks_folder, prefix)):
+                    if chunk_hash not in chunk_references:
+                        os.remove(os.path.join(chunks_folder, prefix, chunk_hash))
+
+        self._chunk_references = chunk_references
+        self._last_full_sweep = time.time()
+
+    def _get_chunk_references(self) -> collections.Counter:
+        # needs to be called before new chunks are stored, otherwise the sweep would remove them
+        if self._chunk_references is None or time.time() - self._last_full_sweep > FULL_SWEEP_INTERVAL:
+            self._sweep_chunks()
+        return self._chunk_references
+
+    def _release_chunks(self, checkpoints: list) -> None:
+        """Remove the references of the removed checkpoints and all chunks that are not referenced anymore."""
+        chunk_references = self._get_chunk_references()
+        for checkpoint in checkpoints:
+            for chunk_hash in checkpoint["chunks"]:
+                chunk_references[chunk_hash] -= 1
+                if chunk_references[chunk_hash] > 0:
+                    continue
+                del chunk_references[chunk_hash]
+                chunk_path = self._chunk_path(chunk_hash)
+                if os.path.exists(chunk_path):
+                    os.remove(chunk_path)
+
+    def _checkpoint_model(self, checkpoint: dict) -> dict:
+        return {
+            "id": checkpoint["id"],
+            "last_modified": datetime.fromtimestamp(checkpoint["timestamp"], tz=timezone.utc),
+        }
+
+    def create_checkpoint(self, contents_mgr, path):
+        # the raw file is used, so that the checkpoint is identical to the file on disk
+        os_path = contents_mgr._get_os_path(path)
+        with open(os_path, "rb") as file:
+            data = file.read()
+
+        chunk_references = self._get_chunk_references()
+        timestamp = datetime.now(timezone.utc).timestamp()
+        checkpoint = {
+            "id": datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y%m%dT%H%M%S%f"),
+            "timestamp": timestamp,
+            "size": len(data),
+            "chunks": self._store_chunks(data),
+        }
+
+        index = self._load_index(path)
+        index["checkpoints"].append(checkpoint)
+        removed_checkpoints = index["checkpoints"][:-self.retention] if self.retention > 0 else []
+        index["checkpoints"] = index["checkpoints"][len(removed_checkpoints):]
+        self._save_index(path, index)
+        chunk_references.update(checkpoint["chunks"])
+        if removed_checkpoints:
+            self._release_chunks(removed_checkpoints)
+        return self._checkpoint_model(checkpoint)
+
+    def restore_checkpoint(self, contents_mgr, checkpoint_id, path):
+        data = self._read_checkpoint(checkpoint_id, path)
+        # restores the exact bytes of the checkpoint, like the default file checkpoints
+        with contents_mgr.atomic_writing(contents_mgr._get_os_path(path), text=False) as file:
+            file.write(data)
+
+    def rename_checkpoint(self, checkpoint_id, old_path, new_path):
+        old_index = self._load_index(old_path)
+        checkpoints = [checkpoint for checkpoint in old_index["checkpoints"] if checkpoint["id"] == checkpoint_id]
+        if not checkpoints:
+            return
+
+        new_index = self._load_index(new_path)
+        new_index["checkpoints"] = sorted(
+            new_index["checkpoints"] + checkpoints, key=lambda checkpoint: checkpoint["timestamp"]
+        )
+        self._save_index(new_path, new_index)
+        old_index["checkpoints"] = [
+            checkpoint for checkpoint in old_index["checkpoints"] if checkpoint["id"] != checkpoint_id
+        ]
+        self._save_index(old_path, old_index)
+
+    def delete_checkpoint(self, checkpoint_id, path):
+        index = self._load_index(path)
+        checkpoints = [checkpoint for checkpoint in index["checkpoints"] if checkpoint["id"] != checkpoint_id]
+        if len(checkpoints) == len(index["checkpoints"]):
+            raise HTTPError(404, "Checkpoint does not exist: " + path + "@" + checkpoint_id)
+        removed_checkpoints = [checkpoint for checkpoint in index["checkpoints"] if checkpoint["id"] == checkpoint_id]
+        index["checkpoints"] = checkpoints
+        self._save_index(path, index)
+        self._release_chunks(removed_checkpoints)
+
+    def list_checkpoints(self, path):
+        # oldest first, the notebook frontend uses the last checkpoint
+        return [self._checkpoint_model(checkpoint) for checkpoint in self._load_index(path)["checkpoints"]]
@@ -0,0 +1,394 @@
+"""
+Contents manager for large notebooks and huge directories.
+
+Lazy outputs: large outputs of big notebooks are not sent to the notebook editor on open (contents API
+requests of type notebook, see LazyNotebookContentsHandler in tooling_handler.py). All other callers
+(e.g. nbconvert exports) get the full notebook. The large outputs are replaced with a truncated preview
+and a link, and the full output is stored in ~/.workspace/lazy-outputs (served
+via /tooling/lazy-outputs/<file>, loaded into the cell on click by the tooling notebook widget). The
+stripped notebook is cached by file mtime. On save, placeholders that were not loaded in the browser are
+replaced with the original outputs again; if an output cannot be restored, the save fails instead of
+writing the placeholder. Every opened notebook records the outputs it references, outputs that are not
+referenced by a recently opened notebook are removed on load or save (at most once per hour).
+
+Paginated directories: directory listings only contain the first page of entries (directories first,
+sorted by name). The entries of a directory are collected via scandir and cached by directory mtime,
+further pages are available via /tooling/contents and loaded by the tooling tree widget.
+
+Activated via LAZY_NOTEBOOK_OUTPUTS and DIRECTORY_PAGE_SIZE in jupyter_notebook_config.py.
+"""
+
+import collections
+import copy
+import hashlib
+import json
+import mimetypes
+import os
+import stat
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from notebook.services.contents.largefilemanager import LargeFileManager
+from notebook.utils import is_file_hidden
+from tornado.web import HTTPError
+from traitlets import Integer
+
+HOME = os.getenv("HOME", "/home/ml")
+LAZY_OUTPUTS_FOLDER = os.path.join(HOME, ".workspace", "lazy-outputs")
+# notebook path hash -> outputs referenced by the notebook when it was opened
+LAZY_OUTPUT_REFERENCES_FOLDER = os.path.join(LAZY_OUTPUTS_FOLDER, "references")
+# references of notebooks that were not opened or saved within this time are removed
+LAZY_OUTPUT_RETENTION = 7 * 24 * 60 * 60  # seconds
+LAZY_OUTPUT_CLEANUP_INTERVAL = 60 * 60  # seconds
+LAZY_OUTPUT_PREFIX = "lazy-"
+# metadata key of placeholder outputs, contains the file name of the full output
+METADATA_KEY = "jupyter_tooling"
+PREVIEW_LENGTH = 1000
+MAX_CACHED_NOTEBOOKS = 20
+MAX_CACHED_DIRECTORIES = 50
+# same order as the tree view: directories, notebooks, files
+TYPE_ORDER = {"directory": 0, "notebook": 1, "file": 2}
+SORT_KEYS = {
+    "name": lambda entry: (TYPE_ORDER[entry["type"]], entry["name"].lower()),
+    "last_modified": lambda entry: entry["mtime"],
+    "size": lambda entry: entry["size"] or 0,
+}
+
+
+def get_output_size(output: dict) -> int:
+    return len(json.dumps(output))
+
+
+def get_output_file_name(output_json: str) -> str:
+    return LAZY_OUTPUT_PREFIX + hashlib.sha1(output_json.encode("utf-8")).hexdigest() + ".json"
+
+
+def get_lazy_output_url(file_name: str) -> str:
+    base_url = os.getenv("WORKSPACE_BASE_URL", "/").rstrip("/")
+    return base_url + "/tooling/lazy-outputs/" + file_name
+
+
+def get_references_path(path: str) -> str:
+    path_hash = hashlib.sha1(path.strip("/").encode("utf-8")).hexdigest()
+    return os.path.join(LAZY_OUTPUT_REFERENCES_FOLDER, path_hash + ".json")
+
+
+class WorkspaceContentsManager(LargeFileManager):
+    """Contents manager that strips large outputs from big notebooks and paginates huge directories."""
+
+    lazy_notebook_size = Integer(
+        0, config=True, help="Minimum file size of notebooks that are opened without large outputs (0 to disable)."
+    )
+
+    lazy_output_size = Integer(
+        64 * 1024, config=True, help="Minimum size of outputs that are only loaded on demand."
+    )
+
+    directory_page_size = Integer(
+        0, config=True, help="Maximum number of entries in directory listings (0 to disable pagination)."
+    )
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # path -> (mtime, stripped notebook content)
+        self._stripped_notebooks = collections.OrderedDict()
+        # os path -> (mtime, entries of the directory)
+        self._directory_entries = collections.OrderedDict()
+        self._last_lazy_output_cleanup = 0
+
+    def store_output(self, output: dict) -> str:
+        """Store the output content-addressed (identical outputs are stored once) and return the file name."""
+        output_json = json.dumps(output, sort_keys=True)
+        file_name = get_output_file_name(output_json)
+        file_path = os.path.join(LAZY_OUTPUTS_FOLDER, file_name)
+        if not os.path.exists(LAZY_OUTPUTS_FOLDER):
+            os.makedirs(LAZY_OUTPUTS_FOLDER)
+        if not os.path.exists(file_path):
+            temp_file = file_path + ".tmp"
+            with open(temp_file, "w") as file:
+                file.write(output_json)
+            os.replace(temp_file, file_path)
+        return file_name
+
+    def update_output_references(self, path: str, file_names: list) -> None:
+        """Record the outputs that the opened notebook references, an empty list removes the references."""
+        references_path = get_references_path(path)
+        if not file_names:
+            if os.path.exists(references_path):
+                os.remove(references_path)
+            return
+
+        os.makedirs(LAZY_OUTPUT_REFERENCES_FOLDER, exist_ok=True)
+        temp_file = references_path + ".tmp"
+        with open(temp_file, "w") as file:
+            json.dump({"path": path.strip("/"), "outputs": sorted(set(file_names))}, file)
+        os.replace(temp_file, references_path)
+
+    def remove_unused_outputs(self) -> None:
+        """Remove outputs that are not referenced by a notebook opened within the retention time."""
+        if time.time() - self._last_lazy_output_cleanup < LAZY_OUTPUT_CLEANUP_INTERVAL:
+            return
+        self._last_lazy_output_cleanup = time.time()
+        if not os.path.isdir(LAZY_OUTPUTS_FOLDER):
+            return
+
+        used_outputs = set()
+        if os.path.isdir(LAZY_OUTPUT_REFERENCES_FOLDER):
+            for references_file in os.listdir(LAZY_OUTPUT_REFERENCES_FOLDER):
+                references_path = os.path.join(LAZY_OUTPUT_REFERENCES_FOLDER, references_file)
+                try:
+                    with open(references_path, "r") as file:
+                        references = json.load(file)
+                    if (
+                        time.time() - os.path.getmtime(references_path) > LAZY_OUTPUT_RETENTION
+                        or not os.path.isfile(self._get_os_path(references["path"]))
+                    ):
+                        os.remove(references_path)
+                        continue
+                    used_outputs.update(references["outputs"])
+                except Exception as ex:
+                    self.log.warning("Failed to read output references " + references_file + ": " + str(ex))
+
+        for file_name in os.listdir(LAZY_OUTPUTS_FOLDER):
+            if file_name.startswith(LAZY_OUTPUT_PREFIX) and file_name not in used_outputs:
+                try:
+                    os.remove(os.path.join(LAZY_OUTPUTS_FOLDER, file_name))
+                except OSError:
+                    pass
+
+    def create_placeholder(self, output: dict, file_name: str) -> dict:
+        size = str(round(get_output_size(output) / 1024 / 1024, 1)) + " MB"
+        preview = ""
+        if output.get("output_type") == "stream":
+            preview = output.get("text", "")
+        elif "data" in output:
+            preview = output["data"].get("text/plain", "")
+        if isinstance(preview, list):
+            preview = "".join(preview)
+        preview = preview[:PREVIEW_LENGTH]
+
+        url = get_lazy_output_url(file_name)
+        return {
+            "output_type": "display_data",
+            "data": {
+                "text/plain": preview + "\n[Output of " + size + " not loaded: " + url + "]",
+                "text/html": (
+                    "<pre>" + preview.replace("&", "&amp;").replace("<", "&lt;") + "</pre>"
+                    + '<div>Output of ' + size + ' not loaded. <a href="' + url + '">Load output</a></div>'
+                ),
+            },
+            "metadata": {METADATA_KEY: {"lazy_output": file_name}},
+        }
+
+    def strip_outputs(self, nb) -> list:
+        """Replace large outputs with placeholders, returns the file names of the stored outputs."""
+        file_names = []
+        for cell in nb.cells:
+            if cell.cell_type != "code":
+                continue
+            for index, output in enumerate(cell.outputs):
+                if get_output_size(output) < self.lazy_output_size:
+                    continue
+                file_name = self.store_output(output)
+                cell.outputs[index] = self.create_placeholder(output, file_name)
+                file_names.append(file_name)
+        return file_names
+
+    def load_original_outputs(self, path: str) -> dict:
+        """File name -> output of all large outputs of the notebook on disk."""
+        os_path = self._get_os_path(path)
+        if not os.path.isfile(os_path):
+            return {}
+
+        original_outputs = {}
+        for cell in self._read_notebook(os_path, as_version=4).cells:
+            for output in cell.get("outputs", []):
+                original_outputs[get_output_file_name(json.dumps(output, sort_keys=True))] = output
+        return original_outputs
+
+    def restore_outputs(self, nb, path: str) -> list:
+        """Replace all placeholders with the full outputs, returns the file names of the restored outputs."""
+        file_names = []
+        original_outputs = None
+        for cell in nb.get("cells", []):
+            if cell.get("cell_type") != "code":
+                continue
+            for index, output in enumerate(cell.get("outputs", [])):
+                file_name = output.get("metadata", {}).get(METADATA_KEY, {}).get("lazy_output")
+                if not file_name:
+                    continue
+
+                file_names.append(file_name)
+                file_path = os.path.join(LAZY_OUTPUTS_FOLDER, os.path.basename(file_name))
+                if os.path.isfile(file_path):
+                    with open(file_path, "r") as file:
+                        cell["outputs"][index] = json.load(file)
+                    continue
+
+                # output file was removed in the meantime -> use the output of the notebook on disk
+                if original_outputs is None:
+                    original_outputs = self.load_original_outputs(path)
+                if file_name not in original_outputs:
+                    # saving the placeholder would lose the output
+                    raise HTTPError(
+                        409,
+                        "Output " + file_name + " of " + path + " is not available anymore. "
+                        + "Please reload the notebook before saving.",
+                    )
+                cell["outputs"][index] = original_outputs[file_name]
+        return file_names
+
+    def get_lazy_notebook(self, path: str) -> dict:
+        """Notebook model for the notebook editor, large notebooks are returned without large outputs."""
+        path = path.strip("/")
+        os_path = self._get_os_path(path)
+        if (
+            not self.lazy_notebook_size
+            or not path.endswith(".ipynb")
+            or not os.path.isfile(os_path)
+            or os.path.getsize(os_path) < self.lazy_notebook_size
+        ):
+            return self.get(path, type="notebook")
+
+        mtime = os.path.getmtime(os_path)
+        cached_notebook = self._stripped_notebooks.get(path)
+        references_path = get_references_path(path)
+        if cached_notebook and cached_notebook[0] == mtime and os.path.isfile(references_path):
+            # keep the referenced outputs from being removed
+            os.utime(references_path)
+            # only the metadata needs to be read from disk
+            model = self.get(path, content=False, type="notebook")
+            model["content"] = copy.deepcopy(cached_notebook[1])
+            model["format"] = "json"
+            self._stripped_notebooks.move_to_end(path)
+            return model
+
+        model = self.get(path, type="notebook")
+        try:
+            self.update_output_references(path, self.strip_outputs(model["content"]))
+            self.remove_unused_outputs()
+        except Exception as ex:
+            self.log.warning("Failed to strip large outputs of " + path + ": " + str(ex))
+            return self.get(path, type="notebook")
+
+        self._stripped_notebooks[path] = (mtime, copy.deepcopy(model["content"]))
+        if len(self._stripped_notebooks) > MAX_CACHED_NOTEBOOKS:
+            self._stripped_notebooks.popitem(last=False)
+        return model
+
+    def save(self, model, path=""):
+        if model.get("type") == "notebook" and model.get("content"):
+            # the browser only knows the placeholders of outputs that were not loaded
+            file_names = self.restore_outputs(model["content"], path.strip("/"))
+            if file_names:
+                # the placeholders stay in the browser -> keep the outputs for the next save
+                self.update_output_references(path, file_names)
+                self.remove_unused_outputs()
+        return super().save(model, path)
+
+    def trust_notebook(self, path):
+        super().trust_notebook(path)
+        self._stripped_notebooks.pop(path.strip("/"), None)
+
+    # ------------- Paginated Directories ------------------------
+
+    def get_directory_entries(self, os_dir: str) -> list:
+        """Name, type, size and mtime of all listed entries of the directory, cached by directory mtime."""
+        dir_mtime = os.stat(os_dir).st_mtime
+        cached_entries = self._directory_entries.get(os_dir)
+        if cached_entries and cached_entries[0] == dir_mtime:
+            self._directory_entries.move_to_end(os_dir)
+            return cached_entries[1]
+
+        entries = []
+        with os.scandir(os_dir) as directory:
+            for entry in directory:
+                try:
+                    # follows symlinks like the default contents manager
+                    entry_stat = entry.stat()
+                except OSError:
+                    # e.g. broken symlink
+                    continue
+                if not stat.S_ISREG(entry_stat.st_mode) and not stat.S_ISDIR(entry_stat.st_mode):
+                    # skip special files
+                    continue
+                if not self.should_list(entry.name):
+                    continue
+                if not self.allow_hidden and is_file_hidden(entry.path, stat_res=entry_stat):
+                    continue
+
+                if stat.S_ISDIR(entry_stat.st_mode):
+                    entry_type = "directory"
+                elif entry.name.endswith(".ipynb"):
+                    entry_type = "notebook"
+                else:
+                    entry_type = "file"
+
+                entries.append(
+                    {
+                        "name": entry.name,
+                        "type": entry_type,
+                        "size": entry_stat.st_size if entry_type != "directory" else None,
+                        "mtime": entry_stat.st_mtime,
+                    }
+                )
+
+        entries.sort(key=SORT_KEYS["name"])
+        self._directory_entries[os_dir] = (dir_mtime, entries)
+        if len(self._directory_entries) > MAX_CACHED_DIRECTORIES:
+            self._directory_entries.popitem(last=False)
+        return entries
+
+    def get_entry_model(self, path: str, entry: dict) -> Optional[dict]:
+        entry_path = (path.strip("/") + "/" + entry["name"]).strip("/")
+        os_path = self._get_os_path(entry_path)
+        try:
+            # only the entries of the page are stat-ed again, files might have changed since caching
+            entry_stat = os.stat(os_path)
+        except OSError:
+            return None
+
+        return {
+            "name": entry["name"],
+            "path": entry_path,
+            "type": entry["type"],
+            "last_modified": datetime.fromtimestamp(entry_stat.st_mtime, tz=timezone.utc),
+            "created": datetime.fromtimestamp(entry_stat.st_ctime, tz=timezone.utc),
+            "content": None,
+            "format": None,
+            "mimetype": mimetypes.guess_type(entry["name"])[0] if entry["type"] == "file" else None,
+            "size": entry_stat.st_size if entry["type"] != "directory" else None,
+            "writable": os.access(os_path, os.W_OK),
+        }
+
+    def list_directory(
+        self, path: str, offset: int = 0, limit: int = None, sort_by: str = "name", reverse: bool = False
+    ) -> dict:
+        """Return a page of the directory entries as content models."""
+        entries = self.get_directory_entries(self._get_os_path(path))
+        if sort_by != "name" or reverse:
+            entries = sorted(entries, key=SORT_KEYS[sort_by], reverse=reverse)
+
+        limit = limit or self.directory_page_size or len(entries)
+        page = [self.get_entry_model(path, entry) for entry in entries[offset:offset + limit]]
+        return {
+            "path": path,
+            "offset": offset,
+            "total": len(entries),
+            "content": [model for model in page if model],
+        }
+
+    def _dir_model(self, path, content=True):
+        if not content or not self.directory_page_size:
+            return super()._dir_model(path, content=content)
+
+        # directory model without content, raises the same errors for missing or hidden directories
+        model = super()._dir_model(path, content=False)
+        directory_page = self.list_directory(path, limit=self.directory_page_size)
+        model["content"] = directory_page["content"]
+        model["format"] = "json"
+        # not part of the contents API, used by the tree widget to load the remaining entries
+        model["total"] = directory_page["total"]
+        model["truncated"] = directory_page["total"] > self.directory_page_size
+        return model
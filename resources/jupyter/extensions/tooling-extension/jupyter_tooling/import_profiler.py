@@ -0,0 +1,177 @@
+"""
+Import-time profiler for kernel and Jupyter server startup.
+
+Runs a throwaway kernel initialization and a dry-run import of the Jupyter server
+(including all enabled server extensions) with `python -X importtime` and aggregates
+the import tree into the slowest imports.
+
+Usage: python -m jupyter_tooling.import_profiler [kernel|server|all] [--top N]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PROFILE_TIMEOUT = 120  # seconds
+DEFAULT_TOP = 20
+
+# Initializes (but does not start) a kernel like the kernel launcher, this also loads ipython_config.py
+KERNEL_PROFILE_CODE = """
+import sys
+from ipykernel.kernelapp import IPKernelApp
+IPKernelApp.instance().initialize(["-f", sys.argv[1]])
+"""
+
+# Imports the notebook server and then every server extension, so that
+# the import time of an extension only contains the modules that it adds
+SERVER_PROFILE_CODE = """
+import importlib
+import sys
+import notebook.notebookapp
+for extension in sys.argv[1:]:
+    try:
+        importlib.import_module(extension)
+    except Exception:
+        pass
+"""
+
+
+def get_server_extensions() -> list:
+    """Names of all enabled notebook server extensions."""
+    from jupyter_core.paths import jupyter_config_path
+    from notebook.config_manager import BaseJSONConfigManager
+
+    server_extensions = {}
+    # later paths have a lower priority
+    for config_dir in reversed(jupyter_config_path()):
+        config = BaseJSONConfigManager(config_dir=config_dir).get("jupyter_notebook_config")
+        server_extensions.update(config.get("NotebookApp", {}).get("nbserver_extensions", {}))
+    return sorted(extension for extension, enabled in server_extensions.items() if enabled)
+
+
+def parse_import_times(output: str) -> list:
+    """Parse the -X importtime output into a list of imports with self and cumulative time in microseconds."""
+    imports = []
+    for line in output.splitlines():
+        # format: import time:       123 |        456 |   numpy.core
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # header line
+            continue
+
+        module = fields[2].rstrip()
+        imports.append(
+            {
+                "module": module.strip(),
+                # nested imports are indented by two spaces per level
+                "depth": (len(module) - len(module.lstrip()) - 1) // 2,
+                "self": int(fields[0]),
+                "cumulative": int(fields[1]),
+            }
+        )
+    return imports
+
+
+def aggregate_import_times(imports: list, top: int = DEFAULT_TOP, modules: list = None) -> dict:
+    # direct imports contain the time of all nested imports
+    direct_imports = [entry for entry in imports if entry["depth"] == 0]
+
+    # aggregate the self time per top-level package (e.g. all numpy.* modules)
+    packages = {}
+    for entry in imports:
+        package = entry["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + entry["self"]
+
+    report = {
+        "totalTime": sum(entry["cumulative"] for entry in direct_imports) / 1000000,
+        "moduleCount": len(imports),
+        "topCumulative": [
+            {"module": entry["module"], "time": entry["cumulative"] / 1000000}
+            for entry in sorted(direct_imports, key=lambda entry: entry["cumulative"], reverse=True)[:top]
+        ],
+        "topPackages": [
+            {"package": package, "time": package_time / 1000000}
+            for package, package_time in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+    }
+
+    if modules:
+        # import time of specific modules, e.g. server extensions
+        module_times = {entry["module"]: entry["cumulative"] for entry in direct_imports}
+        report["modules"] = [
+            {"module": module, "time": module_times.get(module, 0) / 1000000} for module in modules
+        ]
+    return report
+
+
+def run_import_profile(code: str, arguments: list) -> list:
+    env = os.environ.copy()
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code] + arguments,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        env=env,
+        timeout=PROFILE_TIMEOUT,
+    )
+    return parse_import_times(result.stderr.decode("utf-8", errors="replace"))
+
+
+def profile_kernel(top: int = DEFAULT_TOP) -> dict:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        connection_file = os.path.join(temp_dir, "kernel-import-profile.json")
+        imports = run_import_profile(KERNEL_PROFILE_CODE, [connection_file])
+    return aggregate_import_times(imports, top)
+
+
+def profile_server(top: int = DEFAULT_TOP) -> dict:
+    server_extensions = get_server_extensions()
+    imports = run_import_profile(SERVER_PROFILE_CODE, server_extensions)
+    return aggregate_import_times(imports, top, modules=server_extensions)
+
+
+def profile(target: str = "all", top: int = DEFAULT_TOP) -> dict:
+    report = {}
+    if target in ["kernel", "all"]:
+        report["kernel"] = profile_kernel(top)
+    if target in ["server", "all"]:
+        report["server"] = profile_server(top)
+    return report
+
+
+def print_report(report: dict) -> None:
+    for target, target_report in report.items():
+        print(
+            target.capitalize() + " imports: " + str(target_report["moduleCount"]) + " modules in "
+            + "{:.2f}s".format(target_report["totalTime"])
+        )
+        if target_report.get("modules"):
+            print("\n  Server extensions:")
+            for entry in target_report["modules"]:
+                print("  {:>8.3f}s  {}".format(entry["time"], entry["module"]))
+        print("\n  Slowest imports (cumulative):")
+        for entry in target_report["topCumulative"]:
+            print("  {:>8.3f}s  {}".format(entry["time"], entry["module"]))
+        print("\n  Slowest packages (self time of all modules):")
+        for entry in target_report["topPackages"]:
+            print("  {:>8.3f}s  {}".format(entry["time"], entry["package"]))
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile the import time of kernel and Jupyter server startup.")
+    parser.add_argument("target", nargs="?", default="all", choices=["kernel", "server", "all"])
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Number of imports to show.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    import_report = profile(args.target, args.top)
+    if args.json:
+        print(json.dumps(import_report, indent=4))
+    else:
+        print_report(import_report)
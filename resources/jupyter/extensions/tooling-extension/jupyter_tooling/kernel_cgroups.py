@@ -0,0 +1,137 @@
+"""
+Per-kernel cgroup v2 isolation.
+
+Every kernel is started via this module as launcher (python -m jupyter_tooling.kernel_cgroups <name> <cmd>),
+which creates a child group below the kernels group (prepared by configure_cgroups.py),
+applies the configured memory.max and cpu.weight, moves itself into the group, and executes the kernel.
+Activated via CgroupKernelManager in jupyter_notebook_config.py.
+"""
+
+import os
+import shutil
+import sys
+from typing import Optional
+
+from jupyter_client.ioloop import IOLoopKernelManager
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+KERNELS_CGROUP = os.path.join(CGROUP_ROOT, "kernels")
+WORKSPACE_CGROUP = os.path.join(CGROUP_ROOT, "workspace")
+
+# e.g. 4G or max (see memory.max in the cgroup v2 documentation)
+KERNEL_MEMORY_MAX = os.getenv("KERNEL_CGROUPS_MEMORY_MAX", "max")
+# 1 - 10000, the workspace group has a weight of 1000
+KERNEL_CPU_WEIGHT = os.getenv("KERNEL_CGROUPS_CPU_WEIGHT", "100")
+
+
+def is_available() -> bool:
+    return os.path.isdir(KERNELS_CGROUP) and os.access(KERNELS_CGROUP, os.W_OK)
+
+
+def get_cgroup_name(connection_file: str) -> str:
+    # connection file name: kernel-<kernel_id>.json
+    return os.path.splitext(os.path.basename(connection_file))[0]
+
+
+def _read_file(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as file:
+            return file.read().strip()
+    except Exception:
+        return None
+
+
+def _read_stat(path: str) -> dict:
+    stat = {}
+    for line in (_read_file(path) or "").splitlines():
+        key, _, value = line.partition(" ")
+        if value.isdigit():
+            stat[key] = int(value)
+    return stat
+
+
+def get_cgroup_usage(cgroup: str) -> dict:
+    memory_max = _read_file(os.path.join(cgroup, "memory.max"))
+    memory_current = _read_file(os.path.join(cgroup, "memory.current"))
+    return {
+        "memoryCurrent": int(memory_current) if memory_current and memory_current.isdigit() else None,
+        "memoryMax": int(memory_max) if memory_max and memory_max.isdigit() else memory_max,
+        "oomKills": _read_stat(os.path.join(cgroup, "memory.events")).get("oom_kill", 0),
+        "cpuWeight": _read_file(os.path.join(cgroup, "cpu.weight")),
+        "cpuUsage": _read_stat(os.path.join(cgroup, "cpu.stat")).get("usage_usec", 0) / 1000000,
+        "processes": len((_read_file(os.path.join(cgroup, "cgroup.procs")) or "").split()),
+    }
+
+
+def get_kernel_usage(kernel_manager) -> dict:
+    """Resource usage of the protected workspace group and of every running kernel."""
+    kernels = []
+    for kernel_id in list(kernel_manager.list_kernel_ids()):
+        try:
+            kernel = kernel_manager.get_kernel(kernel_id)
+        except KeyError:
+            continue
+
+        cgroup = os.path.join(KERNELS_CGROUP, get_cgroup_name(kernel.connection_file))
+        if not os.path.isdir(cgroup):
+            continue
+
+        kernel_usage = get_cgroup_usage(cgroup)
+        kernel_usage["id"] = kernel_id
+        kernel_usage["name"] = kernel.kernel_name
+        kernels.append(kernel_usage)
+
+    return {"workspace": get_cgroup_usage(WORKSPACE_CGROUP), "kernels": kernels}
+
+
+class CgroupKernelManager(IOLoopKernelManager):
+    """Kernel manager that starts every kernel in its own cgroup."""
+
+    def format_kernel_cmd(self, extra_arguments=None):
+        cmd = super().format_kernel_cmd(extra_arguments)
+        return [
+            sys.executable,
+            "-m",
+            "jupyter_tooling.kernel_cgroups",
+            get_cgroup_name(self.connection_file),
+        ] + cmd
+
+    def cleanup_resources(self, restart=False):
+        super().cleanup_resources(restart=restart)
+        if restart:
+            # the restarted kernel uses the same group
+            return
+
+        try:
+            # only empty groups can be removed
+            os.rmdir(os.path.join(KERNELS_CGROUP, get_cgroup_name(self.connection_file)))
+        except OSError:
+            pass
+
+
+def launch(cgroup_name: str, cmd: list) -> None:
+    cgroup = os.path.join(KERNELS_CGROUP, cgroup_name)
+    try:
+        if not os.path.exists(cgroup):
+            os.mkdir(cgroup)
+
+        controllers = (_read_file(os.path.join(cgroup, "cgroup.controllers")) or "").split()
+        if "memory" in controllers:
+            with open(os.path.join(cgroup, "memory.max"), "w") as file:
+                file.write(KERNEL_MEMORY_MAX)
+        if "cpu" in controllers:
+            with open(os.path.join(cgroup, "cpu.weight"), "w") as file:
+                file.write(KERNEL_CPU_WEIGHT)
+
+        with open(os.path.join(cgroup, "cgroup.procs"), "w") as file:
+            file.write(str(os.getpid()))
+    except Exception as ex:
+        # the kernel is still started, but without isolation
+        print("Failed to move kernel into cgroup " + cgroup + ": " + str(ex), file=sys.stderr)
+
+    executable = shutil.which(cmd[0]) or cmd[0]
+    os.execv(executable, cmd)
+
+
+if __name__ == "__main__":
+    launch(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,161 @@
+"""
+Pre-warmed kernel pool.
+
+Keeps a number of idle kernels running with a list of modules already imported (see kernel_preload.py)
+and hands one of them out on every kernel start request of the default kernel. The pool is refilled
+in the background. Activated via KERNEL_POOL_SIZE in jupyter_notebook_config.py.
+"""
+
+import collections
+import inspect
+import json
+from typing import Optional
+
+from notebook.services.kernels.kernelmanager import MappingKernelManager
+from tornado.ioloop import IOLoop
+from traitlets import Integer, List, Unicode
+
+from jupyter_tooling.offline_buffer import BufferingKernelManager
+
+# time until the client that changes the working directory of a handed out kernel is closed
+CLIENT_CLOSE_DELAY = 10  # seconds
+# kernel start argument with the (kernel id, kernel manager) of the pool kernel that is handed out
+POOLED_KERNEL_ARGUMENT = "pooled_kernel"
+
+
+class KernelPoolManager(MappingKernelManager):
+    """Kernel manager that hands out pre-started kernels from a pool."""
+
+    pool_size = Integer(0, config=True, help="Number of pre-started idle kernels.")
+
+    pool_kernel_name = Unicode(
+        "", config=True, help="Kernel name of the pool kernels. Uses the default kernel name if empty."
+    )
+
+    preload_modules = List(
+        Unicode(), [], config=True, help="Modules that are imported in pool kernels on start."
+    )
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # kernel id -> kernel manager of started kernels that are not handed out yet
+        self._pool = collections.OrderedDict()
+        self._filling_pool = False
+
+    def get_pool_kernel_name(self) -> str:
+        return self.pool_kernel_name or self.default_kernel_name
+
+    def start_pool(self) -> None:
+        if self.pool_size > 0:
+            IOLoop.current().spawn_callback(self.fill_pool)
+
+    async def fill_pool(self) -> None:
+        if self._filling_pool:
+            return
+
+        self._filling_pool = True
+        try:
+            while len(self._pool) < self.pool_size:
+                kernel_manager, _, kernel_id = super().pre_start_kernel(self.get_pool_kernel_name(), {})
+                extra_arguments = []
+                if self.preload_modules:
+                    # executed by the kernel on startup, missing modules are ignored
+                    extra_arguments.append(
+                        "--IPKernelApp.exec_lines="
+                        "__import__('jupyter_tooling.kernel_preload').kernel_preload.preload("
+                        + json.dumps(self.preload_modules) + ")"
+                    )
+                result = kernel_manager.start_kernel(cwd=self.root_dir, extra_arguments=extra_arguments)
+                if inspect.isawaitable(result):
+                    await result
+                self._pool[kernel_id] = kernel_manager
+                self.log.debug("Started pool kernel " + kernel_id)
+        except Exception as ex:
+            self.log.warning("Failed to start pool kernel: " + str(ex))
+        finally:
+            self._filling_pool = False
+
+    def pre_start_kernel(self, kernel_name, kwargs):
+        # set by start_kernel and passed through the kernel start -> hand out the already running kernel
+        pooled_kernel = kwargs.pop(POOLED_KERNEL_ARGUMENT, None)
+        if pooled_kernel:
+            kernel_id, kernel_manager = pooled_kernel
+            return kernel_manager, kernel_manager.kernel_name, kernel_id
+        return super().pre_start_kernel(kernel_name, kwargs)
+
+    def take_pooled_kernel(self, kwargs: dict) -> Optional[tuple]:
+        kernel_name = kwargs.get("kernel_name") or self.default_kernel_name
+        if kernel_name != self.get_pool_kernel_name() or set(kwargs) - {"kernel_name", "cwd"}:
+            # kernel was requested with other arguments than the pool kernels
+            return None
+
+        while self._pool:
+            kernel_id, kernel_manager = self._pool.popitem(last=False)
+            if kernel_manager.is_alive():
+                return kernel_id, kernel_manager
+        return None
+
+    async def start_kernel(self, kernel_id=None, path=None, **kwargs):
+        pooled_kernel = None
+        if kernel_id is None and self.pool_size > 0:
+            pooled_kernel = self.take_pooled_kernel(kwargs)
+
+        if not pooled_kernel:
+            return await super().start_kernel(kernel_id=kernel_id, path=path, **kwargs)
+
+        pooled_kernel_id, kernel_manager = pooled_kernel
+        start_kernel = kernel_manager.start_kernel
+
+        # the kernel process is already running -> skip the start of the kernel manager
+        if inspect.iscoroutinefunction(start_kernel):
+            async def skip_start_kernel(**kw):
+                return None
+        else:
+            def skip_start_kernel(**kw):
+                return None
+
+        # the kernel manager was taken out of the pool, no other start can reach it
+        kernel_manager.start_kernel = skip_start_kernel
+        kwargs[POOLED_KERNEL_ARGUMENT] = pooled_kernel
+        try:
+            kernel_id = await super().start_kernel(path=path, **kwargs)
+        finally:
+            # restarts need the original method again
+            del kernel_manager.start_kernel
+
+        if path is not None:
+            self.change_working_directory(kernel_manager, self.cwd_for_path(path))
+
+        self.log.info("Handed out pre-warmed kernel " + pooled_kernel_id)
+        IOLoop.current().spawn_callback(self.fill_pool)
+        return kernel_id
+
+    def change_working_directory(self, kernel_manager, cwd: str) -> None:
+        # pool kernels are started in the root directory, the first request in the shell queue changes it
+        client = kernel_manager.client()
+        client.start_channels(iopub=False, stdin=False, hb=False, control=False)
+        client.execute(
+            "__import__('os').chdir(" + json.dumps(cwd) + ")", silent=True, store_history=False
+        )
+        IOLoop.current().call_later(CLIENT_CLOSE_DELAY, client.stop_channels)
+
+    def shutdown_all(self, now=False):
+        for kernel_manager in self._pool.values():
+            try:
+                kernel_manager.shutdown_kernel(now=True)
+            except Exception:
+                pass
+        self._pool.clear()
+        return super().shutdown_all(now=now)
+
+    def get_status(self) -> dict:
+        return {
+            "poolSize": self.pool_size,
+            "kernelName": self.get_pool_kernel_name(),
+            "preloadModules": self.preload_modules,
+            "idleKernels": list(self._pool),
+        }
+
+
+class BufferingKernelPoolManager(KernelPoolManager, BufferingKernelManager):
+    """Kernel pool with the disk-spilled offline message buffer (OFFLINE_BUFFER_SPILLING)."""
@@ -0,0 +1,16 @@
+"""
+Executed by pre-warmed pool kernels on startup (see kernel_pool.py).
+
+Imports the configured modules into sys.modules, so that the first import in a notebook is instant.
+"""
+
+import importlib
+
+
+def preload(modules: list) -> None:
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception:
+            # e.g. module not installed in the current flavor
+            pass
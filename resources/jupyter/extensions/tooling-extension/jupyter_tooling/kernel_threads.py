@@ -0,0 +1,101 @@
+"""
+Kernel-side hook of the thread broker (see thread_broker.py).
+
+Loaded as IPython extension via ipython_config.py. Applies the number of threads
+that the broker allocated to this kernel to all BLAS/OpenMP thread pools via threadpoolctl.
+"""
+
+import json
+import os
+import threading
+from typing import Optional
+
+HOME = os.getenv("HOME", "/home/ml")
+THREAD_ALLOCATION_FILE = os.path.join(HOME, ".workspace", "thread-allocations.json")
+CHECK_INTERVAL = 2  # seconds
+
+
+class KernelThreadLimiter:
+    def __init__(self, kernel_id: str):
+        self.kernel_id = kernel_id
+        self.num_threads = None
+        self._allocation_mtime = None
+        # user api (None: all thread pools) -> number of threads that was applied last
+        self._applied_threads = {}
+
+    def get_allocated_threads(self) -> Optional[int]:
+        try:
+            allocation_mtime = os.path.getmtime(THREAD_ALLOCATION_FILE)
+            if allocation_mtime == self._allocation_mtime:
+                # allocations have not changed
+                return self.num_threads
+
+            with open(THREAD_ALLOCATION_FILE, "r") as file:
+                allocations = json.load(file)
+            self._allocation_mtime = allocation_mtime
+            self.num_threads = allocations.get(self.kernel_id)
+            return self.num_threads
+        except Exception:
+            return self.num_threads
+
+    def apply(self, user_api: str = None) -> None:
+        from threadpoolctl import threadpool_limits
+
+        num_threads = self.get_allocated_threads()
+        if not num_threads or self._applied_threads.get(user_api) == num_threads:
+            return
+        # limits stay active for the lifetime of the kernel
+        threadpool_limits(limits=num_threads, user_api=user_api)
+        self._applied_threads[user_api] = num_threads
+        if user_api is None:
+            # BLAS limits are included
+            self._applied_threads["blas"] = num_threads
+
+    def pre_run_cell(self, *args, **kwargs) -> None:
+        # the main thread also applies OpenMP limits, which are set per calling thread
+        try:
+            self.apply()
+        except Exception:
+            pass
+
+    def watch(self) -> None:
+        # rebalance also during long-running cells, BLAS limits are process-wide
+        event = threading.Event()
+        while not event.wait(CHECK_INTERVAL):
+            try:
+                self.apply(user_api="blas")
+            except Exception:
+                pass
+
+
+def get_kernel_id() -> Optional[str]:
+    try:
+        from ipykernel import get_connection_file
+
+        # connection file name: kernel-<kernel_id>.json
+        connection_file = os.path.basename(get_connection_file())
+        return connection_file[len("kernel-"):-len(".json")]
+    except Exception:
+        return None
+
+
+def load_ipython_extension(ipython) -> None:
+    if getattr(ipython, "kernel", None) is None:
+        # not running in a Jupyter kernel (e.g. terminal IPython)
+        return
+
+    try:
+        import threadpoolctl  # noqa: F401
+    except ImportError:
+        return
+
+    kernel_id = get_kernel_id()
+    if not kernel_id:
+        return
+
+    limiter = KernelThreadLimiter(kernel_id)
+    ipython.events.register("pre_run_cell", limiter.pre_run_cell)
+
+    watch_thread = threading.Thread(target=limiter.watch)
+    watch_thread.daemon = True
+    watch_thread.start()
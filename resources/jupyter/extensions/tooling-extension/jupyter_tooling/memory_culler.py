@@ -0,0 +1,303 @@
+"""
+Memory culler: frees memory before the OOM killer of the container takes out a random process.
+
+Checks the cgroup memory usage and memory pressure (PSI) of the workspace. Above the warning
+threshold, a warning is logged. Above the culling threshold (or on high memory pressure), idle
+kernels are shut down in least-recently-used order (largest first for equal activity) until the
+usage is below the warning threshold again. If only busy kernels are left, the largest one gets
+interrupted and shut down if it is still the cause of the memory pressure on the next checks.
+"""
+
+import collections
+import inspect
+import os
+import sys
+import time
+from typing import Optional
+
+import psutil
+from tornado.ioloop import PeriodicCallback
+
+# the memory limit is detected by the resource topology script (also used in jupyter_notebook_config.py)
+RESOURCES_SCRIPTS_PATH = os.path.join(os.getenv("RESOURCES_PATH", "/resources"), "scripts")
+if RESOURCES_SCRIPTS_PATH not in sys.path:
+    sys.path.append(RESOURCES_SCRIPTS_PATH)
+
+from resource_topology import CGROUP_ROOT, _read_file, load_resource_topology  # noqa: E402
+
+CHECK_INTERVAL = 5000  # milliseconds
+DEFAULT_CULLING_THRESHOLD = 90  # percent of memory limit
+# usage needs to drop this much below the culling threshold before culling stops
+WARNING_THRESHOLD_OFFSET = 10  # percent
+# percentage of time in which all tasks were stalled on memory within the last 10 seconds
+PRESSURE_THRESHOLD = 10.0
+# time to wait for an interrupted kernel to free its memory before it gets shut down
+INTERRUPT_GRACE_PERIOD = 30  # seconds
+# kernels are preferred by the OOM killer over the Jupyter server and other workspace processes
+KERNEL_OOM_SCORE_ADJ = 500
+MAX_EVENTS = 100
+
+
+def _read_memory_stat(path: str) -> dict:
+    memory_stat = {}
+    for line in (_read_file(path) or "").splitlines():
+        key, _, value = line.partition(" ")
+        if value.isdigit():
+            memory_stat[key] = int(value)
+    return memory_stat
+
+
+def get_memory_limit() -> int:
+    """Memory limit of the container in bytes as detected by the resource topology."""
+    try:
+        memory_limit = load_resource_topology()["memory_limit"]
+    except Exception:
+        memory_limit = None
+    return int(memory_limit) if memory_limit else psutil.virtual_memory().total
+
+
+def get_memory_usage() -> int:
+    """Return the memory usage of the container in bytes (without reclaimable page cache)."""
+    # cgroup v2
+    memory_current = _read_file(os.path.join(CGROUP_ROOT, "memory.current"))
+    if memory_current and memory_current.isdigit():
+        usage = int(memory_current)
+        usage -= _read_memory_stat(os.path.join(CGROUP_ROOT, "memory.stat")).get("inactive_file", 0)
+        return max(usage, 0)
+
+    # cgroup v1
+    usage_in_bytes = _read_file(os.path.join(CGROUP_ROOT, "memory", "memory.usage_in_bytes"))
+    if usage_in_bytes and usage_in_bytes.isdigit():
+        usage = int(usage_in_bytes)
+        usage -= _read_memory_stat(os.path.join(CGROUP_ROOT, "memory", "memory.stat")).get(
+            "total_inactive_file", 0
+        )
+        return max(usage, 0)
+
+    # no cgroup memory controller available
+    virtual_memory = psutil.virtual_memory()
+    return virtual_memory.total - virtual_memory.available
+
+
+def get_memory_pressure() -> Optional[dict]:
+    """Return the PSI memory pressure (avg10 of some and full), or None if PSI is not available."""
+    for pressure_file in [os.path.join(CGROUP_ROOT, "memory.pressure"), "/proc/pressure/memory"]:
+        pressure_content = _read_file(pressure_file)
+        if not pressure_content:
+            continue
+
+        pressure = {}
+        # format: some avg10=0.00 avg60=0.00 avg300=0.00 total=0
+        for line in pressure_content.splitlines():
+            values = line.split()
+            for value in values[1:]:
+                if value.startswith("avg10="):
+                    pressure[values[0]] = float(value[len("avg10="):])
+        return pressure
+    return None
+
+
+def get_kernel_pid(kernel) -> Optional[int]:
+    # jupyter_client >= 7 starts kernels via provisioners
+    provisioner = getattr(kernel, "provisioner", None)
+    if provisioner is not None and getattr(provisioner, "pid", None):
+        return provisioner.pid
+    return getattr(getattr(kernel, "kernel", None), "pid", None)
+
+
+def get_process_memory(pid: int) -> int:
+    """Resident memory of a process including all of its child processes in bytes."""
+    try:
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+    except psutil.Error:
+        return 0
+
+    memory = 0
+    for process in processes:
+        try:
+            memory += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return memory
+
+
+class MemoryCuller:
+    def __init__(self, kernel_manager, log, culling_threshold: int = DEFAULT_CULLING_THRESHOLD):
+        self.kernel_manager = kernel_manager
+        self.log = log
+        self.culling_threshold = culling_threshold
+        self.warning_threshold = culling_threshold - WARNING_THRESHOLD_OFFSET
+        # the limit does not change while the container is running
+        self.memory_limit = get_memory_limit()
+        self.events = collections.deque(maxlen=MAX_EVENTS)
+        self.status = {}
+        self._warned = False
+        self._interrupted_kernels = {}
+        self._adjusted_pids = set()
+
+    def add_event(self, action: str, kernel: dict = None) -> None:
+        event = {
+            "timestamp": time.time(),
+            "action": action,
+            "memoryUsage": self.status.get("memoryUsage"),
+            "memoryLimit": self.status.get("memoryLimit"),
+            "memoryPressure": self.status.get("memoryPressure"),
+        }
+        if kernel:
+            event["kernel"] = {key: kernel[key] for key in ["id", "name", "memory"]}
+        self.events.append(event)
+
+    def adjust_oom_scores(self) -> None:
+        # if the OOM killer still kicks in, it should kill a kernel instead of the Jupyter server
+        kernel_pids = set()
+        for kernel_id in list(self.kernel_manager.list_kernel_ids()):
+            try:
+                pid = get_kernel_pid(self.kernel_manager.get_kernel(kernel_id))
+            except KeyError:
+                continue
+            if not pid:
+                continue
+
+            kernel_pids.add(pid)
+            if pid in self._adjusted_pids:
+                continue
+
+            self._adjusted_pids.add(pid)
+            try:
+                with open("/proc/" + str(pid) + "/oom_score_adj", "w") as file:
+                    file.write(str(KERNEL_OOM_SCORE_ADJ))
+            except Exception:
+                pass
+
+        # forget the pids of kernels that were shut down
+        self._adjusted_pids &= kernel_pids
+
+    def get_kernels(self) -> list:
+        kernels = []
+        for kernel_id in list(self.kernel_manager.list_kernel_ids()):
+            try:
+                kernel = self.kernel_manager.get_kernel(kernel_id)
+            except KeyError:
+                # kernel was shut down in the meantime
+                continue
+
+            pid = get_kernel_pid(kernel)
+            last_activity = getattr(kernel, "last_activity", None)
+            kernels.append(
+                {
+                    "id": kernel_id,
+                    "name": getattr(kernel, "kernel_name", None),
+                    "executionState": getattr(kernel, "execution_state", None),
+                    "lastActivity": last_activity.timestamp() if last_activity else 0,
+                    "memory": get_process_memory(pid) if pid else 0,
+                }
+            )
+        return kernels
+
+    def update_status(self) -> None:
+        memory_usage = get_memory_usage()
+        memory_pressure = get_memory_pressure()
+        self.status = {
+            "memoryUsage": memory_usage,
+            "memoryLimit": self.memory_limit,
+            "memoryPercent": round(memory_usage / self.memory_limit * 100, 1) if self.memory_limit else 0,
+            "memoryPressure": memory_pressure,
+        }
+
+    def is_under_pressure(self) -> bool:
+        memory_pressure = self.status["memoryPressure"] or {}
+        if self.status["memoryPercent"] >= self.culling_threshold:
+            return True
+        # stalls on memory are only relevant if the memory is actually used by the workspace
+        return (
+            memory_pressure.get("full", 0) >= PRESSURE_THRESHOLD
+            and self.status["memoryPercent"] >= self.warning_threshold
+        )
+
+    async def shutdown_kernel(self, kernel: dict, reason: str) -> None:
+        self.log.warning(
+            "Shutting down kernel " + kernel["id"] + " (" + str(kernel["name"]) + ") using "
+            + str(round(kernel["memory"] / 1024 / 1024)) + " MB of memory: " + reason
+        )
+        result = self.kernel_manager.shutdown_kernel(kernel["id"])
+        if inspect.isawaitable(result):
+            await result
+        self._interrupted_kernels.pop(kernel["id"], None)
+        self.add_event("shutdown", kernel)
+
+    async def interrupt_kernel(self, kernel: dict) -> None:
+        self.log.warning(
+            "Interrupting kernel " + kernel["id"] + " (" + str(kernel["name"]) + ") using "
+            + str(round(kernel["memory"] / 1024 / 1024)) + " MB of memory."
+        )
+        result = self.kernel_manager.interrupt_kernel(kernel["id"])
+        if inspect.isawaitable(result):
+            await result
+        self._interrupted_kernels[kernel["id"]] = time.time()
+        self.add_event("interrupt", kernel)
+
+    async def cull(self) -> None:
+        kernels = self.get_kernels()
+        target_usage = self.status["memoryLimit"] * self.warning_threshold / 100
+        memory_usage = self.status["memoryUsage"]
+
+        # least recently used first, largest first if used at the same time
+        idle_kernels = sorted(
+            [kernel for kernel in kernels if kernel["executionState"] != "busy"],
+            key=lambda kernel: (kernel["lastActivity"], -kernel["memory"]),
+        )
+        for kernel in idle_kernels:
+            if memory_usage <= target_usage:
+                return
+            await self.shutdown_kernel(kernel, "memory usage above " + str(self.culling_threshold) + "%")
+            memory_usage -= kernel["memory"]
+
+        if memory_usage <= target_usage:
+            return
+
+        busy_kernels = sorted(
+            [kernel for kernel in kernels if kernel["executionState"] == "busy"],
+            key=lambda kernel: kernel["memory"],
+            reverse=True,
+        )
+        if not busy_kernels:
+            return
+
+        largest_kernel = busy_kernels[0]
+        interrupt_time = self._interrupted_kernels.get(largest_kernel["id"])
+        if interrupt_time is None:
+            await self.interrupt_kernel(largest_kernel)
+        elif time.time() - interrupt_time > INTERRUPT_GRACE_PERIOD:
+            await self.shutdown_kernel(largest_kernel, "memory was not freed after interrupt")
+
+    async def check(self) -> None:
+        try:
+            self.adjust_oom_scores()
+            self.update_status()
+            if self.is_under_pressure():
+                await self.cull()
+            elif self.status["memoryPercent"] >= self.warning_threshold:
+                if not self._warned:
+                    self._warned = True
+                    self.log.warning(
+                        "Workspace memory usage is at " + str(self.status["memoryPercent"])
+                        + "%. Idle kernels will be shut down above " + str(self.culling_threshold) + "%."
+                    )
+                    self.add_event("warning")
+            else:
+                self._warned = False
+                self._interrupted_kernels = {}
+        except Exception as ex:
+            self.log.warning("Failed to check memory usage of kernels: " + str(ex))
+
+    def start(self) -> None:
+        PeriodicCallback(self.check, CHECK_INTERVAL).start()
+
+    def get_status(self) -> dict:
+        status = dict(self.status)
+        status["cullingThreshold"] = self.culling_threshold
+        status["warningThreshold"] = self.warning_threshold
+        status["kernels"] = self.get_kernels()
+        status["events"] = list(self.events)
+        return status
@@ -0,0 +1,172 @@
+"""
+Prometheus metrics of the tooling extension, exposed via /tooling/metrics.
+
+Request latencies of all tooling handlers are recorded when tornado logs the request, subprocesses
+(git, filebrowser, supervisorctl, tar, ...) and storage scans (du) are recorded where they are
+executed. Metrics are kept in a separate registry, the metrics of the notebook server itself are
+available via /metrics. Recording a value only updates a few in-memory counters, workspace and
+container size are read from the workspace metadata at scrape time. The metrics (and
+prometheus_client) are created on the first recorded value, not on extension load.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+HOME = os.getenv("HOME", "/home/ml")
+# written by the storage check (update_workspace_metadata in tooling_handler.py)
+WORKSPACE_METADATA_FILE = os.path.join(HOME, ".workspace", "metadata.json")
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def _get_metadata_size(key: str) -> float:
+    """Size in bytes from the workspace metadata, NaN if it was not calculated (yet)."""
+    try:
+        with open(WORKSPACE_METADATA_FILE, "r") as file:
+            size_in_kb = json.load(file).get(key)
+    except Exception:
+        return float("nan")
+    return float(size_in_kb) * 1024 if size_in_kb is not None else float("nan")
+
+
+class ToolingMetrics:
+    def __init__(self):
+        from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+        self.registry = CollectorRegistry()
+
+        self.request_duration = Histogram(
+            "tooling_request_duration_seconds",
+            "Duration of requests to the tooling extension.",
+            ["handler", "method", "status_code"],
+            # most requests are fast, streaming requests (export/import, events) can take minutes
+            buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+            registry=self.registry,
+        )
+
+        self.subprocess_invocations = Counter(
+            "tooling_subprocess_invocations_total",
+            "Subprocesses started by the tooling extension.",
+            ["command"],
+            registry=self.registry,
+        )
+
+        self.subprocess_failures = Counter(
+            "tooling_subprocess_failures_total",
+            "Subprocesses of the tooling extension that failed.",
+            ["command"],
+            registry=self.registry,
+        )
+
+        self.subprocess_duration = Histogram(
+            "tooling_subprocess_duration_seconds",
+            "Duration of subprocesses started by the tooling extension.",
+            ["command"],
+            buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+            registry=self.registry,
+        )
+
+        self.scan_duration = Histogram(
+            "tooling_scan_duration_seconds",
+            "Duration of storage scans (container size, workspace folder size).",
+            ["scan"],
+            buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+            registry=self.registry,
+        )
+
+        Gauge(
+            "tooling_container_size_bytes",
+            "Disk usage of the container as measured by the latest storage check.",
+            registry=self.registry,
+        ).set_function(lambda: _get_metadata_size("container_size_in_kb"))
+
+        Gauge(
+            "tooling_workspace_folder_size_bytes",
+            "Disk usage of the workspace folder as measured by the latest storage check.",
+            registry=self.registry,
+        ).set_function(lambda: _get_metadata_size("workspace_folder_size_in_kb"))
+
+
+def get_metrics() -> ToolingMetrics:
+    global _metrics
+    if _metrics is None:
+        # subprocesses are also tracked in threads (e.g. storage check)
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = ToolingMetrics()
+    return _metrics
+
+
+def generate_latest() -> tuple:
+    """Content type and content of the metrics in the prometheus text format."""
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest as generate_latest_metrics
+
+    return CONTENT_TYPE_LATEST, generate_latest_metrics(get_metrics().registry)
+
+
+def observe_request(handler) -> None:
+    get_metrics().request_duration.labels(
+        handler=type(handler).__name__,
+        method=handler.request.method,
+        status_code=handler.get_status(),
+    ).observe(handler.request.request_time())
+
+
+def count_subprocess(command: str, failed: bool = False) -> None:
+    """Count a subprocess whose duration is not tracked (e.g. streaming subprocesses)."""
+    if failed:
+        get_metrics().subprocess_failures.labels(command=command).inc()
+    else:
+        get_metrics().subprocess_invocations.labels(command=command).inc()
+
+
+class TrackedSubprocess:
+    def __init__(self):
+        # set by the caller for subprocesses that return their exit code instead of raising
+        self.exit_code = 0
+
+
+def _get_exit_code(exception: Exception) -> Optional[int]:
+    # CalledProcessError (subprocess) or GitCommandError (GitPython)
+    for attribute in ["returncode", "status"]:
+        exit_code = getattr(exception, attribute, None)
+        if isinstance(exit_code, int):
+            return exit_code
+    return None
+
+
+@contextmanager
+def track_subprocess(command: str, expected_exit_codes: tuple = (0,)):
+    """Count and time the subprocess(es) executed in the context.
+
+    Exceptions and exit codes (set on the yielded object) that are not expected are counted as failures.
+    """
+    metrics = get_metrics()
+    metrics.subprocess_invocations.labels(command=command).inc()
+    tracked_subprocess = TrackedSubprocess()
+    start_time = time.perf_counter()
+    try:
+        yield tracked_subprocess
+    except Exception as ex:
+        if _get_exit_code(ex) not in expected_exit_codes:
+            metrics.subprocess_failures.labels(command=command).inc()
+        raise
+    else:
+        if tracked_subprocess.exit_code not in expected_exit_codes:
+            metrics.subprocess_failures.labels(command=command).inc()
+    finally:
+        metrics.subprocess_duration.labels(command=command).observe(time.perf_counter() - start_time)
+
+
+@contextmanager
+def track_scan(scan: str):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_metrics().scan_duration.labels(scan=scan).observe(time.perf_counter() - start_time)
@@ -0,0 +1,238 @@
+"""
+Bounded buffer for kernel messages while no browser is connected.
+
+The notebook server buffers all kernel messages of a disconnected session in memory
+(buffer_offline_messages), so a long-running job that prints progress can push the server
+into OOM. This buffer keeps a limited amount of messages in memory and spills them into
+compressed segment files afterwards. Consecutive stream messages (stdout/stderr) are coalesced
+and carriage-return progress output (e.g. tqdm) is collapsed to its final state before
+spilling and on replay. If the disk limit is exceeded, the oldest segments are dropped.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import struct
+import tempfile
+from typing import Optional
+
+from notebook.services.kernels.kernelmanager import MappingKernelManager
+from traitlets import Integer
+
+DELIMITER = b"<IDS|MSG>"
+# coalesced stream messages are split after this amount of text
+MAX_COALESCED_TEXT = 1024 * 1024
+
+
+def collapse_carriage_returns(text: str) -> str:
+    """Keep only the final state of lines that are rewritten via carriage returns."""
+    if "\r" not in text:
+        return text
+
+    collapsed_lines = []
+    for line in text.replace("\r\n", "\n").split("\n"):
+        # a trailing carriage return is kept, the line gets overwritten by the next message
+        line_content = line.rstrip("\r")
+        if "\r" in line_content:
+            line = line[line_content.rfind("\r") + 1:]
+        collapsed_lines.append(line)
+    return "\n".join(collapsed_lines)
+
+
+def get_stream_message(msg_parts: list) -> Optional[tuple]:
+    """Return (identities, header, parent_header, metadata, content) of a stream message without buffers."""
+    try:
+        delimiter_index = msg_parts.index(DELIMITER)
+    except ValueError:
+        return None
+
+    frames = msg_parts[delimiter_index + 2:]
+    if len(frames) != 4:
+        # messages with binary buffers are never stream messages
+        return None
+
+    header = json.loads(frames[0])
+    if header.get("msg_type") != "stream":
+        return None
+    return (
+        msg_parts[:delimiter_index],
+        header,
+        json.loads(frames[1]),
+        frames[2],
+        json.loads(frames[3]),
+    )
+
+
+def coalesce_messages(messages: list, session) -> list:
+    """Merge consecutive iopub stream messages of the same stream and cell into one message."""
+    coalesced_messages = []
+    pending = None  # [identities, header, parent, metadata, content]
+
+    def flush():
+        if not pending:
+            return
+        identities, header, parent, metadata, content = pending
+        content["text"] = collapse_carriage_returns(content["text"])
+        frames = [
+            json.dumps(header).encode("utf-8"),
+            json.dumps(parent).encode("utf-8"),
+            metadata,
+            json.dumps(content).encode("utf-8"),
+        ]
+        # changed messages need a new signature, otherwise the websocket handler rejects them
+        coalesced_messages.append(
+            ("iopub", identities + [DELIMITER, session.sign(frames)] + frames)
+        )
+
+    for channel, msg_parts in messages:
+        stream_message = get_stream_message(msg_parts) if channel == "iopub" else None
+        if stream_message:
+            identities, header, parent, metadata, content = stream_message
+            if (
+                pending
+                and pending[2].get("msg_id") == parent.get("msg_id")
+                and pending[4].get("name") == content.get("name")
+                and len(pending[4]["text"]) < MAX_COALESCED_TEXT
+            ):
+                pending[4]["text"] += content.get("text", "")
+                continue
+
+            flush()
+            pending = [identities, header, parent, metadata, content]
+            continue
+
+        flush()
+        pending = None
+        coalesced_messages.append((channel, msg_parts))
+
+    flush()
+    return coalesced_messages
+
+
+def _write_frame(file, data: bytes) -> None:
+    file.write(struct.pack("!I", len(data)))
+    file.write(data)
+
+
+def _read_frame(file) -> Optional[bytes]:
+    length = file.read(4)
+    if len(length) < 4:
+        return None
+    return file.read(struct.unpack("!I", length)[0])
+
+
+class SpillingMessageBuffer:
+    """List-like message buffer as used by the notebook server: append() and iteration for replay."""
+
+    def __init__(self, session, memory_limit: int, disk_limit: int, log):
+        self.session = session
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.log = log
+        self.messages = []
+        self.memory_size = 0
+        # paths of the spilled segment files (oldest first)
+        self.segments = []
+        self.segment_sizes = {}
+        self.message_count = 0
+        self.dropped_segments = 0
+        self.segment_folder = None
+
+    def append(self, message: tuple) -> None:
+        channel, msg_parts = message
+        self.messages.append((channel, [bytes(part) for part in msg_parts]))
+        self.memory_size += sum(len(part) for part in msg_parts)
+        self.message_count += 1
+        if self.memory_size > self.memory_limit:
+            self.spill()
+
+    def spill(self) -> None:
+        if not self.segment_folder:
+            self.segment_folder = tempfile.mkdtemp(prefix="kernel-buffer-")
+
+        segment_path = os.path.join(self.segment_folder, "segment-" + str(len(self.segments) + self.dropped_segments))
+        # fast compression, output mostly consists of highly compressible text
+        with gzip.open(segment_path, "wb", compresslevel=1) as file:
+            for channel, msg_parts in coalesce_messages(self.messages, self.session):
+                _write_frame(file, channel.encode("utf-8"))
+                _write_frame(file, struct.pack("!I", len(msg_parts)))
+                for part in msg_parts:
+                    _write_frame(file, part)
+
+        self.segments.append(segment_path)
+        self.segment_sizes[segment_path] = os.path.getsize(segment_path)
+        self.messages = []
+        self.memory_size = 0
+
+        while len(self.segments) > 1 and sum(self.segment_sizes.values()) > self.disk_limit:
+            oldest_segment = self.segments.pop(0)
+            self.segment_sizes.pop(oldest_segment)
+            os.remove(oldest_segment)
+            self.dropped_segments += 1
+            self.log.warning("Offline message buffer exceeded the disk limit, dropped the oldest messages.")
+
+    def read_segment(self, segment_path: str):
+        with gzip.open(segment_path, "rb") as file:
+            while True:
+                channel = _read_frame(file)
+                if channel is None:
+                    return
+                part_count = struct.unpack("!I", _read_frame(file))[0]
+                yield channel.decode("utf-8"), [_read_frame(file) for _ in range(part_count)]
+
+    def __len__(self) -> int:
+        return self.message_count
+
+    def __bool__(self) -> bool:
+        return self.message_count > 0
+
+    def __iter__(self):
+        try:
+            for segment_path in list(self.segments):
+                yield from self.read_segment(segment_path)
+            yield from coalesce_messages(self.messages, self.session)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self.messages = []
+        self.memory_size = 0
+        self.segments = []
+        self.segment_sizes = {}
+        if self.segment_folder:
+            shutil.rmtree(self.segment_folder, ignore_errors=True)
+            self.segment_folder = None
+
+
+class BufferingKernelManager(MappingKernelManager):
+    """Kernel manager that buffers messages of disconnected sessions in a bounded, disk-spilled buffer."""
+
+    offline_buffer_memory_limit = Integer(
+        8 * 1024 * 1024, config=True, help="Bytes of offline messages kept in memory per kernel."
+    )
+
+    offline_buffer_disk_limit = Integer(
+        512 * 1024 * 1024, config=True, help="Bytes of compressed offline messages spilled to disk per kernel."
+    )
+
+    def start_buffering(self, kernel_id, session_key, channels):
+        super().start_buffering(kernel_id, session_key, channels)
+        buffer_info = self._kernel_buffers.get(kernel_id)
+        if not buffer_info or "buffer" not in buffer_info:
+            # buffering is deactivated
+            return
+
+        # messages are appended to buffer_info["buffer"] by the buffering callback of the notebook server
+        buffer_info["buffer"] = SpillingMessageBuffer(
+            self.get_kernel(kernel_id).session,
+            self.offline_buffer_memory_limit,
+            self.offline_buffer_disk_limit,
+            self.log,
+        )
+
+    def stop_buffering(self, kernel_id):
+        buffer_info = self._kernel_buffers.get(kernel_id) or {}
+        super().stop_buffering(kernel_id)
+        if isinstance(buffer_info.get("buffer"), SpillingMessageBuffer):
+            buffer_info["buffer"].close()
@@ -0,0 +1,212 @@
+"""
+Kernel-side spooler for oversized cell outputs.
+
+Loaded as IPython extension via ipython_config.py. Stream output (stdout/stderr) of a cell and
+single display outputs that exceed the threshold are written to files in ~/.workspace/outputs.
+The notebook only receives a truncated preview and a link to the full output, which is served
+by the tooling extension (/tooling/outputs/<file>, supports range requests). Saved notebooks
+link to the spooled files, so they are only deleted if a retention is configured.
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Optional
+
+HOME = os.getenv("HOME", "/home/ml")
+OUTPUTS_FOLDER = os.path.join(HOME, ".workspace", "outputs")
+DEFAULT_THRESHOLD = 5 * 1024 * 1024  # bytes
+# characters of the text representation that are kept in the notebook for spooled display outputs
+PREVIEW_LENGTH = 2000
+
+
+def get_threshold(value: str) -> Optional[int]:
+    """Parse the spooling threshold in bytes from the env variable value."""
+    if not value or value.lower().strip() == "false":
+        return None
+    try:
+        threshold = int(value)
+    except ValueError:
+        return DEFAULT_THRESHOLD
+    return threshold if threshold > 0 else None
+
+
+def get_retention(value: str) -> Optional[int]:
+    """Parse the retention of spooled outputs (in days) from the env variable value, returns seconds."""
+    if not value or value.lower().strip() == "false":
+        return None
+    try:
+        retention_days = int(value)
+    except ValueError:
+        return None
+    return retention_days * 24 * 60 * 60 if retention_days > 0 else None
+
+
+def get_output_url(file_name: str) -> str:
+    base_url = os.getenv("WORKSPACE_BASE_URL", "/").rstrip("/")
+    return base_url + "/tooling/outputs/" + file_name
+
+
+def format_size(size: int) -> str:
+    return str(round(size / 1024 / 1024, 1)) + " MB"
+
+
+def create_output_file(extension: str) -> tuple:
+    if not os.path.exists(OUTPUTS_FOLDER):
+        os.makedirs(OUTPUTS_FOLDER)
+    file_name = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8] + extension
+    return file_name, os.path.join(OUTPUTS_FOLDER, file_name)
+
+
+def remove_expired_outputs(retention: int) -> None:
+    """Delete spooled outputs that are older than the retention (in seconds)."""
+    if not os.path.isdir(OUTPUTS_FOLDER):
+        return
+    for file_name in os.listdir(OUTPUTS_FOLDER):
+        file_path = os.path.join(OUTPUTS_FOLDER, file_name)
+        try:
+            if time.time() - os.path.getmtime(file_path) > retention:
+                os.remove(file_path)
+        except OSError:
+            pass
+
+
+def get_bundle_size(data: dict) -> int:
+    size = 0
+    for value in data.values():
+        size += len(value) if isinstance(value, (str, bytes)) else len(json.dumps(value))
+    return size
+
+
+class StreamSpool:
+    """Spools the output of one stream (stdout or stderr) once it exceeds the threshold within a cell."""
+
+    def __init__(self, stream, threshold: int):
+        self.stream = stream
+        self.threshold = threshold
+        self.write_stream = stream.write
+        self.reset()
+
+    def reset(self) -> None:
+        self.size = 0
+        # output below the threshold, written into the spool file as well once the threshold is exceeded
+        self.preview = []
+        self.file = None
+        self.file_name = None
+
+    def write(self, string: str) -> int:
+        if self.file:
+            self.file.write(string)
+            self.size += len(string)
+            return len(string)
+
+        self.size += len(string)
+        if self.size <= self.threshold:
+            self.preview.append(string)
+            return self.write_stream(string)
+
+        self.file_name, file_path = create_output_file(".txt")
+        self.file = open(file_path, "w")
+        self.file.write("".join(self.preview))
+        self.file.write(string)
+        self.preview = []
+        self.write_stream(
+            "\n[Output exceeds " + format_size(self.threshold) + ", the rest is written to "
+            + get_output_url(self.file_name) + "]\n"
+        )
+        return len(string)
+
+    def finish(self) -> Optional[str]:
+        """Close the spool file of the finished cell, returns the file name if output was spooled."""
+        file_name = self.file_name
+        if self.file:
+            self.file.close()
+        self.reset()
+        return file_name
+
+
+class OutputSpooler:
+    def __init__(self, ipython, threshold: int):
+        self.ipython = ipython
+        self.threshold = threshold
+        self.stream_spools = []
+
+    def register(self) -> None:
+        for stream in [sys.stdout, sys.stderr]:
+            stream_spool = StreamSpool(stream, self.threshold)
+            stream.write = stream_spool.write
+            self.stream_spools.append(stream_spool)
+
+        self.publish = self.ipython.display_pub.publish
+        self.ipython.display_pub.publish = self.publish_display
+        self.write_format_data = self.ipython.displayhook.write_format_data
+        self.ipython.displayhook.write_format_data = self.write_execute_result
+
+        self.ipython.events.register("pre_run_cell", self.pre_run_cell)
+        self.ipython.events.register("post_run_cell", self.post_run_cell)
+
+    def pre_run_cell(self, *args, **kwargs) -> None:
+        for stream_spool in self.stream_spools:
+            stream_spool.finish()
+
+    def post_run_cell(self, *args, **kwargs) -> None:
+        for stream_spool in self.stream_spools:
+            size = stream_spool.size
+            file_name = stream_spool.finish()
+            if file_name:
+                stream_spool.stream.flush()
+                self.publish(self.get_link_bundle(file_name, size, "Full " + stream_spool.stream.name + " output"))
+
+    def get_link_bundle(self, file_name: str, size: int, title: str, preview: str = "") -> dict:
+        url = get_output_url(file_name)
+        return {
+            "text/plain": (preview + "\n" if preview else "") + title + " (" + format_size(size) + "): " + url,
+            "text/html": (
+                ("<pre>" + preview.replace("&", "&amp;").replace("<", "&lt;") + "</pre>" if preview else "")
+                + "<div>" + title + " (" + format_size(size) + "): "
+                + '<a href="' + url + '" target="_blank">' + file_name + "</a></div>"
+            ),
+        }
+
+    def spool_bundle(self, data: dict, metadata: dict) -> dict:
+        """Write the display data to a file and return a replacement bundle with a preview and a link."""
+        file_name, file_path = create_output_file(".json")
+        with open(file_path, "w") as file:
+            json.dump({"data": data, "metadata": metadata or {}}, file)
+
+        preview = str(data.get("text/plain", ""))[:PREVIEW_LENGTH]
+        return self.get_link_bundle(file_name, get_bundle_size(data), "Output too large, stored as", preview)
+
+    def publish_display(self, data, metadata=None, *args, **kwargs):
+        if get_bundle_size(data) > self.threshold:
+            data = self.spool_bundle(data, metadata)
+            metadata = {}
+        return self.publish(data, metadata, *args, **kwargs)
+
+    def write_execute_result(self, format_dict, md_dict=None):
+        if get_bundle_size(format_dict) > self.threshold:
+            format_dict = self.spool_bundle(format_dict, md_dict)
+            md_dict = {}
+        return self.write_format_data(format_dict, md_dict)
+
+
+def load_ipython_extension(ipython) -> None:
+    if getattr(ipython, "kernel", None) is None:
+        # not running in a Jupyter kernel (e.g. terminal IPython)
+        return
+
+    threshold = get_threshold(os.getenv("OUTPUT_SPOOLING_THRESHOLD", "false"))
+    if not threshold:
+        return
+
+    # spooled outputs are kept (linked in saved notebooks) unless a retention is configured
+    retention = get_retention(os.getenv("OUTPUT_SPOOLING_RETENTION", "false"))
+    if retention:
+        try:
+            remove_expired_outputs(retention)
+        except Exception:
+            pass
+
+    OutputSpooler(ipython, threshold).register()
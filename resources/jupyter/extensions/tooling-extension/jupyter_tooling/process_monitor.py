@@ -0,0 +1,177 @@
+"""
+Process resource monitor.
+
+A background thread samples CPU, memory, IO and open file descriptors of all processes in one
+psutil pass per interval and keeps the samples of the last minutes in a ring buffer. Requests
+(/tooling/processes) are served from the buffer, so any number of browser tabs can read it without
+additional process scans. The thread is started on the first request and stops if nobody requested
+the data for a while.
+"""
+
+import collections
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Optional
+
+import psutil
+from tornado.ioloop import IOLoop
+from tornado.locks import Condition
+
+DEFAULT_INTERVAL = 5  # seconds
+HISTORY_LENGTH = 120  # samples
+# processes kept per sample (top processes by CPU and by memory)
+SAMPLED_PROCESSES = 50
+# the sampler thread stops if there was no request within this time
+IDLE_TIMEOUT = 600  # seconds
+
+
+def get_process_label(name: str, cmdline: list) -> str:
+    """Readable name of the process, kernels are labeled with their kernel id."""
+    if cmdline and any("ipykernel" in part for part in cmdline):
+        for part in cmdline:
+            file_name = os.path.basename(part)
+            if file_name.startswith("kernel-") and file_name.endswith(".json"):
+                return "kernel " + file_name[len("kernel-"):-len(".json")]
+        return "kernel"
+    return name
+
+
+class ProcessMonitor:
+    def __init__(self, interval: float = DEFAULT_INTERVAL, log=None):
+        self.interval = interval
+        self.log = log
+        self.history = collections.deque(maxlen=HISTORY_LENGTH)
+        self.cpu_count = psutil.cpu_count() or 1
+        # requests wait on the io loop for the first sample, the sampler thread notifies via the io loop
+        self._io_loop = IOLoop.current()
+        self._sample_condition = Condition()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_access = 0
+        # (pid, create time) -> (timestamp, cpu time, read bytes, write bytes) of the previous sample
+        self._previous_counters = {}
+
+    def sample(self) -> dict:
+        now = time.time()
+        processes = []
+        counters = {}
+        for process in psutil.process_iter(
+            ["name", "cmdline", "username", "create_time", "cpu_times", "memory_info", "io_counters", "num_fds"]
+        ):
+            info = process.info
+            if info["cpu_times"] is None or info["memory_info"] is None:
+                # e.g. process exited or access denied
+                continue
+
+            process_key = (process.pid, info["create_time"])
+            cpu_time = info["cpu_times"].user + info["cpu_times"].system
+            read_bytes = info["io_counters"].read_bytes if info["io_counters"] else 0
+            write_bytes = info["io_counters"].write_bytes if info["io_counters"] else 0
+            counters[process_key] = (now, cpu_time, read_bytes, write_bytes)
+
+            cpu_percent = read_rate = write_rate = 0.0
+            previous_counters = self._previous_counters.get(process_key)
+            if previous_counters and now > previous_counters[0]:
+                elapsed_time = now - previous_counters[0]
+                cpu_percent = 100 * (cpu_time - previous_counters[1]) / elapsed_time
+                read_rate = (read_bytes - previous_counters[2]) / elapsed_time
+                write_rate = (write_bytes - previous_counters[3]) / elapsed_time
+
+            processes.append(
+                {
+                    "pid": process.pid,
+                    "created": info["create_time"],
+                    "name": get_process_label(info["name"], info["cmdline"]),
+                    "user": info["username"],
+                    "cpuPercent": round(cpu_percent, 1),
+                    "memory": info["memory_info"].rss,
+                    "readRate": round(read_rate),
+                    "writeRate": round(write_rate),
+                    "openFiles": info["num_fds"],
+                }
+            )
+        self._previous_counters = counters
+
+        top_processes = {}
+        for sort_key in ["cpuPercent", "memory"]:
+            for process in sorted(processes, key=lambda process: process[sort_key], reverse=True)[:SAMPLED_PROCESSES]:
+                top_processes[process["pid"]] = process
+
+        sample = {
+            "timestamp": now,
+            "cpuPercent": round(sum(process["cpuPercent"] for process in processes), 1),
+            "memory": sum(process["memory"] for process in processes),
+            "processCount": len(processes),
+            "processes": list(top_processes.values()),
+        }
+        with self._lock:
+            self.history.append(sample)
+        self._io_loop.add_callback(self._sample_condition.notify_all)
+        return sample
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sample()
+            except Exception as ex:
+                if self.log:
+                    self.log.warning("Failed to sample processes: " + str(ex))
+            time.sleep(self.interval)
+            with self._lock:
+                if time.time() - self._last_access > IDLE_TIMEOUT:
+                    self._thread = None
+                    return
+
+    def ensure_sampling(self) -> None:
+        """Start the sampler thread if it is not running, the thread takes the first sample."""
+        with self._lock:
+            self._last_access = time.time()
+            if self._thread:
+                return
+            # the buffer is outdated if the thread was not running
+            self.history.clear()
+            thread = threading.Thread(target=self._run, name="process-monitor", daemon=True)
+            thread.start()
+            self._thread = thread
+
+    def has_sample(self) -> bool:
+        with self._lock:
+            return len(self.history) > 0
+
+    async def wait_for_sample(self) -> None:
+        """Wait (on the io loop) until the next sample is available."""
+        await self._sample_condition.wait(timeout=timedelta(seconds=self.interval * 2))
+
+    def get_status(self, top: int = 10, sort_by: str = "cpuPercent", history_length: int = 12) -> Optional[dict]:
+        """Top processes of the latest sample with their recent history, None if there is no sample yet."""
+        with self._lock:
+            if not self.history:
+                return None
+            history = list(self.history)[-history_length:] if history_length > 0 else []
+            latest_sample = self.history[-1]
+
+        top_processes = sorted(latest_sample["processes"], key=lambda process: process[sort_by], reverse=True)[:top]
+        process_history = {(process["pid"], process["created"]): [] for process in top_processes}
+        for sample in history:
+            for process in sample["processes"]:
+                process_key = (process["pid"], process["created"])
+                if process_key in process_history:
+                    process_history[process_key].append(
+                        [sample["timestamp"], process["cpuPercent"], process["memory"]]
+                    )
+
+        return {
+            "interval": self.interval,
+            "cpuCount": self.cpu_count,
+            "timestamp": latest_sample["timestamp"],
+            "cpuPercent": latest_sample["cpuPercent"],
+            "memory": latest_sample["memory"],
+            "processCount": latest_sample["processCount"],
+            "history": [[sample["timestamp"], sample["cpuPercent"], sample["memory"]] for sample in history],
+            "processes": [
+                dict(process, history=process_history[(process["pid"], process["created"])])
+                for process in top_processes
+            ],
+        }
@@ -0,0 +1,122 @@
+"""
+Shared resource usage sampler for the resource usage display (jupyter-resource-usage).
+
+Instead of walking all processes of the server on every request of every tab, a background thread
+samples memory and CPU usage of the server and its child processes (kernels, terminals) once per
+interval. The metrics endpoint (/api/metrics/v1, same format as jupyter-resource-usage) is served
+from the latest sample and the samples are pushed to notebook tabs via server-sent events
+(/tooling/resources/events). The thread is started on the first request and stops if nobody
+requested the data for a while.
+"""
+
+import threading
+import time
+from datetime import timedelta
+from typing import Optional
+
+import psutil
+from tornado.ioloop import IOLoop
+from tornado.locks import Condition
+
+# the resource usage display of the notebook is updated every 5 seconds
+SAMPLING_INTERVAL = 5  # seconds
+# the sampler thread stops if there was no request or event subscriber within this time
+IDLE_TIMEOUT = 60  # seconds
+
+
+class ResourceUsageSampler:
+    def __init__(self, display_config, interval: float = SAMPLING_INTERVAL, log=None):
+        # ResourceUseDisplay configuration of jupyter-resource-usage (limits and warning thresholds)
+        self.display_config = display_config
+        self.interval = interval
+        self.log = log
+        self.metrics = None
+        self.cpu_count = psutil.cpu_count() or 1
+        self._server_process = psutil.Process()
+        # event subscribers are waiting on the io loop, the sampler thread notifies via the io loop
+        self._io_loop = IOLoop.current()
+        self._sample_condition = Condition()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_access = 0
+        # (pid, create time) -> (timestamp, cpu time) of the previous sample
+        self._previous_counters = {}
+
+    def sample(self) -> dict:
+        now = time.time()
+        rss = 0
+        cpu_percent = 0.0
+        counters = {}
+        for process in [self._server_process] + self._server_process.children(recursive=True):
+            try:
+                with process.oneshot():
+                    process_key = (process.pid, process.create_time())
+                    cpu_times = process.cpu_times()
+                    rss += process.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+
+            cpu_time = cpu_times.user + cpu_times.system
+            counters[process_key] = (now, cpu_time)
+            previous_counters = self._previous_counters.get(process_key)
+            if previous_counters and now > previous_counters[0]:
+                cpu_percent += 100 * (cpu_time - previous_counters[1]) / (now - previous_counters[0])
+        self._previous_counters = counters
+
+        metrics = self.get_display_metrics(rss, round(cpu_percent, 1))
+        with self._lock:
+            self.metrics = metrics
+        self._io_loop.add_callback(self._sample_condition.notify_all)
+        return metrics
+
+    def get_display_metrics(self, rss: int, cpu_percent: float) -> dict:
+        """Metrics in the format of the jupyter-resource-usage API."""
+        config = self.display_config
+        if callable(config.mem_limit):
+            mem_limit = config.mem_limit(rss=rss)
+        else:
+            mem_limit = config.mem_limit
+
+        limits = {"memory": {"rss": mem_limit}}
+        if config.mem_limit and config.mem_warning_threshold != 0:
+            limits["memory"]["warn"] = (mem_limit - rss) < (mem_limit * config.mem_warning_threshold)
+
+        metrics = {"rss": rss, "limits": limits}
+        if config.track_cpu_percent:
+            cpu_limit = config.cpu_limit(cpu_percent=cpu_percent) if callable(config.cpu_limit) else config.cpu_limit
+            if cpu_limit != 0:
+                limits["cpu"] = {"cpu": cpu_limit}
+                if config.cpu_warning_threshold != 0:
+                    limits["cpu"]["warn"] = (cpu_limit - cpu_percent) < (cpu_limit * config.cpu_warning_threshold)
+            metrics.update(cpu_percent=cpu_percent, cpu_count=self.cpu_count)
+        return metrics
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sample()
+            except Exception as ex:
+                if self.log:
+                    self.log.warning("Failed to sample resource usage: " + str(ex))
+            time.sleep(self.interval)
+            with self._lock:
+                if time.time() - self._last_access > IDLE_TIMEOUT:
+                    self._thread = None
+                    return
+
+    def get_metrics(self) -> Optional[dict]:
+        """Latest sample, None if the sampler thread was not running and has not taken its first sample yet."""
+        with self._lock:
+            self._last_access = time.time()
+            if self._thread:
+                return self.metrics
+            # the latest sample is outdated if the thread was not running -> the thread takes the first sample
+            self.metrics = None
+            thread = threading.Thread(target=self._run, name="resource-usage-sampler", daemon=True)
+            thread.start()
+            self._thread = thread
+            return None
+
+    async def wait_for_sample(self) -> None:
+        """Wait (on the io loop) until the next sample is available."""
+        await self._sample_condition.wait(timeout=timedelta(seconds=self.interval * 2))
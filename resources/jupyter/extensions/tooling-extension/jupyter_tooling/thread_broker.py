@@ -0,0 +1,107 @@
+"""
+Thread broker: divides the CPU thread budget of the workspace among running kernels.
+
+Busy kernels share the budget equally. Idle kernels get the share they would receive
+if they became busy, so that a newly started cell does not oversubscribe the CPUs.
+Allocations are written to a file that is read by the kernel-side hook (kernel_threads.py).
+"""
+
+import json
+import os
+import sys
+
+from tornado.ioloop import PeriodicCallback
+
+from jupyter_tooling.kernel_threads import THREAD_ALLOCATION_FILE
+
+# the thread budget is detected by the resource topology script (also used in jupyter_notebook_config.py)
+RESOURCES_SCRIPTS_PATH = os.path.join(os.getenv("RESOURCES_PATH", "/resources"), "scripts")
+if RESOURCES_SCRIPTS_PATH not in sys.path:
+    sys.path.append(RESOURCES_SCRIPTS_PATH)
+
+UPDATE_INTERVAL = 1000  # milliseconds
+
+
+def _parse_num_threads(value: str) -> int:
+    return int(value) if value and value.strip().isnumeric() and int(value) > 0 else 0
+
+
+def get_thread_budget() -> int:
+    # docker-entrypoint.py replaces MAX_NUM_THREADS (auto or calibrate) with the resolved number of threads
+    max_num_threads = _parse_num_threads(os.getenv("MAX_NUM_THREADS", ""))
+    if max_num_threads:
+        return max_num_threads
+
+    # based on cpu quota (cgroup v1 & v2) and cpuset of the container
+    try:
+        from resource_topology import load_resource_topology
+
+        max_num_threads = _parse_num_threads(str(load_resource_topology()["max_num_threads"]))
+    except Exception:
+        max_num_threads = 0
+    return max_num_threads or _parse_num_threads(os.getenv("OMP_NUM_THREADS", "")) or os.cpu_count() or 1
+
+
+class ThreadBroker:
+    def __init__(self, kernel_manager, log, thread_budget: int = None):
+        self.kernel_manager = kernel_manager
+        self.log = log
+        self.thread_budget = thread_budget or get_thread_budget()
+        self.kernels = {}
+        self.allocations = {}
+
+    def compute_allocations(self, kernels: list) -> dict:
+        busy_kernels = [kernel["id"] for kernel in kernels if kernel["execution_state"] == "busy"]
+
+        allocations = {}
+        if busy_kernels:
+            busy_share, remainder = divmod(self.thread_budget, len(busy_kernels))
+            for index, kernel_id in enumerate(sorted(busy_kernels)):
+                # distribute remaining threads to the first kernels
+                allocations[kernel_id] = max(1, busy_share + (1 if index < remainder else 0))
+
+        idle_share = max(1, self.thread_budget // (len(busy_kernels) + 1))
+        for kernel in kernels:
+            if kernel["id"] not in allocations:
+                allocations[kernel["id"]] = idle_share
+        return allocations
+
+    def update(self) -> None:
+        try:
+            kernels = self.kernel_manager.list_kernels()
+            self.kernels = {kernel["id"]: kernel for kernel in kernels}
+            allocations = self.compute_allocations(kernels)
+            if allocations == self.allocations:
+                return
+
+            # write atomically, kernels might read the file at any time
+            allocation_folder = os.path.dirname(THREAD_ALLOCATION_FILE)
+            if not os.path.exists(allocation_folder):
+                os.makedirs(allocation_folder)
+            temp_file = THREAD_ALLOCATION_FILE + ".tmp"
+            with open(temp_file, "w") as file:
+                json.dump(allocations, file)
+            os.replace(temp_file, THREAD_ALLOCATION_FILE)
+
+            self.allocations = allocations
+            self.log.debug("Updated kernel thread allocations: " + str(allocations))
+        except Exception as ex:
+            self.log.warning("Failed to update kernel thread allocations: " + str(ex))
+
+    def start(self) -> None:
+        self.update()
+        PeriodicCallback(self.update, UPDATE_INTERVAL).start()
+
+    def get_status(self) -> dict:
+        return {
+            "threadBudget": self.thread_budget,
+            "kernels": [
+                {
+                    "id": kernel_id,
+                    "name": self.kernels.get(kernel_id, {}).get("name"),
+                    "executionState": self.kernels.get(kernel_id, {}).get("execution_state"),
+                    "threads": threads,
+                }
+                for kernel_id, threads in sorted(self.allocations.items())
+            ],
+        }
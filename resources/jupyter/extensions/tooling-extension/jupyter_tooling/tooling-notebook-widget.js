@@ -42,6 +42,131 @@ define([
       components.shareData(notebookPath);
     },
   };
+  /**
+   * Replaces a placeholder of a large output (see contents_manager.py) with the full output
+   */
+  function loadLazyOutput(event) {
+    var cellElement = $(event.target).closest(".cell");
+    var cell = Jupyter.notebook.get_cell(
+      Jupyter.notebook.get_cell_elements().index(cellElement)
+    );
+    if (!cell || !cell.output_area) {
+      return;
+    }
+    event.preventDefault();
+
+    var url = $(event.target).attr("href");
+    var fileName = url.split("/").pop();
+    $.getJSON(url, function (output) {
+      var outputs = cell.output_area.toJSON();
+      for (var i = 0; i < outputs.length; i++) {
+        var metadata = outputs[i].metadata || {};
+        if (
+          metadata.jupyter_tooling &&
+          metadata.jupyter_tooling.lazy_output === fileName
+        ) {
+          outputs[i] = output;
+        }
+      }
+      cell.output_area.clear_output();
+      cell.output_area.fromJSON(outputs);
+      Jupyter.notebook.set_dirty(true);
+    });
+  }
+
+  function humanFileSize(size) {
+    var i = Math.floor(Math.log(size) / Math.log(1024));
+    return (
+      (size / Math.pow(1024, i)).toFixed(1) * 1 +
+      " " +
+      ["B", "kB", "MB", "GB", "TB"][i]
+    );
+  }
+
+  function updateResourceUsage(metrics) {
+    var display = humanFileSize(metrics.rss);
+    var limits = metrics.limits;
+    if (limits.memory && limits.memory.rss) {
+      display += " / " + humanFileSize(limits.memory.rss);
+    }
+    $("#jupyter-resource-usage-display").toggleClass(
+      "jupyter-resource-usage-warn",
+      Boolean(limits.memory && limits.memory.warn)
+    );
+    $("#jupyter-resource-usage-mem").text(display);
+
+    if (metrics.cpu_percent === undefined) {
+      return;
+    }
+    // Display CPU usage as "{percent}% ({usedCpu} / {maxCPU})" e.g. "123% (1 / 8)"
+    $("#jupyter-resource-usage-display-cpu").show();
+    $("#jupyter-resource-usage-display-cpu").toggleClass(
+      "jupyter-resource-usage-warn",
+      Boolean(limits.cpu && limits.cpu.warn)
+    );
+    $("#jupyter-resource-usage-cpu").text(
+      metrics.cpu_percent.toFixed(0) +
+        "% (" +
+        Math.round(metrics.cpu_percent / 100) +
+        " / " +
+        metrics.cpu_count +
+        ")"
+    );
+  }
+
+  /**
+   * Shows memory and CPU usage in the toolbar (replaces the jupyter-resource-usage display).
+   * Samples are pushed by the server (see resource_usage.py) while the tab is visible.
+   */
+  function setupResourceUsageDisplay() {
+    $("#maintoolbar-container").append(
+      $("<div>")
+        .attr("id", "jupyter-resource-usage-display")
+        .addClass("btn-group pull-right")
+        .css("padding", "2px 8px")
+        .append($("<strong>").text("Memory: "))
+        .append(
+          $("<span>")
+            .attr("id", "jupyter-resource-usage-mem")
+            .attr("title", "Actively used Memory (updates every 5s)")
+        )
+    );
+    $("#maintoolbar-container").append(
+      $("<div>")
+        .attr("id", "jupyter-resource-usage-display-cpu")
+        .addClass("btn-group pull-right")
+        .css("padding", "2px 8px")
+        .hide()
+        .append($("<strong>").text(" CPU: "))
+        .append(
+          $("<span>")
+            .attr("id", "jupyter-resource-usage-cpu")
+            .attr("title", "Actively used CPU (updates every 5s)")
+        )
+    );
+    $("head").append(
+      $("<style>").html(
+        ".jupyter-resource-usage-warn { background-color: #FFD2D2; color: #D8000C; }"
+      )
+    );
+
+    var eventSource = null;
+    function updateSubscription() {
+      if (document.hidden && eventSource) {
+        // no updates while nobody is looking
+        eventSource.close();
+        eventSource = null;
+      } else if (!document.hidden && !eventSource) {
+        eventSource = new EventSource(basePath + "tooling/resources/events");
+        eventSource.onmessage = function (event) {
+          updateResourceUsage(JSON.parse(event.data));
+        };
+      }
+    }
+    updateSubscription();
+    document.addEventListener("visibilitychange", updateSubscription, false);
+  }
+
   //---------- REGISTER EXTENSION ------------------------
   /**
    * Adds the jupyter extension to the notebook view (including the respective handler)
@@ -56,6 +181,13 @@ define([
     // Jupyter.toolbar.add_buttons_group([Jupyter.actions.register(share_notebook, 'share_notebook', 'notebook')])
 
     components.checkDiskStorage();
+    setupResourceUsageDisplay();
+
+    $(document).on(
+      "click",
+      "a[href*='/tooling/lazy-outputs/']",
+      loadLazyOutput
+    );
   }
 
   //Loads the extension
@@ -21,6 +21,37 @@ define([
   var components = require("./tooling-shared-components");
   var components = new sharedComponents();
 
+  /**
+   * Adds a row to load the remaining entries of a paginated directory (see contents_manager.py)
+   */
+  function addLoadMoreRow(notebookList, list) {
+    var row = $(
+      '<div class="list_item row"><div class="col-md-12">' +
+        '<a href="#" class="load-more-entries">Show more (' +
+        list.content.length +
+        " of " +
+        list.total +
+        " entries)</a></div></div>"
+    );
+    row.find(".load-more-entries").click(function (event) {
+      event.preventDefault();
+      $(this).text("Loading...");
+      $.getJSON(
+        base_url +
+          "tooling/contents?path=" +
+          encodeURIComponent(list.path) +
+          "&offset=" +
+          list.content.length,
+        function (page) {
+          list.content = list.content.concat(page.content);
+          list.truncated = list.content.length < page.total;
+          notebookList.draw_notebook_list(list);
+        }
+      );
+    });
+    notebookList.element.append(row);
+  }
+
   //---------- REGISTER EXTENSION ------------------------
   /**
    * Adds the jupyter extension to the tree view (including the respective handler)
@@ -130,6 +161,14 @@ define([
     };
     Jupyter.notebook_list._selection_changed();
 
+    var _draw_notebook_list = Jupyter.notebook_list.__proto__.draw_notebook_list;
+    Jupyter.notebook_list.__proto__.draw_notebook_list = function (list) {
+      _draw_notebook_list.apply(this, arguments);
+      if (list && list.truncated) {
+        addLoadMoreRow(this, list);
+      }
+    };
+
     components.checkDiskStorage();
   }
 
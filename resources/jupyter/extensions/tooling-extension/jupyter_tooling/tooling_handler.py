@@ -1,18 +1,26 @@
 import glob
+import importlib.util
 import json
 import os
+import signal
 import subprocess
 import threading
 import time
 import warnings
 from datetime import datetime
 from subprocess import call
+from typing import Optional
 
-import git
 import tornado
-from notebook.base.handlers import IPythonHandler
+from notebook.base.handlers import AuthenticatedFileHandler, IPythonHandler, path_regex
+from notebook.log import log_request
+from notebook.services.contents.handlers import ContentsHandler, validate_model
 from notebook.utils import url_path_join
 from tornado import web
+from tornado.iostream import StreamClosedError
+from tornado.process import Subprocess
+
+from jupyter_tooling import metrics
 
 try:
     from urllib.parse import unquote
@@ -25,6 +33,10 @@ HOME = os.getenv("HOME", "/home/ml")
 RESOURCES_PATH = os.getenv("RESOURCES_PATH", "/resources")
 WORKSPACE_HOME = os.getenv("WORKSPACE_HOME", "/workspace")
 WORKSPACE_CONFIG_FOLDER = os.path.join(HOME, ".workspace")
+# written by run_workspace.py at container startup
+STARTUP_PROFILE_FILE = os.path.join(WORKSPACE_CONFIG_FOLDER, "startup-profile.json")
+# oversized cell outputs written by the output spooler of the kernels
+OUTPUTS_FOLDER = os.path.join(WORKSPACE_CONFIG_FOLDER, "outputs")
 
 MAX_WORKSPACE_FOLDER_SIZE = os.getenv("MAX_WORKSPACE_FOLDER_SIZE", None)
 if MAX_WORKSPACE_FOLDER_SIZE and MAX_WORKSPACE_FOLDER_SIZE.isnumeric():
@@ -38,6 +50,80 @@ if MAX_CONTAINER_SIZE and MAX_CONTAINER_SIZE.isnumeric():
 else:
     MAX_CONTAINER_SIZE = None
 
+THREAD_BROKER_ENABLED = (
+    os.getenv("THREAD_BROKER_ENABLED", "false").lower().strip() == "true"
+)
+# divides the thread budget among running kernels, started on extension load if enabled
+thread_broker = None
+
+# workspace export/import: archive is streamed through tar and multithreaded zstd, never staged on disk
+WORKSPACE_ARCHIVE_CHUNK_SIZE = 1024 * 1024  # bytes
+WORKSPACE_ARCHIVE_COMPRESSION = "zstd -T0 -3"
+MAX_WORKSPACE_IMPORT_SIZE = 1024 * 1024 * 1024 * 1024  # bytes
+
+# feature modules (and their dependencies, e.g. psutil) are only imported if the feature is enabled
+
+CULL_KERNELS_ON_MEMORY_PRESSURE = os.getenv("CULL_KERNELS_ON_MEMORY_PRESSURE", "false")
+DEFAULT_CULLING_THRESHOLD = 90  # percent of memory limit
+# the culling threshold needs to be above the warning threshold of the memory culler
+MIN_CULLING_THRESHOLD = 10  # percent
+# shuts down kernels on high memory usage, started on extension load if enabled
+memory_culler = None
+
+# sampling interval of the process monitor in seconds (false to deactivate)
+PROCESS_MONITOR_INTERVAL = os.getenv("PROCESS_MONITOR_INTERVAL", "5")
+DEFAULT_PROCESS_MONITOR_INTERVAL = 5  # seconds
+# samples all processes into a ring buffer, the sampler thread is started on the first request
+process_monitor = None
+
+# shared sampler of the resource usage display (replaces the per-request scans of jupyter-resource-usage),
+# created on the first request
+resource_usage = None
+resource_usage_lock = threading.Lock()
+nb_server_app = None
+
+
+def get_culling_threshold(value: str) -> Optional[int]:
+    """Parse the culling threshold (in percent of the memory limit) from the env variable value."""
+    if not value or value.lower().strip() == "false":
+        return None
+
+    try:
+        threshold = int(value)
+    except ValueError:
+        return DEFAULT_CULLING_THRESHOLD
+
+    if threshold <= MIN_CULLING_THRESHOLD or threshold > 100:
+        return DEFAULT_CULLING_THRESHOLD
+    return threshold
+
+
+def get_process_monitor_interval(value: str) -> Optional[float]:
+    """Parse the sampling interval in seconds from the env variable value."""
+    if not value or value.lower().strip() == "false":
+        return None
+    try:
+        interval = float(value)
+    except ValueError:
+        return DEFAULT_PROCESS_MONITOR_INTERVAL
+    return interval if interval > 0 else None
+
+
+def get_resource_usage():
+    global resource_usage
+    if resource_usage is None:
+        with resource_usage_lock:
+            if resource_usage is None:
+                from jupyter_resource_usage.config import ResourceUseDisplay
+
+                from jupyter_tooling.resource_usage import ResourceUsageSampler
+
+                # configured via c.ResourceUseDisplay in jupyter_notebook_config.py
+                resource_usage = ResourceUsageSampler(
+                    ResourceUseDisplay(parent=nb_server_app), log=log
+                )
+    return resource_usage
+
 
 # -------------- HANDLER -------------------------
 
@@ -75,6 +161,18 @@ def send_data(handler, data):
     handler.finish(json.dumps(data, sort_keys=True, indent=4))
 
 
+class MetricsHandler(IPythonHandler):
+    @web.authenticated
+    def get(self):
+        try:
+            content_type, content = metrics.generate_latest()
+            self.set_header("Content-Type", content_type)
+            self.finish(content)
+        except Exception as ex:
+            handle_error(self, 500, exception=ex)
+            return
+
+
 class PingHandler(IPythonHandler):
     @web.authenticated
     def get(self):
@@ -382,7 +480,8 @@ class SharedFilesHandler(IPythonHandler):
 
             try:
                 # filebrowser needs to be stopped so that a user can be added
-                call("supervisorctl stop filebrowser", shell=True)
+                with metrics.track_subprocess("supervisorctl") as tracked_subprocess:
+                    tracked_subprocess.exit_code = call("supervisorctl stop filebrowser", shell=True)
 
                 # Add new user with the given permissions and scope
                 add_user_command = (
@@ -400,11 +499,13 @@ class SharedFilesHandler(IPythonHandler):
                     + '"'
                 )
 
-                call(add_user_command, shell=True)
+                with metrics.track_subprocess("filebrowser") as tracked_subprocess:
+                    tracked_subprocess.exit_code = call(add_user_command, shell=True)
             except Exception:
                 pass
 
-            call("supervisorctl start filebrowser", shell=True)
+            with metrics.track_subprocess("supervisorctl") as tracked_subprocess:
+                tracked_subprocess.exit_code = call("supervisorctl start filebrowser", shell=True)
 
             base_url = web_app.settings["base_url"].rstrip("/") + "/shared/filebrowser/"
             setup_command = origin + base_url + "?token=" + token
@@ -490,6 +591,374 @@ class StorageCheckHandler(IPythonHandler):
             return
 
 
+class StartupProfileHandler(IPythonHandler):
+    @web.authenticated
+    def get(self):
+        try:
+            if not os.path.isfile(STARTUP_PROFILE_FILE):
+                handle_error(
+                    self,
+                    404,
+                    "No startup profile available. The workspace might still be starting.",
+                )
+                return
+
+            with open(STARTUP_PROFILE_FILE, "r") as file:
+                self.set_header("Content-Type", "application/json")
+                self.finish(file.read())
+        except Exception as ex:
+            handle_error(self, 500, exception=ex)
+            return
+
+
+class ThreadBrokerHandler(IPythonHandler):
+    @web.authenticated
+    def get(self):
+        try:
+            if not thread_broker:
+                send_data(self, {"enabled": False})
+                return
+
+            status = thread_broker.get_status()
+            status["enabled"] = True
+            send_data(self, status)
+        except Exception as ex:
+            handle_error(self, 500, exception=ex)
+            return
+
+
+class MemoryCullerHandler(IPythonHandler):
+    @web.authenticated
+    def get(self):
+        try:
+            if not memory_culler:
+                send_data(self, {"enabled": False})
+                return
+
+            status = memory_culler.get_status()
+            status["enabled"] = True
+            send_data(self, status)
+        except Exception as ex:
+            handle_error(self, 500, exception=ex)
+            return
+
+
+class ProcessMonitorHandler(IPythonHandler):
+    @web.authenticated
+    async def get(self):
+        try:
+            if not process_monitor:
+                send_data(self, {"enabled": False})
+                return
+
+            sort_by = self.get_argument("sort", "cpu")
+            if sort_by not in ["cpu", "memory"]:
+                handle_error(self, 400, "Sort needs to be cpu or memory.")
+                return
+
+            try:
+                top = int(self.get_argument("top", 10))
+                history_length = int(self.get_argument("history", 12))
+            except ValueError:
+                handle_error(self, 400, "Top and history need to be integers.")
+                return
+
+            process_monitor.ensure_sampling()
+            if not process_monitor.has_sample():
+                await process_monitor.wait_for_sample()
+
+            status = process_monitor.get_status(
+                top=top,
+                sort_by="cpuPercent" if sort_by == "cpu" else "memory",
+                history_length=history_length,
+            )
+            if status is None:
+                handle_error(self, 503, "Processes were not sampled yet.")
+                return
+            status["enabled"] = True
+            send_data(self, status)
+        except Exception as ex:
+            handle_error(self, 500, exception=ex)
+            return
+
+
+class ResourceUsageHandler(IPythonHandler):
+    @web.authenticated
+    async def get(self):
+        try:
+            sampler = get_resource_usage()
+            usage = sampler.get_metrics()
+            if usage is None:
+                await sampler.wait_for_sample()
+                usage = sampler.get_metrics()
+            if usage is None:
+                handle_error(self, 503, "Resource usage was not sampled yet.")
+                return
+            send_data(self, usage)
+        except Exception as ex:
+            handle_error(self, 500, exception=ex)
+            return
+
+
+class ResourceUsageEventsHandler(IPythonHandler):
+    @web.authenticated
+    async def get(self):
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        # events need to be forwarded by nginx immediately
+        self.set_header("X-Accel-Buffering", "no")
+        try:
+            sampler = get_resource_usage()
+            while True:
+                usage = sampler.get_metrics()
+                if usage is not None:
+                    self.write("data: " + json.dumps(usage) + "\n\n")
+                    await self.flush()
+                await sampler.wait_for_sample()
+        except StreamClosedError:
+            # tab was closed or hidden
+            return
+
+
+class KernelUsageHandler(IPythonHandler):
+    @web.authenticated
+    def get(self):
+        try:
+            from jupyter_tooling import kernel_cgroups
+
+            if not kernel_cgroups.is_available():
+                send_data(self, {"enabled": False})
+                return
+
+            usage = kernel_cgroups.get_kernel_usage(self.kernel_manager)
+            usage["enabled"] = True
+            send_data(self, usage)
+        except Exception as ex:
+            handle_error(self, 500, exception=ex)
+            return
+
+
+class KernelPoolHandler(IPythonHandler):
+    @web.authenticated
+    def get(self):
+        try:
+            from jupyter_tooling.kernel_pool import KernelPoolManager
+
+            if not isinstance(self.kernel_manager, KernelPoolManager):
+                send_data(self, {"enabled": False})
+                return
+
+            status = self.kernel_manager.get_status()
+            status["enabled"] = True
+            send_data(self, status)
+        except Exception as ex:
+            handle_error(self, 500, exception=ex)
+            return
+
+
+class ImportProfileHandler(IPythonHandler):
+    @web.authenticated
+    async def get(self):
+        try:
+            target = self.get_argument("target", "all")
+            if target not in ["kernel", "server", "all"]:
+                handle_error(self, 400, "Target needs to be kernel, server, or all.")
+                return
+
+            from jupyter_tooling import import_profiler
+
+            top = int(self.get_argument("top", import_profiler.DEFAULT_TOP))
+            # profiling runs python subprocesses for several seconds
+            report = await tornado.ioloop.IOLoop.current().run_in_executor(
+                None, import_profiler.profile, target, top
+            )
+            send_data(self, report)
+        except Exception as ex:
+            handle_error(self, 500, exception=ex)
+            return
+
+
+class LazyNotebookContentsHandler(ContentsHandler):
+    """Contents API with large notebooks opened in the notebook editor without large outputs."""
+
+    @web.authenticated
+    async def get(self, path=""):
+        cm = self.contents_manager
+        if (
+            self.get_query_argument("type", default=None) != "notebook"
+            or self.get_query_argument("content", default="1") != "1"
+            or self.get_query_argument("format", default=None) is not None
+            or (cm.is_hidden(path) and not cm.allow_hidden)
+        ):
+            # all other requests (and their errors) are handled by the contents API of the notebook server
+            return await super().get(path)
+
+        model = cm.get_lazy_notebook(path)
+        validate_model(model, expect_content=True)
+        self._finish_model(model, location=False)
+
+
+class DirectoryPageHandler(IPythonHandler):
+    @web.authenticated
+    def get(self):
+        try:
+            if not hasattr(self.contents_manager, "list_directory"):
+                handle_error(self, 400, "Paginated directory listing is not activated.")
+                return
+
+            sort_by = self.get_argument("sort", "name")
+            if sort_by not in ["name", "last_modified", "size"]:
+                handle_error(self, 400, "Sort needs to be name, last_modified, or size.")
+                return
+
+            path = self.get_argument("path", "").strip("/")
+            if not self.contents_manager.dir_exists(path):
+                handle_error(self, 404, "Directory does not exist: " + path)
+                return
+
+            directory_page = self.contents_manager.list_directory(
+                path,
+                offset=int(self.get_argument("offset", 0)),
+                limit=int(self.get_argument("limit", 0)) or None,
+                sort_by=sort_by,
+                reverse=self.get_argument("order", "asc") == "desc",
+            )
+            for model in directory_page["content"]:
+                model["last_modified"] = model["last_modified"].isoformat()
+                model["created"] = model["created"].isoformat()
+            send_data(self, directory_page)
+        except Exception as ex:
+            handle_error(self, 500, exception=ex)
+            return
+
+
+def get_workspace_archive_command(extract: bool) -> list:
+    from jupyter_tooling.workspace_backup import EXCLUDED_FOLDERS
+
+    command = [
+        "tar",
+        "--extract" if extract else "--create",
+        "--file=-",
+        "--directory=" + WORKSPACE_HOME,
+        "--use-compress-program=" + WORKSPACE_ARCHIVE_COMPRESSION,
+    ]
+    # same exclusions as the workspace backup and cleanup
+    command += ["--exclude=" + folder for folder in EXCLUDED_FOLDERS]
+    if not extract:
+        # files that are removed or changed during the export should not abort it
+        command += ["--ignore-failed-read", "--warning=no-file-changed", "."]
+    return command
+
+
+def start_workspace_archive_process(extract: bool, **kwargs) -> Subprocess:
+    metrics.count_subprocess("tar")
+    # own process group -> tar and its compression program can be killed together
+    return Subprocess(get_workspace_archive_command(extract), start_new_session=True, **kwargs)
+
+
+def kill_workspace_archive_process(process: Subprocess) -> None:
+    """Kill tar and its compression program, tar needs to be waited for (it is left as zombie otherwise)."""
+    try:
+        os.killpg(process.proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class WorkspaceExportHandler(IPythonHandler):
+    @web.authenticated
+    async def get(self):
+        try:
+            process = start_workspace_archive_process(
+                extract=False,
+                stdout=Subprocess.STREAM,
+                stderr=subprocess.DEVNULL,
+            )
+        except Exception as ex:
+            handle_error(self, 500, exception=ex)
+            return
+
+        self.set_header("Content-Type", "application/zstd")
+        self.set_header(
+            "Content-Disposition",
+            'attachment; filename="workspace-'
+            + datetime.now().strftime("%Y%m%d-%H%M%S")
+            + '.tar.zst"',
+        )
+        try:
+            while True:
+                try:
+                    chunk = await process.stdout.read_bytes(
+                        WORKSPACE_ARCHIVE_CHUNK_SIZE, partial=True
+                    )
+                except StreamClosedError:
+                    break
+                self.write(chunk)
+                # the archive is created at the speed of the client
+                await self.flush()
+        except StreamClosedError:
+            log.info("Workspace export was aborted by the client.")
+            kill_workspace_archive_process(process)
+            await process.wait_for_exit(raise_error=False)
+            return
+
+        exit_code = await process.wait_for_exit(raise_error=False)
+        if exit_code != 0:
+            # the response is already sent, the archive might be incomplete
+            log.warning("Workspace export finished with exit code " + str(exit_code))
+        self.finish()
+
+
+@web.stream_request_body
+class WorkspaceImportHandler(IPythonHandler):
+    def prepare(self):
+        super().prepare()
+        if self.request.method != "POST":
+            return
+        # the upload is extracted while it is received -> needs to be authenticated before
+        if not self.current_user:
+            raise web.HTTPError(403)
+
+        self.request.connection.set_max_body_size(MAX_WORKSPACE_IMPORT_SIZE)
+        self.process = start_workspace_archive_process(
+            extract=True,
+            stdin=Subprocess.STREAM,
+            stdout=subprocess.DEVNULL,
+            stderr=Subprocess.STREAM,
+        )
+        self.process_errors = self.process.stderr.read_until_close()
+
+    async def data_received(self, chunk):
+        try:
+            # waits until tar has consumed the data, the upload is not buffered in memory
+            await self.process.stdin.write(chunk)
+        except StreamClosedError:
+            # tar exited early, the error is returned in post
+            pass
+
+    def on_connection_close(self):
+        if getattr(self, "process", None) and self.process.returncode is None:
+            log.info("Workspace import was aborted by the client.")
+            kill_workspace_archive_process(self.process)
+            if not getattr(self, "waiting_for_exit", False):
+                # otherwise post waits for the exit (only one exit callback is supported)
+                tornado.ioloop.IOLoop.current().spawn_callback(self.process.wait_for_exit, raise_error=False)
+
+    @web.authenticated
+    async def post(self):
+        try:
+            self.process.stdin.close()
+            self.waiting_for_exit = True
+            exit_code = await self.process.wait_for_exit(raise_error=False)
+            errors = (await self.process_errors).decode("utf-8", errors="replace")
+            if exit_code != 0:
+                handle_error(self, 500, "Failed to import workspace archive: " + errors)
+                return
+            send_data(self, {"path": WORKSPACE_HOME})
+        except Exception as ex:
+            handle_error(self, 500, exception=ex)
+            return
+
+
 # ------------- Storage Check Utils ------------------------
 
 
@@ -535,9 +1004,10 @@ def update_workspace_metadata():
         # calculate container size via the root folder
         try:
             # exclude all different filesystems/mounts
-            workspace_metadata["container_size_in_kb"] = int(
-                subprocess.check_output(["du", "-sx", "--exclude=/proc", "/"]).split()[0].decode("utf-8")
-            )
+            with metrics.track_scan("container_size"):
+                workspace_metadata["container_size_in_kb"] = int(
+                    subprocess.check_output(["du", "-sx", "--exclude=/proc", "/"]).split()[0].decode("utf-8")
+                )
         except Exception:
             pass
     
@@ -545,9 +1015,10 @@ def update_workspace_metadata():
         # calculate workspace folder size
         try:
             # exclude all different filesystems/mounts
-            workspace_metadata["workspace_folder_size_in_kb"] = int(
-                subprocess.check_output(["du", "-sx", WORKSPACE_HOME]).split()[0].decode("utf-8")
-            )
+            with metrics.track_scan("workspace_folder_size"):
+                workspace_metadata["workspace_folder_size_in_kb"] = int(
+                    subprocess.check_output(["du", "-sx", WORKSPACE_HOME]).split()[0].decode("utf-8")
+                )
         except Exception:
             pass
     
@@ -640,8 +1111,13 @@ def cleanup_folder(
         max_file_size_mb (int): Max size of files in MB that should be deleted. Default: 50.
         replace_with_info (bool): Replace removed files with `.removed.txt` files with file removal reason. Default: True.
         last_file_usage (int): Number of days a file wasn't used to allow the file to be removed. Default: 3.
-        excluded_folders (list[str]): List of folders to exclude from removal (optional)
+        excluded_folders (list[str]): List of folders to exclude from removal. Default: same folders as the workspace backup.
     """
+    if excluded_folders is None:
+        from jupyter_tooling.workspace_backup import EXCLUDED_FOLDERS
+
+        excluded_folders = EXCLUDED_FOLDERS
+
     total_cleaned_up_mb = 0
     removed_files = 0
 
@@ -733,6 +1209,9 @@ def get_repo(directory: str):
     if not directory:
         return None
 
+    # imported lazily, GitPython is only needed for git operations and slows down the server start
+    import git
+
     try:
         return git.Repo(directory, search_parent_directories=True)
     except Exception:
@@ -743,9 +1222,11 @@ def set_user_email(email: str, repo=None):
     if repo:
         repo.config_writer().set_value("user", "email", email).release()
     else:
-        exit_code = subprocess.call(
-            'git config --global user.email "' + email + '"', shell=True
-        )
+        with metrics.track_subprocess("git config") as tracked_subprocess:
+            exit_code = subprocess.call(
+                'git config --global user.email "' + email + '"', shell=True
+            )
+            tracked_subprocess.exit_code = exit_code
         if exit_code > 0:
             warnings.warn("Global email configuration failed.")
 
@@ -754,14 +1235,18 @@ def set_user_name(name: str, repo=None):
     if repo:
         repo.config_writer().set_value("user", "name", name).release()
     else:
-        exit_code = subprocess.call(
-            'git config --global user.name "' + name + '"', shell=True
-        )
+        with metrics.track_subprocess("git config") as tracked_subprocess:
+            exit_code = subprocess.call(
+                'git config --global user.name "' + name + '"', shell=True
+            )
+            tracked_subprocess.exit_code = exit_code
         if exit_code > 0:
             warnings.warn("Global name configuration failed.")
 
 
 def commit_file(file_path: str, commit_msg: str = None, push: bool = True):
+    import git
+
     if not os.path.isfile(file_path):
         raise Exception("File does not exist: " + file_path)
 
@@ -787,13 +1272,15 @@ def commit_file(file_path: str, commit_msg: str = None, push: bool = True):
 
     try:
         # fetch and merge newest state - fast-forward-only
-        repo.git.pull("--ff-only")
+        with metrics.track_subprocess("git pull"):
+            repo.git.pull("--ff-only")
     except Exception:
         raise Exception("The repo is not up-to-date or cannot be updated.")
 
     try:
         # Commit single file with commit message
-        repo.git.commit(file_path, m=commit_msg)
+        with metrics.track_subprocess("git commit"):
+            repo.git.commit(file_path, m=commit_msg)
     except git.GitCommandError as error:
         if error.stdout and (
             "branch is up-to-date with" in error.stdout
@@ -807,7 +1294,8 @@ def commit_file(file_path: str, commit_msg: str = None, push: bool = True):
     if push:
         # Push file to remote
         try:
-            repo.git.push("origin", "HEAD")
+            with metrics.track_subprocess("git push"):
+                repo.git.push("origin", "HEAD")
         except git.GitCommandError as error:
             if error.stderr and (
                 "No such device or address" in error.stderr
@@ -822,10 +1310,12 @@ def commit_file(file_path: str, commit_msg: str = None, push: bool = True):
 
 def get_config_value(key: str, repo=None):
     try:
-        if repo:
-            return repo.git.config(key)
-        # no repo, look up global config
-        return execute_command("git config " + key)
+        # exit code 1 if the key is not set
+        with metrics.track_subprocess("git config", expected_exit_codes=(0, 1)):
+            if repo:
+                return repo.git.config(key)
+            # no repo, look up global config
+            return execute_command("git config " + key)
     except Exception:
         return None
 
@@ -1049,9 +1539,11 @@ def get_ssh_keyscan_results(host_name, host_port=22, key_format="ecdsa"):
       The keyscan entry which can be added to the known_hosts file. If `key_format` matches multiple results of `ssh-keyscan`, the last match is returned. If no match exists, it returns empty
     """
 
-    keyscan_result = subprocess.run(
-        ["ssh-keyscan", "-p", str(host_port), host_name], stdout=subprocess.PIPE
-    )
+    with metrics.track_subprocess("ssh-keyscan") as tracked_subprocess:
+        keyscan_result = subprocess.run(
+            ["ssh-keyscan", "-p", str(host_port), host_name], stdout=subprocess.PIPE
+        )
+        tracked_subprocess.exit_code = keyscan_result.returncode
     keys = keyscan_result.stdout.decode("utf-8").split("\n")
     keyscan_entry = ""
     for key in keys:
@@ -1063,21 +1555,70 @@ def get_ssh_keyscan_results(host_name, host_port=22, key_format="ecdsa"):
 # ------------- PLUGIN LOADER ------------------------
 
 
-def load_jupyter_server_extension(nb_server_app) -> None:
+def load_jupyter_server_extension(server_app) -> None:
     # registers all handlers as a REST interface
     global web_app
     global log
+    global nb_server_app
+    global thread_broker
+    global memory_culler
+    global process_monitor
 
+    nb_server_app = server_app
     web_app = nb_server_app.web_app
     log = nb_server_app.log
 
+    if THREAD_BROKER_ENABLED:
+        from jupyter_tooling.thread_broker import ThreadBroker
+
+        thread_broker = ThreadBroker(nb_server_app.kernel_manager, log)
+        thread_broker.start()
+
+    culling_threshold = get_culling_threshold(CULL_KERNELS_ON_MEMORY_PRESSURE)
+    if culling_threshold:
+        from jupyter_tooling.memory_culler import MemoryCuller
+
+        log.warning(
+            "Activating kernel culling above " + str(culling_threshold) + "% memory usage."
+        )
+        memory_culler = MemoryCuller(nb_server_app.kernel_manager, log, culling_threshold)
+        memory_culler.start()
+
+    process_monitor_interval = get_process_monitor_interval(PROCESS_MONITOR_INTERVAL)
+    if process_monitor_interval:
+        from jupyter_tooling.process_monitor import ProcessMonitor
+
+        process_monitor = ProcessMonitor(process_monitor_interval, log)
+
+    # only checks that the package is installed, the sampler is created on the first request
+    resource_usage_available = importlib.util.find_spec("jupyter_resource_usage") is not None
+    if not resource_usage_available:
+        log.warning("Resource usage display is not available: jupyter-resource-usage is not installed")
+
+    if hasattr(nb_server_app.kernel_manager, "start_pool"):
+        # pre-warmed kernel pool (KernelPoolManager) is configured in jupyter_notebook_config.py
+        nb_server_app.kernel_manager.start_pool()
+
     host_pattern = ".*$"
 
+    # request latencies of the tooling handlers are recorded when the request is logged
+    notebook_log_function = web_app.settings.get("log_function", log_request)
+
+    def log_tooling_request(handler):
+        if type(handler).__module__ == __name__:
+            metrics.observe_request(handler)
+        notebook_log_function(handler)
+
+    web_app.settings["log_function"] = log_tooling_request
+
     # SharedSSHHandler
 
     route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/ping")
     web_app.add_handlers(host_pattern, [(route_pattern, PingHandler)])
 
+    route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/metrics")
+    web_app.add_handlers(host_pattern, [(route_pattern, MetricsHandler)])
+
     route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/tools")
     web_app.add_handlers(host_pattern, [(route_pattern, ToolingHandler)])
 
@@ -1105,6 +1646,64 @@ def load_jupyter_server_extension(nb_server_app) -> None:
         ],
     )
 
+    route_pattern = url_path_join(
+        web_app.settings["base_url"], "/tooling/startup-profile"
+    )
+    web_app.add_handlers(host_pattern, [(route_pattern, StartupProfileHandler)])
+
+    route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/threads")
+    web_app.add_handlers(host_pattern, [(route_pattern, ThreadBrokerHandler)])
+
+    route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/memory")
+    web_app.add_handlers(host_pattern, [(route_pattern, MemoryCullerHandler)])
+
+    route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/processes")
+    web_app.add_handlers(host_pattern, [(route_pattern, ProcessMonitorHandler)])
+
+    if resource_usage_available:
+        # same endpoint as jupyter-resource-usage (used by the JupyterLab status bar)
+        route_pattern = url_path_join(web_app.settings["base_url"], "/api/metrics/v1")
+        web_app.add_handlers(host_pattern, [(route_pattern, ResourceUsageHandler)])
+
+        route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/resources/events")
+        web_app.add_handlers(host_pattern, [(route_pattern, ResourceUsageEventsHandler)])
+
+    route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/kernels/usage")
+    web_app.add_handlers(host_pattern, [(route_pattern, KernelUsageHandler)])
+
+    route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/kernels/pool")
+    web_app.add_handlers(host_pattern, [(route_pattern, KernelPoolHandler)])
+
+    route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/import-profile")
+    web_app.add_handlers(host_pattern, [(route_pattern, ImportProfileHandler)])
+
+    if getattr(nb_server_app.contents_manager, "lazy_notebook_size", 0):
+        # only the requests of the notebook editor get notebooks without large outputs
+        route_pattern = url_path_join(web_app.settings["base_url"], r"/api/contents%s" % path_regex)
+        web_app.add_handlers(host_pattern, [(route_pattern, LazyNotebookContentsHandler)])
+
+        from jupyter_tooling.contents_manager import LAZY_OUTPUTS_FOLDER
+
+        route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/lazy-outputs/(.*)")
+        web_app.add_handlers(
+            host_pattern, [(route_pattern, AuthenticatedFileHandler, {"path": LAZY_OUTPUTS_FOLDER})]
+        )
+
+    route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/contents")
+    web_app.add_handlers(host_pattern, [(route_pattern, DirectoryPageHandler)])
+
+    route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/workspace/export")
+    web_app.add_handlers(host_pattern, [(route_pattern, WorkspaceExportHandler)])
+
+    route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/workspace/import")
+    web_app.add_handlers(host_pattern, [(route_pattern, WorkspaceImportHandler)])
+
+    # static file handler -> supports range requests for large outputs
+    route_pattern = url_path_join(web_app.settings["base_url"], "/tooling/outputs/(.*)")
+    web_app.add_handlers(
+        host_pattern, [(route_pattern, AuthenticatedFileHandler, {"path": OUTPUTS_FOLDER})]
+    )
+
     route_pattern = url_path_join(
         web_app.settings["base_url"], "/tooling/ssh/setup-script"
     )
@@ -0,0 +1,396 @@
+"""
+Deduplicated backup of the workspace folder to an S3-compatible object store or a directory.
+
+Files are split into content-defined chunks (gear rolling hash, so an insert only changes the
+chunks around it), every chunk is compressed and uploaded once by its hash, and every backup is a manifest with the chunk list of every file.
+Files that did not change since the previous backup (size and mtime) are not read again.
+The manifest of a running backup is uploaded regularly, an interrupted backup continues from it.
+Used by the workspace modes of backup_restore_config.py.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import stat
+import time
+import zlib
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+WORKSPACE_HOME = os.getenv("WORKSPACE_HOME", "/workspace")
+WORKSPACE_BACKUP_TARGET = os.getenv("WORKSPACE_BACKUP_TARGET", "")
+WORKSPACE_BACKUP_S3_ENDPOINT = os.getenv("WORKSPACE_BACKUP_S3_ENDPOINT", "")
+
+# Folders (by name) that are neither backed up nor cleaned up (see cleanup_folder in tooling_handler.py)
+EXCLUDED_FOLDERS = [
+    folder.strip()
+    for folder in os.getenv(
+        "WORKSPACE_EXCLUDED_FOLDERS", "lost+found,.Trash-1000,__pycache__,.ipynb_checkpoints,node_modules"
+    ).split(",")
+    if folder.strip()
+]
+
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+READ_BLOCK_SIZE = 2 * MAX_CHUNK_SIZE
+# a chunk ends after a position whose hash has all mask bits unset (~1 MB after the minimum size);
+# the hash covers the last 32 bytes, the mask uses the upper bits which depend on all of them
+CHUNK_HASH_WINDOW = 32
+CHUNK_BOUNDARY_MASK = ((1 << 20) - 1) << 12
+# random (but fixed) value per byte value, changing it changes all chunk boundaries
+CHUNK_GEAR = [int.from_bytes(hashlib.sha256(bytes([value])).digest()[:4], "little") for value in range(256)]
+# fast compression, most large files in the workspace are binary data
+COMPRESSION_LEVEL = 1
+UPLOAD_WORKERS = 8
+# the manifest of a running backup is uploaded at this interval (resume point)
+MANIFEST_INTERVAL = 60  # seconds
+# number of latest complete backups that are kept
+BACKUP_RETENTION = 7
+
+
+class DirectoryTarget:
+    """Backup target in a (mounted) directory."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def list(self, prefix: str) -> list:
+        keys = []
+        for dirname, _, files in os.walk(os.path.join(self.path, prefix)):
+            for filename in files:
+                if not filename.endswith(".tmp"):
+                    keys.append(os.path.relpath(os.path.join(dirname, filename), self.path))
+        return keys
+
+    def upload(self, key: str, data: bytes) -> None:
+        file_path = os.path.join(self.path, key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_file = file_path + ".tmp"
+        with open(temp_file, "wb") as file:
+            file.write(data)
+        os.replace(temp_file, file_path)
+
+    def download(self, key: str) -> bytes:
+        with open(os.path.join(self.path, key), "rb") as file:
+            return file.read()
+
+    def delete(self, key: str) -> None:
+        os.remove(os.path.join(self.path, key))
+
+
+class S3Target:
+    """Backup target in an S3-compatible object store (e.g. MinIO), credentials are read from the AWS env variables."""
+
+    def __init__(self, url: str):
+        import boto3
+
+        self.bucket, _, self.prefix = url[len("s3://"):].partition("/")
+        self.prefix = self.prefix.strip("/") + "/" if self.prefix.strip("/") else ""
+        # the client is thread-safe and shared by all upload workers
+        self.client = boto3.client("s3", endpoint_url=WORKSPACE_BACKUP_S3_ENDPOINT or None)
+
+    def list(self, prefix: str) -> list:
+        keys = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            keys.extend(item["Key"][len(self.prefix):] for item in page.get("Contents", []))
+        return keys
+
+    def upload(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def download(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"].read()
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+
+def get_target(target_url: str = None):
+    target_url = target_url or WORKSPACE_BACKUP_TARGET
+    if not target_url:
+        raise ValueError("No workspace backup target configured (WORKSPACE_BACKUP_TARGET).")
+    if target_url.startswith("s3://"):
+        return S3Target(target_url)
+    return DirectoryTarget(target_url)
+
+
+def walk_files(folder_path: str, excluded_folders: list = None):
+    """Yield the paths of all files in the folder, excluded folders are skipped."""
+    excluded_folders = EXCLUDED_FOLDERS if excluded_folders is None else excluded_folders
+    for dirname, subdirs, files in os.walk(folder_path):
+        subdirs[:] = [subdir for subdir in subdirs if subdir not in excluded_folders]
+        for filename in files:
+            yield os.path.join(dirname, filename)
+
+
+def _find_boundaries_numpy(data: bytes) -> list:
+    import numpy as np
+
+    hashes = np.array(CHUNK_GEAR, dtype=np.uint32)[np.frombuffer(data, dtype=np.uint8)]
+    # window hash of 2 * n bytes = hash of the last n bytes + (hash of the n bytes before << n), log2(32) passes
+    window = 1
+    while window < CHUNK_HASH_WINDOW:
+        # uint32 arithmetic wraps around like the masked python version
+        hashes[window:] += hashes[:-window] << np.uint32(window)
+        window *= 2
+    positions = np.flatnonzero((hashes & np.uint32(CHUNK_BOUNDARY_MASK)) == 0)
+    return (positions[positions >= CHUNK_HASH_WINDOW - 1] + 1).tolist()
+
+
+def _find_boundaries_python(data: bytes) -> list:
+    boundaries = []
+    hash_value = 0
+    gear = CHUNK_GEAR
+    for position, value in enumerate(data):
+        hash_value = ((hash_value << 1) + gear[value]) & 0xFFFFFFFF
+        if not hash_value & CHUNK_BOUNDARY_MASK and position >= CHUNK_HASH_WINDOW - 1:
+            boundaries.append(position + 1)
+    return boundaries
+
+
+def find_boundaries(data: bytes) -> list:
+    """End positions of all windows in the data whose gear hash matches the boundary mask."""
+    try:
+        return _find_boundaries_numpy(data)
+    except ImportError:
+        # same boundaries, but a lot slower
+        return _find_boundaries_python(data)
+
+
+def split_chunks(data: bytes, final: bool = True) -> tuple:
+    """Split data into content-defined chunks of MIN_CHUNK_SIZE to MAX_CHUNK_SIZE bytes.
+
+    Returns the chunks and the remaining data that needs more data to find its end (if not final).
+    """
+    boundaries = find_boundaries(data)
+    chunks = []
+    start = 0
+    while len(data) - start > (0 if final else MAX_CHUNK_SIZE):
+        # the hash window is always within the chunk, so the boundaries do not depend on the previous chunk
+        boundary_index = bisect_left(boundaries, start + MIN_CHUNK_SIZE)
+        if boundary_index < len(boundaries) and boundaries[boundary_index] <= start + MAX_CHUNK_SIZE:
+            end = boundaries[boundary_index]
+        else:
+            # e.g. zero-filled data without any boundary
+            end = min(start + MAX_CHUNK_SIZE, len(data))
+        chunks.append(data[start:end])
+        start = end
+    return chunks, data[start:]
+
+
+def iter_chunks(file):
+    """Content-defined chunks of a file, read in blocks."""
+    remainder = b""
+    while True:
+        block = file.read(READ_BLOCK_SIZE)
+        # the remainder is shorter than the maximum chunk size -> at most one block is copied again
+        chunks, remainder = split_chunks(remainder + block, final=not block)
+        yield from chunks
+        if not block:
+            return
+
+
+def get_chunk_key(chunk_hash: str) -> str:
+    return "chunks/" + chunk_hash[:2] + "/" + chunk_hash
+
+
+def get_manifest_key(backup_id: str, partial: bool = False) -> str:
+    return "manifests/" + backup_id + (".partial" if partial else "") + ".json.gz"
+
+
+def upload_manifest(target, manifest: dict, partial: bool = False) -> None:
+    target.upload(get_manifest_key(manifest["id"], partial), gzip.compress(json.dumps(manifest).encode("utf-8")))
+
+
+def download_manifest(target, key: str) -> dict:
+    return json.loads(gzip.decompress(target.download(key)).decode("utf-8"))
+
+
+def list_backups(target) -> tuple:
+    """Return the ids of all complete backups (oldest first) and the ids of all unfinished backups."""
+    complete_backups = []
+    partial_backups = []
+    for key in target.list("manifests/"):
+        name = os.path.basename(key)
+        if name.endswith(".partial.json.gz"):
+            partial_backups.append(name[:-len(".partial.json.gz")])
+        elif name.endswith(".json.gz"):
+            complete_backups.append(name[:-len(".json.gz")])
+    return sorted(complete_backups), sorted(partial_backups)
+
+
+def backup_workspace(target, folder_path: str = WORKSPACE_HOME, workers: int = UPLOAD_WORKERS) -> str:
+    """Backup the folder to the target and return the backup id."""
+    complete_backups, partial_backups = list_backups(target)
+    known_chunks = set(os.path.basename(key) for key in target.list("chunks/"))
+
+    previous_files = {}
+    if complete_backups:
+        previous_files = download_manifest(target, get_manifest_key(complete_backups[-1]))["files"]
+
+    backup_id = time.strftime("%Y%m%d-%H%M%S")
+    if complete_backups and complete_backups[-1].startswith(backup_id):
+        backup_id += "-" + str(len([existing for existing in complete_backups if existing.startswith(backup_id)]))
+    manifest = {"id": backup_id, "root": folder_path, "files": {}}
+    if partial_backups:
+        # continue the interrupted backup, all chunks of the files in its manifest are uploaded already
+        manifest = download_manifest(target, get_manifest_key(partial_backups[-1], partial=True))
+        log.info("Resuming workspace backup " + manifest["id"] + " (" + str(len(manifest["files"])) + " files done).")
+    # files of the resumed backup are only kept if they still exist
+    resumed_files = manifest["files"]
+    manifest["files"] = {}
+
+    def upload_chunk(chunk_hash: str, chunk: bytes) -> int:
+        # zlib releases the GIL -> chunks are compressed in parallel
+        data = zlib.compress(chunk, COMPRESSION_LEVEL)
+        target.upload(get_chunk_key(chunk_hash), data)
+        return len(data)
+
+    uploaded_chunks = 0
+    uploaded_bytes = 0
+    pending_uploads = []
+    last_manifest_upload = time.time()
+
+    def wait_for_uploads(max_pending: int = 0) -> None:
+        nonlocal uploaded_chunks, uploaded_bytes
+        while len(pending_uploads) > max_pending:
+            uploaded_bytes += pending_uploads.pop(0).result()
+            uploaded_chunks += 1
+
+    # a target directory within the workspace is not backed up itself
+    target_folder = os.path.realpath(target.path) + os.sep if isinstance(target, DirectoryTarget) else None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for file_path in walk_files(folder_path):
+            if target_folder and os.path.realpath(file_path).startswith(target_folder):
+                continue
+            path = os.path.relpath(file_path, folder_path)
+            try:
+                file_stat = os.lstat(file_path)
+            except OSError:
+                # removed in the meantime
+                continue
+
+            if stat.S_ISLNK(file_stat.st_mode):
+                manifest["files"][path] = {"link": os.readlink(file_path)}
+                continue
+            if not stat.S_ISREG(file_stat.st_mode):
+                continue
+
+            previous_file = resumed_files.get(path) or previous_files.get(path)
+            if (
+                previous_file
+                and previous_file.get("size") == file_stat.st_size
+                and previous_file.get("mtime_ns") == file_stat.st_mtime_ns
+            ):
+                manifest["files"][path] = previous_file
+                continue
+
+            chunk_hashes = []
+            try:
+                with open(file_path, "rb") as file:
+                    for chunk in iter_chunks(file):
+                        chunk_hash = hashlib.sha256(chunk).hexdigest()
+                        chunk_hashes.append(chunk_hash)
+                        if chunk_hash in known_chunks:
+                            continue
+                        known_chunks.add(chunk_hash)
+                        pending_uploads.append(executor.submit(upload_chunk, chunk_hash, chunk))
+                        # limits the memory used by chunks that are waiting for upload
+                        wait_for_uploads(max_pending=workers * 4)
+            except OSError as ex:
+                log.warning("Failed to read " + file_path + ": " + str(ex))
+                continue
+
+            manifest["files"][path] = {
+                "size": file_stat.st_size,
+                "mtime_ns": file_stat.st_mtime_ns,
+                "mode": stat.S_IMODE(file_stat.st_mode),
+                "chunks": chunk_hashes,
+            }
+
+            if time.time() - last_manifest_upload > MANIFEST_INTERVAL:
+                # all chunks of the files in the manifest need to be uploaded before it can be used for resuming
+                wait_for_uploads()
+                upload_manifest(target, manifest, partial=True)
+                last_manifest_upload = time.time()
+
+        wait_for_uploads()
+
+    manifest["created"] = time.time()
+    upload_manifest(target, manifest)
+    for backup_id in partial_backups:
+        target.delete(get_manifest_key(backup_id, partial=True))
+
+    log.info(
+        "Finished workspace backup " + manifest["id"] + ": " + str(len(manifest["files"])) + " files, "
+        + str(uploaded_chunks) + " new chunks (" + str(round(uploaded_bytes / 1024 / 1024, 1)) + " MB) uploaded."
+    )
+    prune_backups(target)
+    return manifest["id"]
+
+
+def prune_backups(target, retention: int = BACKUP_RETENTION) -> None:
+    """Remove old backups and all chunks that are not used by the remaining (or unfinished) backups."""
+    complete_backups, partial_backups = list_backups(target)
+    for backup_id in complete_backups[:-retention] if retention > 0 else []:
+        target.delete(get_manifest_key(backup_id))
+        log.info("Removed workspace backup " + backup_id)
+
+    manifest_keys = [get_manifest_key(backup_id) for backup_id in complete_backups[-retention:]]
+    manifest_keys += [get_manifest_key(backup_id, partial=True) for backup_id in partial_backups]
+    used_chunks = set()
+    for key in manifest_keys:
+        for file_info in download_manifest(target, key)["files"].values():
+            used_chunks.update(file_info.get("chunks", []))
+
+    for key in target.list("chunks/"):
+        if os.path.basename(key) not in used_chunks:
+            target.delete(key)
+
+
+def restore_workspace(
+    target, backup_id: str = None, folder_path: str = WORKSPACE_HOME, workers: int = UPLOAD_WORKERS
+) -> None:
+    """Restore all files of the backup (default: latest) into the folder, other files are kept."""
+    complete_backups, _ = list_backups(target)
+    if not complete_backups:
+        raise ValueError("No workspace backup available.")
+    backup_id = backup_id or complete_backups[-1]
+    if backup_id not in complete_backups:
+        raise ValueError("Workspace backup " + backup_id + " does not exist.")
+
+    manifest = download_manifest(target, get_manifest_key(backup_id))
+    log.info("Restoring workspace backup " + backup_id + " (" + str(len(manifest["files"])) + " files).")
+
+    def restore_file(path: str, file_info: dict) -> None:
+        file_path = os.path.join(folder_path, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        if "link" in file_info:
+            if os.path.lexists(file_path):
+                os.remove(file_path)
+            os.symlink(file_info["link"], file_path)
+            return
+
+        temp_file = file_path + ".restore.tmp"
+        with open(temp_file, "wb") as file:
+            for chunk_hash in file_info["chunks"]:
+                file.write(zlib.decompress(target.download(get_chunk_key(chunk_hash))))
+        os.chmod(temp_file, file_info["mode"])
+        os.utime(temp_file, ns=(file_info["mtime_ns"], file_info["mtime_ns"]))
+        os.replace(temp_file, file_path)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(restore_file, path, file_info): path for path, file_info in manifest["files"].items()
+        }
+        for future, path in futures.items():
+            try:
+                future.result()
+            except Exception as ex:
+                log.warning("Failed to restore " + path + ": " + str(ex))
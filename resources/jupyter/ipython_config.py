@@ -1,3 +1,5 @@
+import os
+
 # Make matplotlib output in Jupyter notebooks display correctly
 c = get_config()
 
@@ -5,5 +7,15 @@ c.IPKernelApp.matplotlib = "inline"
 c.TerminalInteractiveShell.history_length = 10000
 c.IPythonWidget.buffer_size = 10000
 
+c.InteractiveShellApp.extensions = []
+
+# Apply thread allocations of the workspace thread broker (see jupyter_tooling/thread_broker.py)
+if os.getenv("THREAD_BROKER_ENABLED", "false").lower().strip() == "true":
+    c.InteractiveShellApp.extensions.append("jupyter_tooling.kernel_threads")
+
+# Write oversized cell outputs to ~/.workspace/outputs (see jupyter_tooling/output_spooler.py)
+if os.getenv("OUTPUT_SPOOLING_THRESHOLD", "false").lower().strip() != "false":
+    c.InteractiveShellApp.extensions.append("jupyter_tooling.output_spooler")
+
 # c.InteractiveShellApp.extensions = ['autoreload']
 # c.InteractiveShellApp.exec_lines = ['%autoreload 2', '%pylab']
@@ -2,8 +2,8 @@ import errno
 import os
 import stat
 import subprocess
+import sys
 
-import psutil
 from jupyter_core.paths import jupyter_data_dir
 
 c = get_config()
@@ -24,10 +24,54 @@ c.NotebookApp.disable_check_xsrf = True
 c.NotebookApp.allow_origin = "*"
 c.NotebookApp.trust_xheaders = True
 c.MappingKernelManager.buffer_offline_messages = True
+# Bounded offline buffer that spills to disk, otherwise long-running output of disconnected sessions is kept in memory
+offline_buffer_spilling = os.getenv("OFFLINE_BUFFER_SPILLING", "false")
+offline_buffer_enabled = bool(offline_buffer_spilling) and offline_buffer_spilling.lower().strip() != "false"
+if offline_buffer_enabled:
+    c.NotebookApp.kernel_manager_class = "jupyter_tooling.offline_buffer.BufferingKernelManager"
+    try:
+        # see if env variable is set as disk limit per kernel in MB
+        c.BufferingKernelManager.offline_buffer_disk_limit = int(offline_buffer_spilling) * 1024 * 1024
+    except ValueError:
+        pass
 c.Application.log_level = "WARN"
 c.NotebookApp.log_level = "WARN"
 # c.NotebookApp.contents_manager_class = "notebook.services.contents.manager.ContentsManager"
 
+# Open large notebooks without their large outputs, outputs are loaded on demand
+lazy_notebook_outputs = os.getenv("LAZY_NOTEBOOK_OUTPUTS", "false")
+if lazy_notebook_outputs and lazy_notebook_outputs.lower().strip() != "false":
+    c.NotebookApp.contents_manager_class = (
+        "jupyter_tooling.contents_manager.WorkspaceContentsManager"
+    )
+    try:
+        # see if env variable is set as minimum notebook size in bytes
+        c.WorkspaceContentsManager.lazy_notebook_size = int(lazy_notebook_outputs)
+    except ValueError:
+        c.WorkspaceContentsManager.lazy_notebook_size = 10 * 1024 * 1024  # 10MB
+
+# Only list the first entries of huge directories, remaining entries are loaded on demand
+directory_page_size = os.getenv("DIRECTORY_PAGE_SIZE", "false")
+if directory_page_size and directory_page_size.lower().strip() != "false":
+    c.NotebookApp.contents_manager_class = (
+        "jupyter_tooling.contents_manager.WorkspaceContentsManager"
+    )
+    try:
+        # see if env variable is set as number of entries
+        c.WorkspaceContentsManager.directory_page_size = int(directory_page_size)
+    except ValueError:
+        c.WorkspaceContentsManager.directory_page_size = 500
+
+# Store checkpoints compressed and deduplicated in ~/.workspace/checkpoints instead of .ipynb_checkpoints
+compressed_checkpoints = os.getenv("COMPRESSED_CHECKPOINTS", "false")
+if compressed_checkpoints and compressed_checkpoints.lower().strip() != "false":
+    c.ContentsManager.checkpoints_class = "jupyter_tooling.checkpoints.CompressedCheckpoints"
+    try:
+        # see if env variable is set as number of checkpoints per file
+        c.CompressedCheckpoints.retention = int(compressed_checkpoints)
+    except ValueError:
+        c.CompressedCheckpoints.retention = 5
+
 c.JupyterApp.answer_yes = True
 
 # set base url if available
@@ -63,6 +107,19 @@ if shutdown_inactive_kernels and shutdown_inactive_kernels.lower().strip() != "f
         # Do not shutdown kernels that are connected via browser, activate?
         c.MappingKernelManager.cull_connected = False
 
+kernel_cgroups_enabled = os.getenv("KERNEL_CGROUPS_ENABLED", "false")
+if kernel_cgroups_enabled and kernel_cgroups_enabled.lower().strip() == "true":
+    from jupyter_tooling import kernel_cgroups
+
+    # cgroup hierarchy is prepared at startup by configure_cgroups.py
+    if kernel_cgroups.is_available():
+        print("Activating per-kernel cgroups.")
+        c.MappingKernelManager.kernel_manager_class = (
+            "jupyter_tooling.kernel_cgroups.CgroupKernelManager"
+        )
+    else:
+        print("Kernel cgroups are not available. Kernels will share the cgroup of the workspace.")
+
 authenticate_via_jupyter = os.getenv("AUTHENTICATE_VIA_JUPYTER", "false")
 if authenticate_via_jupyter and authenticate_via_jupyter.lower().strip() != "false":
     # authentication via jupyter is activated
@@ -105,20 +162,15 @@ try:
 except Exception:
     pass
 
+# Resource topology (cgroup v1 & v2 cpu and memory limits) is detected at startup in docker-entrypoint.py
+RESOURCES_PATH = os.getenv("RESOURCES_PATH", "/resources")
+sys.path.append(os.path.join(RESOURCES_PATH, "scripts"))
+
 # Set memory limits for resource use display: https://github.com/yuvipanda/nbresuse
 try:
-    mem_limit = None
-    if os.path.isfile("/sys/fs/cgroup/memory/memory.limit_in_bytes"):
-        with open("/sys/fs/cgroup/memory/memory.limit_in_bytes", "r") as file:
-            mem_limit = file.read().replace("\n", "").strip()
+    import resource_topology
 
-    total_memory = psutil.virtual_memory().total
-
-    if not mem_limit:
-        mem_limit = total_memory
-    elif int(mem_limit) > int(total_memory):
-        # if mem limit from cgroup bigger than total memory -> use total memory
-        mem_limit = total_memory
+    mem_limit = resource_topology.load_resource_topology()["memory_limit"]
 
     # Workaround -> round memory limit, otherwise the number is quite long
     # TODO fix in nbresuse
@@ -128,6 +180,36 @@ try:
 except Exception:
     pass
 
+# Estimated memory usage of a pool kernel with preloaded modules
+KERNEL_POOL_KERNEL_MEMORY = 512 * 1024 * 1024
+
+# Pre-warmed kernel pool: idle kernels with preloaded modules are handed out on kernel start
+kernel_pool_size = os.getenv("KERNEL_POOL_SIZE", "false")
+if kernel_pool_size and kernel_pool_size.lower().strip() != "false":
+    try:
+        pool_size = int(kernel_pool_size)
+    except ValueError:
+        # size the pool based on the memory budget of the workspace
+        try:
+            memory_limit = resource_topology.load_resource_topology()["memory_limit"]
+            # pool kernels should not use more than 10% of the available memory
+            pool_size = min(int(memory_limit * 0.1 / KERNEL_POOL_KERNEL_MEMORY), 4)
+        except Exception:
+            pool_size = 1
+
+    if pool_size > 0:
+        print("Activating pre-warmed kernel pool with " + str(pool_size) + " kernels.")
+        if offline_buffer_enabled:
+            c.NotebookApp.kernel_manager_class = "jupyter_tooling.kernel_pool.BufferingKernelPoolManager"
+        else:
+            c.NotebookApp.kernel_manager_class = "jupyter_tooling.kernel_pool.KernelPoolManager"
+        c.KernelPoolManager.pool_size = pool_size
+        c.KernelPoolManager.preload_modules = [
+            module.strip()
+            for module in os.getenv("KERNEL_POOL_PRELOAD", "").split(",")
+            if module.strip()
+        ]
+
 # Change default umask for all subprocesses of the notebook server if set in
 # the environment
 if "NB_UMASK" in os.environ:
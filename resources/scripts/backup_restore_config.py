@@ -4,12 +4,25 @@
 from __future__ import absolute_import, division, print_function
 
 import argparse
+import ctypes
+import ctypes.util
+import fcntl
+import hashlib
+import json
 import logging
 import os
 import random
+import select
+import shutil
+import signal
+import stat
+import struct
 import subprocess
 import sys
 import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 # Enable logging
 logging.basicConfig(
@@ -21,7 +34,9 @@ log = logging.getLogger(__name__)
 
 parser = argparse.ArgumentParser()
 parser.add_argument('mode', type=str, default="backup", help='Either backup or restore the workspace configuration.',
-                    choices=["backup", "restore", "schedule"])
+                    choices=["backup", "restore", "schedule", "watch", "list", "prune", "workspace", "workspace-restore"])
+parser.add_argument('snapshot', type=str, nargs='?', default=None,
+                    help='Snapshot or workspace backup to restore (default: latest).')
 
 args, unknown = parser.parse_known_args()
 if unknown:
@@ -32,9 +47,418 @@ USER_HOME = os.getenv('HOME')
 RESOURCE_FOLDER = os.getenv('RESOURCES_PATH')
 CONFIG_BACKUP_ENABLED = os.getenv('CONFIG_BACKUP_ENABLED')
 CONFIG_BACKUP_FOLDER = WORKSPACE_HOME + "/.workspace/backup/"
+# Snapshot store: every file content is stored once (compressed, by hash), every snapshot is a manifest
+OBJECTS_FOLDER = os.path.join(CONFIG_BACKUP_FOLDER, "objects")
+SNAPSHOTS_FOLDER = os.path.join(CONFIG_BACKUP_FOLDER, "snapshots")
+STORE_LOCK_FILE = os.path.join(CONFIG_BACKUP_FOLDER, ".lock")
+# the store contains private files (e.g. ~/.ssh) -> only accessible by the user
+STORE_FOLDER_MODE = 0o700
+STORE_FILE_MODE = 0o600
+# Number of latest snapshots that are kept, additionally the last snapshot of every day is kept for the retention days
+DEFAULT_SNAPSHOT_RETENTION = 20
+try:
+    SNAPSHOT_RETENTION = int(os.getenv('CONFIG_BACKUP_RETENTION', str(DEFAULT_SNAPSHOT_RETENTION)))
+except ValueError:
+    log.warning("CONFIG_BACKUP_RETENTION needs to be a number, using " + str(DEFAULT_SNAPSHOT_RETENTION) + ".")
+    SNAPSHOT_RETENTION = DEFAULT_SNAPSHOT_RETENTION
+DAILY_SNAPSHOT_RETENTION_DAYS = 30
+
+# Files and folders (with all of their content) that are backed up, relative to the user home
+# Do not backup vscode extensions? .vscode
+BACKUP_PATHS = [
+    ".config/xfce4/xfconf",
+    ".config/fcitx",
+    ".config/Code/User/settings.json",
+    ".config/gtk-3.0/bookmarks",
+    ".gitconfig",
+    "filebrowser.db",
+    ".local/share/jupyter/kernels",
+    ".jupyter",
+    ".ssh",
+]
+BACKUP_EXCLUDES = [".ssh/environment"]
+MAX_FILE_SIZE = 100 * 1024 * 1024  # bytes
+COMPRESSION_LEVEL = 6
+
+# rsync flags of the restore of backups created before the snapshot store (single mirror)
+RSYNC_FLAGS = "-a -r -t -E -X -A"
+RESTORE_WORKERS = 4
+
+# Backup agent: changes are synced after no further change for the debounce time (at the latest after the max delay)
+SYNC_DEBOUNCE = 2  # seconds
+MAX_SYNC_DELAY = 30  # seconds
+
+# inotify (see man 7 inotify)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_backup_enabled() -> bool:
+    return CONFIG_BACKUP_ENABLED is not None and CONFIG_BACKUP_ENABLED.lower() not in ["false", "off"]
+
+
+def is_selected(path: str) -> bool:
+    """Check if the path (relative to the user home) is part of the backup."""
+    for excluded_path in BACKUP_EXCLUDES:
+        if path == excluded_path or path.startswith(excluded_path + "/"):
+            return False
+    return any(path == backup_path or path.startswith(backup_path + "/") for backup_path in BACKUP_PATHS)
+
+
+def is_backup_parent(path: str) -> bool:
+    """Check if the folder (relative to the user home) contains any of the backup paths."""
+    return path == "" or any(backup_path.startswith(path + "/") for backup_path in BACKUP_PATHS)
+
+
+def create_store_folder(path: str):
+    """Create a folder of the store that is only accessible by the user (the backup contains e.g. ~/.ssh)."""
+    path = os.path.normpath(path)
+    parent_path = os.path.dirname(path)
+    if path != os.path.normpath(CONFIG_BACKUP_FOLDER) and not os.path.isdir(parent_path):
+        # e.g. objects folder of a new object prefix
+        create_store_folder(parent_path)
+    os.makedirs(path, mode=STORE_FOLDER_MODE, exist_ok=True)
+    # stores created before were readable by everyone
+    if stat.S_IMODE(os.stat(path).st_mode) != STORE_FOLDER_MODE:
+        os.chmod(path, STORE_FOLDER_MODE)
+
+
+class StoreLock:
+    """Exclusive lock of the snapshot store, e.g. the backup agent and a manual backup run at the same time."""
+
+    def __enter__(self):
+        create_store_folder(CONFIG_BACKUP_FOLDER)
+        self.file = os.fdopen(os.open(STORE_LOCK_FILE, os.O_WRONLY | os.O_CREAT, STORE_FILE_MODE), "w")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def get_object_path(content_hash: str) -> str:
+    return os.path.join(OBJECTS_FOLDER, content_hash[:2], content_hash)
+
+
+def write_atomic(file_path: str, data: bytes):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_file = file_path + ".tmp"
+    # created with the final permissions, the content is never readable by others
+    with os.fdopen(os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, STORE_FILE_MODE), "wb") as file:
+        os.fchmod(file.fileno(), STORE_FILE_MODE)
+        file.write(data)
+    os.replace(temp_file, file_path)
+
+
+def store_object(os_path: str) -> str:
+    """Store the file content (once per content) and return its hash."""
+    with open(os_path, "rb") as file:
+        data = file.read()
+    content_hash = hashlib.sha256(data).hexdigest()
+    object_path = get_object_path(content_hash)
+    if not os.path.exists(object_path):
+        create_store_folder(os.path.dirname(object_path))
+        write_atomic(object_path, zlib.compress(data, COMPRESSION_LEVEL))
+    return content_hash
+
+
+def list_snapshots() -> list:
+    """Ids of all snapshots, oldest first."""
+    if not os.path.isdir(SNAPSHOTS_FOLDER):
+        return []
+    return sorted(file_name[:-len(".json")] for file_name in os.listdir(SNAPSHOTS_FOLDER) if file_name.endswith(".json"))
+
+
+def load_snapshot(snapshot_id: str) -> dict:
+    with open(os.path.join(SNAPSHOTS_FOLDER, snapshot_id + ".json"), "r") as file:
+        return json.load(file)
+
+
+def scan_path(path: str, snapshot: dict, previous_files: dict):
+    """Add the file, symlink or folder (with all of its content) to the snapshot."""
+    if not is_selected(path):
+        return
+    os_path = os.path.join(USER_HOME, path)
+    try:
+        path_stat = os.lstat(os_path)
+    except OSError:
+        # does not exist (anymore)
+        return
+
+    if stat.S_ISLNK(path_stat.st_mode):
+        snapshot["links"][path] = os.readlink(os_path)
+    elif stat.S_ISDIR(path_stat.st_mode):
+        snapshot["folders"][path] = stat.S_IMODE(path_stat.st_mode)
+        for entry in os.listdir(os_path):
+            scan_path(path + "/" + entry, snapshot, previous_files)
+    elif stat.S_ISREG(path_stat.st_mode) and path_stat.st_size <= MAX_FILE_SIZE:
+        previous_file = previous_files.get(path)
+        if (
+            previous_file
+            and previous_file["size"] == path_stat.st_size
+            and previous_file["mtime_ns"] == path_stat.st_mtime_ns
+        ):
+            # unchanged since the previous snapshot, the file does not need to be read
+            content_hash = previous_file["hash"]
+        else:
+            content_hash = store_object(os_path)
+        snapshot["files"][path] = {
+            "hash": content_hash,
+            "size": path_stat.st_size,
+            "mode": stat.S_IMODE(path_stat.st_mode),
+            "mtime_ns": path_stat.st_mtime_ns,
+        }
+
+
+def create_snapshot(changed_paths: set = None) -> Optional[str]:
+    """Create a snapshot of the backup paths. If changed paths are provided, only those are scanned again.
+
+    Returns the snapshot id or None if nothing changed since the latest snapshot.
+    """
+    with StoreLock():
+        snapshot_ids = list_snapshots()
+        previous_snapshot = load_snapshot(snapshot_ids[-1]) if snapshot_ids else None
+        previous_files = previous_snapshot["files"] if previous_snapshot else {}
+
+        snapshot = {"files": {}, "links": {}, "folders": {}}
+        scanned_paths = BACKUP_PATHS
+        if changed_paths is not None and previous_snapshot:
+            # keep all entries of the previous snapshot that are not within the changed paths
+            def is_changed(path: str) -> bool:
+                return any(path == changed_path or path.startswith(changed_path + "/") for changed_path in changed_paths)
+
+            for entry_type in snapshot:
+                snapshot[entry_type] = {
+                    path: value for path, value in previous_snapshot[entry_type].items() if not is_changed(path)
+                }
+            scanned_paths = changed_paths
+
+        for path in sorted(scanned_paths):
+            scan_path(path, snapshot, previous_files)
+
+        if previous_snapshot and all(snapshot[entry_type] == previous_snapshot[entry_type] for entry_type in snapshot):
+            log.debug("Configuration did not change since snapshot " + previous_snapshot["id"])
+            return None
+
+        snapshot_id = time.strftime("%Y%m%d-%H%M%S")
+        if snapshot_ids and snapshot_ids[-1].startswith(snapshot_id):
+            snapshot_id += "-" + str(len([existing for existing in snapshot_ids if existing.startswith(snapshot_id)]))
+        snapshot["id"] = snapshot_id
+        snapshot["created"] = time.time()
+        create_store_folder(SNAPSHOTS_FOLDER)
+        write_atomic(os.path.join(SNAPSHOTS_FOLDER, snapshot_id + ".json"), json.dumps(snapshot).encode("utf-8"))
+        log.info("Created configuration snapshot " + snapshot_id + " (" + str(len(snapshot["files"])) + " files).")
+
+        prune_snapshots()
+        return snapshot_id
+
+
+def prune_snapshots():
+    """Remove all snapshots outside of the retention and all unused objects. Requires the store lock."""
+    snapshot_ids = list_snapshots()
+    kept_snapshots = set(snapshot_ids[-SNAPSHOT_RETENTION:]) if SNAPSHOT_RETENTION > 0 else set()
+    # snapshot ids start with the date -> the last snapshot of every day is kept for the retention days
+    daily_snapshots = {}
+    for snapshot_id in snapshot_ids:
+        daily_snapshots[snapshot_id[:8]] = snapshot_id
+    kept_snapshots.update(sorted(daily_snapshots.values())[-DAILY_SNAPSHOT_RETENTION_DAYS:])
+
+    for snapshot_id in snapshot_ids:
+        if snapshot_id not in kept_snapshots:
+            os.remove(os.path.join(SNAPSHOTS_FOLDER, snapshot_id + ".json"))
+            log.info("Removed configuration snapshot " + snapshot_id)
+
+    used_objects = set()
+    for snapshot_id in kept_snapshots:
+        used_objects.update(file_info["hash"] for file_info in load_snapshot(snapshot_id)["files"].values())
+
+    if not os.path.isdir(OBJECTS_FOLDER):
+        return
+    for prefix in os.listdir(OBJECTS_FOLDER):
+        for object_name in os.listdir(os.path.join(OBJECTS_FOLDER, prefix)):
+            if object_name not in used_objects:
+                os.remove(os.path.join(OBJECTS_FOLDER, prefix, object_name))
+
+
+def restore_file(path: str, file_info: dict):
+    with open(get_object_path(file_info["hash"]), "rb") as file:
+        data = zlib.decompress(file.read())
+    os_path = os.path.join(USER_HOME, path)
+    write_atomic(os_path, data)
+    os.chmod(os_path, file_info["mode"])
+    os.utime(os_path, ns=(file_info["mtime_ns"], file_info["mtime_ns"]))
+
+
+def restore_snapshot(snapshot_id: str):
+    snapshot = load_snapshot(snapshot_id)
+    log.info("Restoring configuration snapshot " + snapshot_id + " (" + str(len(snapshot["files"])) + " files).")
+
+    for path, mode in sorted(snapshot["folders"].items()):
+        os_path = os.path.join(USER_HOME, path)
+        if not os.path.isdir(os_path):
+            os.makedirs(os_path)
+        os.chmod(os_path, mode)
+
+    # restore needs to finish before other configuration -> files are restored in parallel
+    with ThreadPoolExecutor(max_workers=RESTORE_WORKERS) as executor:
+        futures = {executor.submit(restore_file, path, file_info): path for path, file_info in snapshot["files"].items()}
+        for future, path in futures.items():
+            try:
+                future.result()
+            except Exception as ex:
+                log.warning("Failed to restore " + path + ": " + str(ex))
+
+    for path, target in snapshot["links"].items():
+        os_path = os.path.join(USER_HOME, path)
+        if os.path.isdir(os_path) and not os.path.islink(os_path):
+            shutil.rmtree(os_path)
+        elif os.path.lexists(os_path):
+            os.remove(os_path)
+        os.symlink(target, os_path)
+
+
+def restore_mirror():
+    """Restore a backup that was created before the snapshot store (single rsync mirror)."""
+    store_entries = [os.path.basename(OBJECTS_FOLDER), os.path.basename(SNAPSHOTS_FOLDER), os.path.basename(STORE_LOCK_FILE)]
+    mirror_entries = [entry for entry in os.listdir(CONFIG_BACKUP_FOLDER) if entry not in store_entries]
+
+    def restore_entry(entry: str):
+        rsync_restore = ["rsync"] + RSYNC_FLAGS.split() + [os.path.join(CONFIG_BACKUP_FOLDER, entry), USER_HOME + "/"]
+        log.debug("Run rsync restore: " + " ".join(rsync_restore))
+        subprocess.call(rsync_restore)
+
+    # restore all top-level entries of the mirror in parallel
+    with ThreadPoolExecutor(max_workers=RESTORE_WORKERS) as executor:
+        list(executor.map(restore_entry, mirror_entries))
+
+
+class BackupWatcher:
+    """Watches all backup paths (and their parent folders for newly created paths) via inotify."""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "Failed to initialize inotify")
+        # watch descriptor -> watched folder relative to the user home
+        self.watches = {}
+        # some events were lost, everything needs to be synced
+        self.full_sync_required = False
+
+    def add_watches(self, path: str):
+        """Watch the folder and all subfolders that belong to the backup."""
+        if not is_selected(path) and not is_backup_parent(path):
+            return
+        os_path = os.path.join(USER_HOME, path)
+        if not os.path.isdir(os_path) or os.path.islink(os_path):
+            return
+
+        watch_descriptor = self.libc.inotify_add_watch(self.fd, os.fsencode(os_path), WATCH_MASK)
+        if watch_descriptor < 0:
+            log.warning("Failed to watch " + os_path + ": " + os.strerror(ctypes.get_errno()))
+            return
+        self.watches[watch_descriptor] = path
+
+        try:
+            with os.scandir(os_path) as folder:
+                for entry in folder:
+                    if entry.is_dir(follow_symlinks=False):
+                        self.add_watches((path + "/" + entry.name).lstrip("/"))
+        except OSError:
+            # folder was removed in the meantime
+            pass
+
+    def read_changes(self) -> set:
+        """Read the pending events and return the changed backup paths."""
+        changed_paths = set()
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            watch_descriptor, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_length].rstrip(b"\0"))
+            offset += name_length
+
+            if mask & IN_Q_OVERFLOW:
+                self.full_sync_required = True
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(watch_descriptor, None)
+                continue
+            folder = self.watches.get(watch_descriptor)
+            if folder is None or not name:
+                continue
+
+            path = (folder + "/" + name).lstrip("/")
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_watches(path)
+                # content could have been created before the watch was added
+                changed_paths.update(
+                    backup_path for backup_path in BACKUP_PATHS
+                    if backup_path.startswith(path + "/") and os.path.exists(os.path.join(USER_HOME, backup_path))
+                )
+            if is_selected(path):
+                changed_paths.add(path)
+        return changed_paths
+
+
+def run_backup_agent():
+    watcher = BackupWatcher()
+    watcher.add_watches("")
+    log.info("Watching " + str(len(watcher.watches)) + " folders for configuration changes.")
+    # backup changes that happened while the agent was not running
+    create_snapshot()
+
+    stop_requested = []
+
+    def request_stop(signum, frame):
+        stop_requested.append(signum)
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    pending_paths = set()
+    first_change = last_change = 0
+    while not stop_requested:
+        readable, _, _ = select.select([watcher.fd], [], [], 1)
+        if readable:
+            changed_paths = watcher.read_changes()
+            if changed_paths:
+                if not pending_paths:
+                    first_change = time.time()
+                last_change = time.time()
+                pending_paths.update(changed_paths)
+
+        if watcher.full_sync_required:
+            log.info("Too many configuration changes, running full backup.")
+            watcher.full_sync_required = False
+            pending_paths.clear()
+            create_snapshot()
+        elif pending_paths and (
+            time.time() - last_change >= SYNC_DEBOUNCE or time.time() - first_change >= MAX_SYNC_DELAY
+        ):
+            create_snapshot(pending_paths)
+            pending_paths.clear()
+
+    if pending_paths:
+        # e.g. container is stopped
+        log.info("Flushing " + str(len(pending_paths)) + " pending configuration changes.")
+        create_snapshot(pending_paths)
+
 
 if args.mode == "restore":
-    if CONFIG_BACKUP_ENABLED is None or CONFIG_BACKUP_ENABLED.lower() == "false" or CONFIG_BACKUP_ENABLED.lower() == "off":
+    if not is_backup_enabled():
         log.info("Configuration Backup is not activated. Restore process will not be started.")
         sys.exit()
 
@@ -43,45 +467,63 @@ if args.mode == "restore":
     if not os.path.exists(CONFIG_BACKUP_FOLDER) or len(os.listdir(CONFIG_BACKUP_FOLDER)) == 0:
         log.info("Nothing to restore. Config backup folder is empty.")
         sys.exit()
-    
-    # set verbose? -v
-    rsync_restore =  "rsync -a -r -t -z -E -X -A " + CONFIG_BACKUP_FOLDER + " " + USER_HOME
-    log.debug("Run rsync restore: " + rsync_restore)
-    subprocess.call(rsync_restore, shell=True)
+
+    snapshot_ids = list_snapshots()
+    if args.snapshot:
+        if args.snapshot not in snapshot_ids:
+            log.error("Snapshot " + args.snapshot + " does not exist. Available snapshots: " + ", ".join(snapshot_ids))
+            sys.exit(1)
+        restore_snapshot(args.snapshot)
+    elif snapshot_ids:
+        restore_snapshot(snapshot_ids[-1])
+    else:
+        restore_mirror()
 elif args.mode == "backup":
-    if not os.path.exists(CONFIG_BACKUP_FOLDER):
-        os.makedirs(CONFIG_BACKUP_FOLDER)
-    
     log.info("Starting configuration backup.")
-    backup_selection = "--include='/.config' \
-                        --include='/.config/xfce4/' --include='/.config/xfce4/xfconf/***' \
-                        --include='/.config/fcitx/' \
-                        --include='/.config/Code/' --include='/.config/Code/User/' --include='/.config/Code/User/settings.json' \
-                        --include='/.config/gtk-3.0/' --include='/.config/gtk-3.0/bookmarks' \
-                        --include='/.gitconfig' \
-                        --include='/filebrowser.db' \
-                        --include='/.local/' --include='/.local/share/' --include='/.local/share/jupyter/' --include='/.local/share/jupyter/kernels/***' \
-                        --include='/.jupyter/***'"
-    # Do not backup vscode extensions? --include='/.vscode/***' \
-    
-    # TODO configure selection via environemnt flag? 
-    # set verbose? -v
-    rsync_backup =  "rsync -a -r -t -z -E -X -A --delete-excluded --max-size=100m \
-                        " + backup_selection + " \
-                        --exclude='/.ssh/environment' --include='/.ssh/***' \
-                        --exclude='*' " + USER_HOME + "/ " + CONFIG_BACKUP_FOLDER
-    log.debug("Run rsync backup: " + rsync_backup)
-    subprocess.call(rsync_backup, shell=True)
+    create_snapshot()
+elif args.mode == "list":
+    for snapshot_id in list_snapshots():
+        snapshot = load_snapshot(snapshot_id)
+        snapshot_size = sum(file_info["size"] for file_info in snapshot["files"].values())
+        print(snapshot_id + "\t" + str(len(snapshot["files"])) + " files\t" + str(round(snapshot_size / 1024, 1)) + " KB")
+elif args.mode == "prune":
+    with StoreLock():
+        prune_snapshots()
+elif args.mode in ["workspace", "workspace-restore"]:
+    # Backup of the workspace folder to WORKSPACE_BACKUP_TARGET (S3-compatible object store or directory)
+    from jupyter_tooling import workspace_backup
+
+    try:
+        target = workspace_backup.get_target()
+    except ValueError as ex:
+        log.info(str(ex))
+        sys.exit()
+
+    if args.mode == "workspace":
+        log.info("Starting workspace backup to " + workspace_backup.WORKSPACE_BACKUP_TARGET)
+        workspace_backup.backup_workspace(target)
+    else:
+        try:
+            workspace_backup.restore_workspace(target, args.snapshot)
+        except ValueError as ex:
+            log.error(str(ex))
+            sys.exit(1)
+elif args.mode == "watch":
+    if not is_backup_enabled():
+        log.info("Configuration Backup is not activated.")
+        sys.exit()
 
+    log.info("Starting configuration backup agent.")
+    run_backup_agent()
 elif args.mode == "schedule":
+    # Hourly full backup via cron, the backup agent (watch) is used by default
     DEFAULT_CRON = "0 * * * *"  # every hour
 
-    if CONFIG_BACKUP_ENABLED is None or CONFIG_BACKUP_ENABLED.lower() == "false" or CONFIG_BACKUP_ENABLED.lower() == "off":
+    if not is_backup_enabled():
         log.info("Configuration Backup is not activated.")
         sys.exit()
 
-    if not os.path.exists(CONFIG_BACKUP_FOLDER):
-        os.makedirs(CONFIG_BACKUP_FOLDER)
+    create_store_folder(CONFIG_BACKUP_FOLDER)
     
     from crontab import CronTab, CronSlices
 
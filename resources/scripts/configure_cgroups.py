@@ -0,0 +1,113 @@
+#!/usr/bin/python
+
+"""
+Configure cgroup v2 hierarchy for per-kernel resource isolation
+
+Creates two child groups in the cgroup of the container:
+- workspace: all processes of the workspace (supervisor, Jupyter server, nginx, ...), protected
+  with a higher cpu weight and a minimum amount of memory that is not reclaimed.
+- kernels: parent group of the kernel groups that are created by the kernel launcher
+  (see jupyter_tooling/kernel_cgroups.py), delegated to the workspace user.
+"""
+
+import os
+import pwd
+import sys
+import time
+
+# Enable logging
+import logging
+logging.basicConfig(
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    level=logging.INFO,
+    stream=sys.stdout)
+
+log = logging.getLogger(__name__)
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+WORKSPACE_CGROUP = os.path.join(CGROUP_ROOT, "workspace")
+KERNELS_CGROUP = os.path.join(CGROUP_ROOT, "kernels")
+
+WORKSPACE_USER = os.getenv("NB_USER", "ml")
+# cpu.weight range is 1 - 10000, default is 100
+WORKSPACE_CPU_WEIGHT = 1000
+# memory of the workspace processes that is protected from reclaim by kernels
+WORKSPACE_PROTECTED_MEMORY = 512 * 1024 * 1024
+CONTROLLERS = ["cpu", "memory"]
+# processes might get started while moving -> retry enabling the controllers
+MAX_RETRIES = 10
+
+
+def write_file(path: str, value: str):
+    with open(path, "w") as file:
+        file.write(value)
+
+
+def read_file(path: str) -> str:
+    with open(path, "r") as file:
+        return file.read().strip()
+
+
+def move_processes(source_cgroup: str, target_cgroup: str):
+    for pid in read_file(os.path.join(source_cgroup, "cgroup.procs")).split():
+        try:
+            write_file(os.path.join(target_cgroup, "cgroup.procs"), pid)
+        except OSError:
+            # process exited in the meantime
+            pass
+
+
+if not os.path.isfile(os.path.join(CGROUP_ROOT, "cgroup.controllers")):
+    log.warning("Kernel cgroups require cgroup v2. Kernels will share the cgroup of the workspace.")
+    sys.exit(1)
+
+if not os.access(CGROUP_ROOT, os.W_OK):
+    log.warning(
+        "Cgroup filesystem is not writable (run the container with a private cgroup namespace). "
+        "Kernels will share the cgroup of the workspace."
+    )
+    sys.exit(1)
+
+available_controllers = read_file(os.path.join(CGROUP_ROOT, "cgroup.controllers")).split()
+controllers = [controller for controller in CONTROLLERS if controller in available_controllers]
+if not controllers:
+    log.warning("No cpu or memory controller available for kernel cgroups.")
+    sys.exit(1)
+
+for cgroup in [WORKSPACE_CGROUP, KERNELS_CGROUP]:
+    if not os.path.exists(cgroup):
+        os.mkdir(cgroup)
+
+# controllers can only be enabled for child groups if the group itself does not contain processes
+subtree_control = " ".join(["+" + controller for controller in controllers])
+for retry in range(MAX_RETRIES):
+    move_processes(CGROUP_ROOT, WORKSPACE_CGROUP)
+    try:
+        write_file(os.path.join(CGROUP_ROOT, "cgroup.subtree_control"), subtree_control)
+        break
+    except OSError:
+        time.sleep(0.1)
+else:
+    log.warning("Failed to enable cgroup controllers: " + subtree_control)
+    sys.exit(1)
+
+write_file(os.path.join(KERNELS_CGROUP, "cgroup.subtree_control"), subtree_control)
+
+# protect the workspace processes from resource-hungry kernels
+if "cpu" in controllers:
+    write_file(os.path.join(WORKSPACE_CGROUP, "cpu.weight"), str(WORKSPACE_CPU_WEIGHT))
+if "memory" in controllers:
+    write_file(os.path.join(WORKSPACE_CGROUP, "memory.min"), str(WORKSPACE_PROTECTED_MEMORY))
+
+# delegate the kernels group to the workspace user, so that the kernel launcher can create groups
+user = pwd.getpwnam(WORKSPACE_USER)
+for path in [
+    KERNELS_CGROUP,
+    os.path.join(KERNELS_CGROUP, "cgroup.procs"),
+    os.path.join(KERNELS_CGROUP, "cgroup.subtree_control"),
+    # moving a process requires write access to the common ancestor of source and target group
+    os.path.join(CGROUP_ROOT, "cgroup.procs"),
+]:
+    os.chown(path, user.pw_uid, user.pw_gid)
+
+log.info("Configured kernel cgroups with controllers: " + ", ".join(controllers))
@@ -78,6 +78,39 @@ if ENV_NAME_SERVICE_SSL_ENABLED in os.environ \
 
 ###
 
+# PREPARE STATIC ASSET CACHE
+# Versioned static assets of Jupyter, VS Code and noVNC are cached on disk by nginx,
+# so that they are not proxied (and authenticated) against the backing process on every load
+ENV_NAME_STATIC_CACHE_ENABLED = "STATIC_CACHE_ENABLED"
+STATIC_CACHE_CONFIG_FILE = "/etc/nginx/static-cache.conf"
+STATIC_CACHE_FOLDER = "/var/cache/nginx/static"
+
+static_cache_max_size = os.getenv("STATIC_CACHE_MAX_SIZE", "1g").strip()
+call("sed -i 's@{STATIC_CACHE_MAX_SIZE}@" + static_cache_max_size + "@g' " + NGINX_FILE, shell=True)
+
+if os.getenv(ENV_NAME_STATIC_CACHE_ENABLED, "false").lower().strip() in ["true", "on"]:
+    log.info("Activate static asset cache in " + STATIC_CACHE_FOLDER)
+    call("mkdir -p " + STATIC_CACHE_FOLDER + " && chmod 777 " + STATIC_CACHE_FOLDER, shell=True)
+
+    # only responses that are selected via $static_cache_bypass (see nginx.conf) get stored.
+    # Upstream cache headers are ignored for storing since versioned assets never change.
+    with open(STATIC_CACHE_CONFIG_FILE, "w") as f:
+        f.write("proxy_cache static_cache;\n")
+        f.write("proxy_cache_key $request_uri;\n")
+        f.write("proxy_cache_bypass $static_cache_bypass;\n")
+        f.write("proxy_no_cache $static_cache_bypass;\n")
+        f.write("proxy_cache_valid 200 7d;\n")
+        f.write("proxy_cache_lock on;\n")
+        f.write("proxy_cache_use_stale error timeout updating;\n")
+        f.write("proxy_ignore_headers Cache-Control Expires;\n")
+        f.write("expires $static_cache_expires;\n")
+        f.write("add_header X-Cache-Status $upstream_cache_status;\n")
+
+    call("sed -i 's@#proxy_cache_path@proxy_cache_path@g' " + NGINX_FILE, shell=True)
+    call("sed -i 's@#include " + STATIC_CACHE_CONFIG_FILE + "@include " + STATIC_CACHE_CONFIG_FILE + "@g' " + NGINX_FILE, shell=True)
+
+###
+
 # PREPARE BASIC AUTH
 # Basic Auth enablment is important for a standalone workspace deployment, as there the 
 # /tools path is not protected by Jupyter's token!
@@ -0,0 +1,209 @@
+#!/usr/bin/python
+
+"""
+Detect and restart processes with leaking memory.
+
+All processes are sampled in one pass per check. A process is considered leaking if its resident
+memory grows steadily (linear regression over the sample window) faster than the slope threshold,
+or if it exceeds its configured maximum memory. Leaking processes are handled with the configured
+action: kill, restart (kill and start again with the same command), supervisor:<program>, or log.
+"""
+
+import collections
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+import xmlrpc.client
+from typing import Optional
+
+import psutil
+
+# Enable logging
+logging.basicConfig(
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    level=logging.INFO,
+    stream=sys.stdout)
+
+log = logging.getLogger(__name__)
+
+SUPERVISOR_RPC_URL = "http://127.0.0.1:8059/RPC2"
+CHECK_INTERVAL = 30  # seconds
+# samples used for the regression (30 minutes), a decision needs at least the minimum number of samples
+SAMPLE_WINDOW = 60
+MIN_SAMPLES = 20
+# memory growth needs to be steady to be considered a leak (coefficient of determination of the regression)
+MIN_TREND_FIT = 0.8
+# processes below this memory usage are never considered leaking
+MIN_LEAK_MEMORY = 100 * 1024 * 1024  # bytes
+RESTART_DELAY = 5  # seconds
+
+# Comma-separated list of <process name pattern>=<action>[:<max memory in MB>],
+# patterns with the cmd: prefix are matched against the command line instead
+LEAK_WATCHDOG_PROCESSES = os.getenv(
+    "LEAK_WATCHDOG_PROCESSES", "xfdesktop=kill:250,xfsettingsd=kill:250,xfce4-panel=restart:250"
+)
+# memory growth in MB per hour that is considered a leak
+LEAK_WATCHDOG_SLOPE = os.getenv("LEAK_WATCHDOG_SLOPE", "50")
+
+CMDLINE_PATTERN_PREFIX = "cmd:"
+
+WatchedProcess = collections.namedtuple("WatchedProcess", ["pattern", "match_cmdline", "action", "max_memory"])
+
+
+def parse_watched_processes(value: str) -> list:
+    watched_processes = []
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        pattern, _, action = entry.strip().partition("=")
+        pattern = pattern.strip()
+        match_cmdline = pattern.startswith(CMDLINE_PATTERN_PREFIX)
+        if match_cmdline:
+            pattern = pattern[len(CMDLINE_PATTERN_PREFIX):]
+        action = action.strip() or "kill"
+        max_memory = None
+        # the last part is the max memory if it is a number (actions can contain ":" as well)
+        action_name, _, action_suffix = action.rpartition(":")
+        if action_name and action_suffix.isdigit():
+            action = action_name
+            max_memory = int(action_suffix) * 1024 * 1024
+        watched_processes.append(WatchedProcess(re.compile(pattern), match_cmdline, action, max_memory))
+    return watched_processes
+
+
+def get_memory_trend(samples) -> tuple:
+    """Least squares slope (bytes per second) and coefficient of determination of the (time, memory) samples."""
+    sample_count = len(samples)
+    mean_time = sum(sample[0] for sample in samples) / sample_count
+    mean_memory = sum(sample[1] for sample in samples) / sample_count
+
+    covariance = sum((sample[0] - mean_time) * (sample[1] - mean_memory) for sample in samples)
+    time_variance = sum((sample[0] - mean_time) ** 2 for sample in samples)
+    memory_variance = sum((sample[1] - mean_memory) ** 2 for sample in samples)
+    if not time_variance or not memory_variance:
+        return 0.0, 0.0
+
+    slope = covariance / time_variance
+    fit = covariance ** 2 / (time_variance * memory_variance)
+    return slope, fit
+
+
+def restart_process(process: psutil.Process, cmdline: list):
+    environment = process.environ()
+    cwd = process.cwd()
+    process.kill()
+    process.wait(timeout=RESTART_DELAY)
+    time.sleep(RESTART_DELAY)
+    subprocess.Popen(
+        cmdline,
+        cwd=cwd,
+        env=environment,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def handle_leak(process: psutil.Process, cmdline: list, watched_process: WatchedProcess):
+    if watched_process.action == "log":
+        return
+    if watched_process.action == "kill":
+        process.kill()
+    elif watched_process.action == "restart":
+        restart_process(process, cmdline)
+    elif watched_process.action.startswith("supervisor:"):
+        program = watched_process.action[len("supervisor:"):]
+        supervisor = xmlrpc.client.ServerProxy(SUPERVISOR_RPC_URL)
+        supervisor.supervisor.stopProcess(program)
+        supervisor.supervisor.startProcess(program)
+    else:
+        log.warning("Unknown leak action " + watched_process.action)
+
+
+class LeakWatchdog:
+    def __init__(self, watched_processes: list, leak_slope: float):
+        self.watched_processes = watched_processes
+        # bytes per second
+        self.leak_slope = leak_slope
+        # (pid, create time) -> memory samples of the process
+        self.samples = {}
+
+    def get_watched_process(self, name: str, cmdline: list) -> Optional[WatchedProcess]:
+        for watched_process in self.watched_processes:
+            if watched_process.match_cmdline:
+                if cmdline and watched_process.pattern.search(" ".join(cmdline)):
+                    return watched_process
+            elif watched_process.pattern.fullmatch(name or ""):
+                return watched_process
+        return None
+
+    def check(self):
+        now = time.time()
+        sampled_processes = set()
+        for process in psutil.process_iter(["name", "cmdline", "create_time", "memory_info"]):
+            info = process.info
+            if not info["memory_info"]:
+                continue
+            watched_process = self.get_watched_process(info["name"], info["cmdline"])
+            if not watched_process:
+                continue
+
+            process_key = (process.pid, info["create_time"])
+            sampled_processes.add(process_key)
+            samples = self.samples.setdefault(process_key, collections.deque(maxlen=SAMPLE_WINDOW))
+            memory = info["memory_info"].rss
+            samples.append((now, memory))
+
+            leak_reason = None
+            if watched_process.max_memory and memory > watched_process.max_memory:
+                leak_reason = "memory exceeds " + str(round(watched_process.max_memory / 1024 / 1024)) + " MB"
+            elif len(samples) >= MIN_SAMPLES and memory > MIN_LEAK_MEMORY:
+                slope, fit = get_memory_trend(samples)
+                if slope > self.leak_slope and fit > MIN_TREND_FIT:
+                    leak_reason = "memory grows by " + str(round(slope * 3600 / 1024 / 1024)) + " MB per hour"
+
+            if not leak_reason:
+                continue
+
+            log.info(
+                info["name"] + " (" + str(process.pid) + ", " + str(round(memory / 1024 / 1024)) + " MB) is leaking: "
+                + leak_reason + ". Action: " + watched_process.action
+            )
+            try:
+                handle_leak(process, info["cmdline"], watched_process)
+            except Exception as ex:
+                log.warning("Failed to handle leaking process " + info["name"] + ": " + str(ex))
+            self.samples.pop(process_key, None)
+
+        # forget exited processes
+        for process_key in list(self.samples):
+            if process_key not in sampled_processes:
+                del self.samples[process_key]
+
+
+if __name__ == "__main__":
+    if not LEAK_WATCHDOG_PROCESSES or LEAK_WATCHDOG_PROCESSES.lower().strip() == "false":
+        log.info("Process leak watchdog is not activated.")
+        sys.exit()
+
+    watched_processes = parse_watched_processes(LEAK_WATCHDOG_PROCESSES)
+    try:
+        leak_slope = float(LEAK_WATCHDOG_SLOPE)
+    except ValueError:
+        leak_slope = 50.0
+    log.info(
+        "Watching " + str(len(watched_processes)) + " process patterns for memory leaks (> "
+        + str(leak_slope) + " MB per hour)."
+    )
+
+    watchdog = LeakWatchdog(watched_processes, leak_slope * 1024 * 1024 / 3600)
+    while True:
+        try:
+            watchdog.check()
+        except Exception:
+            log.warning("Failed to check processes for leaks.", exc_info=True)
+        time.sleep(CHECK_INTERVAL)
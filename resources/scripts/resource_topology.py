@@ -0,0 +1,203 @@
+"""
+Resource topology detection
+
+Detects the CPU and memory resources that are actually available to the workspace
+container (cgroup v1 and v2 quotas, cpuset restrictions, memory limits, and NUMA nodes).
+The topology is written to a JSON file at startup (see docker-entrypoint.py) and can be
+read by the Jupyter server or kernels via the RESOURCE_TOPOLOGY_FILE environment variable.
+"""
+
+import glob
+import json
+import math
+import os
+from typing import Optional
+
+HOME = os.getenv("HOME", "/root")
+RESOURCE_TOPOLOGY_FILE = os.getenv(
+    "RESOURCE_TOPOLOGY_FILE", os.path.join(HOME, ".workspace", "resource-topology.json")
+)
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+# cgroup v1 mounts the cpu controller either as cpu or as combined cpu,cpuacct hierarchy
+CGROUP_V1_CPU_FOLDERS = ["cpu", "cpu,cpuacct", "cpuacct,cpu"]
+# cgroup v1 reports a huge number if no memory limit is set
+CGROUP_V1_UNLIMITED_MEMORY = 2 ** 62
+
+
+def _read_file(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as file:
+            return file.read().strip()
+    except Exception:
+        return None
+
+
+def _parse_cpu_list(cpu_list: str) -> list:
+    """Parse a kernel cpu list (e.g. 0-3,8,10-11) into a list of cpu ids."""
+    cpus = []
+    if not cpu_list:
+        return cpus
+
+    for cpu_range in cpu_list.split(","):
+        cpu_range = cpu_range.strip()
+        if not cpu_range:
+            continue
+        if "-" in cpu_range:
+            start, end = cpu_range.split("-", 1)
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(cpu_range))
+    return cpus
+
+
+def get_cgroup_version() -> int:
+    if os.path.isfile(os.path.join(CGROUP_ROOT, "cgroup.controllers")):
+        return 2
+    return 1
+
+
+def get_cpu_quota() -> Optional[float]:
+    """Number of CPUs the container is allowed to use based on the CFS quota, or None if not limited."""
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    cpu_max = _read_file(os.path.join(CGROUP_ROOT, "cpu.max"))
+    if cpu_max:
+        try:
+            quota, period = cpu_max.split()
+            if quota == "max":
+                return None
+            return int(quota) / int(period)
+        except ValueError:
+            return None
+
+    # cgroup v1
+    for cpu_folder in CGROUP_V1_CPU_FOLDERS:
+        quota = _read_file(os.path.join(CGROUP_ROOT, cpu_folder, "cpu.cfs_quota_us"))
+        period = _read_file(os.path.join(CGROUP_ROOT, cpu_folder, "cpu.cfs_period_us"))
+        if quota is None:
+            continue
+        try:
+            if int(quota) <= 0:
+                # -1 -> no quota
+                return None
+            return int(quota) / int(period or 100000)
+        except ValueError:
+            return None
+    return None
+
+
+def get_cpuset() -> list:
+    """Ids of all CPUs the container is allowed to run on."""
+    try:
+        # respects cpuset restrictions for v1 and v2
+        return sorted(os.sched_getaffinity(0))
+    except Exception:
+        pass
+
+    for cpuset_file in [
+        os.path.join(CGROUP_ROOT, "cpuset.cpus.effective"),
+        os.path.join(CGROUP_ROOT, "cpuset", "cpuset.effective_cpus"),
+        os.path.join(CGROUP_ROOT, "cpuset", "cpuset.cpus"),
+    ]:
+        cpus = _parse_cpu_list(_read_file(cpuset_file))
+        if cpus:
+            return cpus
+    return list(range(os.cpu_count() or 1))
+
+
+def get_total_memory() -> Optional[int]:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError):
+        return None
+
+
+def get_memory_limit() -> Optional[int]:
+    """Memory limit of the container in bytes (capped at the total memory), or None if unknown."""
+    memory_limit = None
+
+    # cgroup v2
+    memory_max = _read_file(os.path.join(CGROUP_ROOT, "memory.max"))
+    if memory_max and memory_max.isdigit():
+        memory_limit = int(memory_max)
+
+    # cgroup v1
+    if memory_max is None:
+        limit_in_bytes = _read_file(os.path.join(CGROUP_ROOT, "memory", "memory.limit_in_bytes"))
+        if limit_in_bytes and limit_in_bytes.isdigit() and int(limit_in_bytes) < CGROUP_V1_UNLIMITED_MEMORY:
+            memory_limit = int(limit_in_bytes)
+
+    total_memory = get_total_memory()
+    if not memory_limit or (total_memory and memory_limit > total_memory):
+        # if mem limit from cgroup bigger than total memory -> use total memory
+        memory_limit = total_memory
+    return memory_limit
+
+
+def get_numa_nodes(cpuset: list = None) -> dict:
+    """NUMA node id -> ids of the CPUs of this node that are available to the container."""
+    numa_nodes = {}
+    for node_folder in sorted(glob.glob("/sys/devices/system/node/node[0-9]*")):
+        node_id = os.path.basename(node_folder)[len("node"):]
+        node_cpus = _parse_cpu_list(_read_file(os.path.join(node_folder, "cpulist")))
+        if cpuset is not None:
+            node_cpus = [cpu for cpu in node_cpus if cpu in cpuset]
+        if node_cpus:
+            numa_nodes[node_id] = node_cpus
+    return numa_nodes
+
+
+def get_max_num_threads(topology: dict) -> int:
+    """Number of threads that computation libraries (BLAS, OpenMP, ...) should use."""
+    max_num_threads = math.ceil(topology["available_cpus"] or 0)
+    if not max_num_threads or max_num_threads <= 0:
+        max_num_threads = 4
+
+    if max_num_threads > 8:
+        # there should be atleast one thread less compared to cores
+        max_num_threads -= 1
+
+    # set a maximum of 32, in most cases too many threads are adding too much overhead
+    return min(max_num_threads, 32)
+
+
+def detect_resource_topology() -> dict:
+    cpuset = get_cpuset()
+    cpu_quota = get_cpu_quota()
+
+    available_cpus = float(len(cpuset))
+    if cpu_quota and cpu_quota < available_cpus:
+        available_cpus = cpu_quota
+
+    topology = {
+        "cgroup_version": get_cgroup_version(),
+        "cpu_count": os.cpu_count(),
+        "cpuset": cpuset,
+        "cpu_quota": cpu_quota,
+        "available_cpus": available_cpus,
+        "numa_nodes": get_numa_nodes(cpuset),
+        "memory_limit": get_memory_limit(),
+        "total_memory": get_total_memory(),
+    }
+    topology["max_num_threads"] = get_max_num_threads(topology)
+    return topology
+
+
+def write_resource_topology(topology: dict, topology_file: str = RESOURCE_TOPOLOGY_FILE) -> None:
+    topology_folder = os.path.dirname(topology_file)
+    if not os.path.exists(topology_folder):
+        os.makedirs(topology_folder)
+
+    with open(topology_file, "w") as file:
+        json.dump(topology, file, indent=4)
+
+
+def load_resource_topology(topology_file: str = RESOURCE_TOPOLOGY_FILE) -> dict:
+    """Load the topology written at startup or detect it if the file does not exist."""
+    if os.path.isfile(topology_file):
+        try:
+            with open(topology_file, "r") as file:
+                return json.load(file)
+        except Exception:
+            pass
+    return detect_resource_topology()
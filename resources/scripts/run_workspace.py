@@ -5,62 +5,256 @@ Configure and run tools
 """
 
 from subprocess import call
+from concurrent.futures import ThreadPoolExecutor
 import os
+import runpy
+import socket
 import sys
+import threading
+import time
+import xmlrpc.client
+
+import startup_trace
 
 # Enable logging
 import logging
 logging.basicConfig(
-    format='%(asctime)s [%(levelname)s] %(message)s', 
-    level=logging.INFO, 
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    level=logging.INFO,
     stream=sys.stdout)
 
 log = logging.getLogger(__name__)
 
 log.info("Start Workspace")
 
+workspace_start = startup_trace.now()
+
 ENV_RESOURCES_PATH = os.getenv("RESOURCES_PATH", "/resources")
 
 ENV_OPENP2P_TOKEN = os.getenv("OPENP2P_TOKEN", "")
 
-# Include tutorials 
+KERNEL_CGROUPS_ENABLED = os.getenv("KERNEL_CGROUPS_ENABLED", "false")
+
+# Include tutorials
 WORKSPACE_HOME = os.getenv('WORKSPACE_HOME', "/workspace")
 INCLUDE_TUTORIALS = os.getenv('INCLUDE_TUTORIALS', "true")
 
-# Only copy all content of tutorial folder to workspace folder if it is initialy empty
-if INCLUDE_TUTORIALS.lower() == "true" and os.path.exists(WORKSPACE_HOME) and len(os.listdir(WORKSPACE_HOME)) == 0:
-    log.info("Copy tutorials to /workspace folder")
-    from distutils.dir_util import copy_tree
-    # Copy all files within tutorials folder in resources to workspace home
-    copy_tree(os.path.join(ENV_RESOURCES_PATH, "tutorials"), WORKSPACE_HOME)
+# sys.argv is shared by all in-process scripts -> only one script with arguments can run at a time
+_script_arguments_lock = threading.Lock()
+
+
+def run_script(script_name: str, arguments: list = None, sudo: bool = False):
+    """Run a script from the resources scripts folder.
+
+    Scripts that do not need root permissions are executed in-process, so that no
+    additional python interpreter needs to be started.
+    """
+    script_path = os.path.join(ENV_RESOURCES_PATH, "scripts", script_name)
+    if sudo:
+        return call("sudo python " + script_path + " " + " ".join(arguments or []), shell=True)
+
+    try:
+        if arguments:
+            with _script_arguments_lock:
+                original_arguments = sys.argv
+                sys.argv = [script_path] + arguments
+                try:
+                    runpy.run_path(script_path, run_name="__main__")
+                finally:
+                    sys.argv = original_arguments
+        else:
+            runpy.run_path(script_path, run_name="__main__")
+    except SystemExit as e:
+        return e.code
+    return 0
+
+
+def copy_tutorials():
+    # Only copy all content of tutorial folder to workspace folder if it is initialy empty
+    if INCLUDE_TUTORIALS.lower() == "true" and os.path.exists(WORKSPACE_HOME) and len(os.listdir(WORKSPACE_HOME)) == 0:
+        log.info("Copy tutorials to /workspace folder")
+        from distutils.dir_util import copy_tree
+        # Copy all files within tutorials folder in resources to workspace home
+        copy_tree(os.path.join(ENV_RESOURCES_PATH, "tutorials"), WORKSPACE_HOME)
+
+
+def configure_ssh():
+    log.info("Configure ssh service")
+    run_script("configure_ssh.py", sudo=True)
+
+
+def configure_nginx():
+    log.info("Configure nginx service")
+    run_script("configure_nginx.py", sudo=True)
+
+
+def configure_cgroups():
+    if KERNEL_CGROUPS_ENABLED.lower().strip() == "true":
+        log.info("Configure kernel cgroups")
+        run_script("configure_cgroups.py", sudo=True)
+
+
+def configure_tools():
+    log.info("Configure tools")
+    run_script("configure_tools.py")
+
+
+def run_custom_scripts():
+    log.info("Configure and run custom scripts")
+    run_script("run_custom_scripts.py")
+
+
+def run_openp2p():
+    if ENV_OPENP2P_TOKEN:
+        log.info("Configure and run openp2p scripts")
+        call(ENV_RESOURCES_PATH + "/tools/openp2p.sh --token="+ENV_OPENP2P_TOKEN+"&", shell=True)
+
+
+def run_startup_script():
+    startup_custom_script = os.path.join(WORKSPACE_HOME, "on_startup.sh")
+    if os.path.exists(startup_custom_script):
+        log.info("Run on_startup.sh user script from workspace folder")
+        # run startup script from workspace folder - can be used to run installation routines on workspace updates
+        call("/bin/bash " + startup_custom_script, shell=True)
+
+
+# Startup steps as dependency graph: name -> (function, dependencies, required before supervisor start)
+# Steps without a dependency between each other are executed concurrently.
+STARTUP_STEPS = {
+    "copy-tutorials": (copy_tutorials, [], True),
+    # restore config on startup - if CONFIG_BACKUP_ENABLED - it needs to run before other configuration
+    "restore-config": (lambda: run_script("backup_restore_config.py", ["restore"]), [], True),
+    "configure-ssh": (configure_ssh, ["restore-config"], True),
+    # nginx needs the ssh key to create the key hash for shared links
+    "configure-nginx": (configure_nginx, ["configure-ssh"], True),
+    "configure-tools": (configure_tools, ["restore-config"], True),
+    "run-custom-scripts": (run_custom_scripts, ["configure-ssh", "configure-nginx", "configure-tools"], True),
+    # moves all workspace processes into the protected group, the Jupyter server checks it on start
+    "configure-cgroups": (configure_cgroups, [], True),
+    "run-openp2p": (run_openp2p, [], True),
+    "run-startup-script": (run_startup_script, ["copy-tutorials", "run-custom-scripts"], True),
+}
+
+
+def run_startup_steps(steps: dict) -> dict:
+    """Start all steps concurrently as soon as their dependencies are finished.
+
+    A failing step is logged but does not block its dependents.
+    Returns a dict with the future of every step.
+    """
+    # every step gets its own worker, otherwise steps waiting on dependencies could block the pool
+    executor = ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix="startup")
+    futures = {}
+
+    def run_step(name: str, function, dependencies: list):
+        for dependency in dependencies:
+            futures[dependency].exception()
+        try:
+            with startup_trace.trace(name):
+                function()
+        except Exception:
+            log.error("Startup step " + name + " failed.", exc_info=True)
+            raise
+
+    pending_steps = dict(steps)
+    while pending_steps:
+        # submit steps in topological order, dependencies always have a future already
+        ready_steps = [
+            name for name, (_, dependencies, _) in pending_steps.items()
+            if all(dependency in futures for dependency in dependencies)
+        ]
+        if not ready_steps:
+            raise ValueError("Startup steps contain unknown or cyclic dependencies: " + str(list(pending_steps)))
+        for name in ready_steps:
+            function, dependencies, _ = pending_steps.pop(name)
+            futures[name] = executor.submit(run_step, name, function, dependencies)
+
+    # do not wait for optional steps, they keep running in the background
+    executor.shutdown(wait=False)
+    return futures
+
+
+# Ports that need to accept connections before a supervisor program is considered ready
+SUPERVISOR_PROGRAM_PORTS = {
+    "nginx": 8092,
+    "jupyter": 8090,
+    "sshd": 22,
+    "sslh": int(os.getenv("WORKSPACE_PORT", "8080")),
+    "novnc": 6901,
+    "vncserver": 5901,
+    "netdata": 8050,
+    "ungit": 8051,
+    "vscode": 8054,
+    "filebrowser": 8055,
+}
+SUPERVISOR_RPC_URL = "http://127.0.0.1:8059/RPC2"
+SERVICE_READINESS_TIMEOUT = 300  # seconds
+
+
+def is_port_open(port: int) -> bool:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def trace_service_readiness(supervisor_start: float):
+    """Record when every started supervisor program is ready and write the startup profile."""
+    supervisor = xmlrpc.client.ServerProxy(SUPERVISOR_RPC_URL)
+    ready_programs = {}
+    first_response = None
+
+    while startup_trace.now() - supervisor_start < SERVICE_READINESS_TIMEOUT:
+        time.sleep(0.25)
+        try:
+            process_infos = supervisor.supervisor.getAllProcessInfo()
+        except Exception:
+            # supervisor is not reachable yet
+            continue
+
+        if first_response is None:
+            first_response = startup_trace.now()
 
-# restore config on startup - if CONFIG_BACKUP_ENABLED - it needs to run before other configuration 
-call("python " + ENV_RESOURCES_PATH + "/scripts/backup_restore_config.py restore", shell=True)
+        pending_programs = 0
+        for process_info in process_infos:
+            name = process_info["name"]
+            if name in ready_programs or process_info["statename"] == "STOPPED":
+                # already ready or not started automatically
+                continue
 
-log.info("Configure ssh service")
-call("sudo python " + ENV_RESOURCES_PATH + "/scripts/configure_ssh.py", shell=True)
+            if process_info["statename"] in ["FATAL", "EXITED"]:
+                ready_programs[name] = process_info["statename"]
+                startup_trace.add_event(name, supervisor_start, startup_trace.now(), category="service", args={"state": process_info["statename"]})
+                continue
 
-log.info("Configure nginx service")
-call("sudo python " + ENV_RESOURCES_PATH + "/scripts/configure_nginx.py", shell=True)
+            port = SUPERVISOR_PROGRAM_PORTS.get(name)
+            if process_info["statename"] == "RUNNING" and (not port or is_port_open(port)):
+                ready_programs[name] = process_info["statename"]
+                startup_trace.add_event(name, supervisor_start, startup_trace.now(), category="service", args={"port": port})
+                continue
+            pending_programs += 1
 
-log.info("Configure tools")
-call("python " + ENV_RESOURCES_PATH + "/scripts/configure_tools.py", shell=True)
+        # give supervisor a moment to spawn all programs before the check is finished
+        if pending_programs == 0 and startup_trace.now() - first_response > 2:
+            break
 
-log.info("Configure cron scripts")
-call("python " + ENV_RESOURCES_PATH + "/scripts/configure_cron_scripts.py", shell=True)
+    startup_trace.add_event("run-workspace", workspace_start, startup_trace.now())
+    try:
+        log.info(startup_trace.write_startup_profile())
+    except Exception:
+        log.warning("Failed to write startup profile.", exc_info=True)
 
-log.info("Configure and run custom scripts")
-call("python " + ENV_RESOURCES_PATH + "/scripts/run_custom_scripts.py", shell=True)
 
-if ENV_OPENP2P_TOKEN:
-    log.info("Configure and run openp2p scripts")
-    call(ENV_RESOURCES_PATH + "/tools/openp2p.sh --token="+ENV_OPENP2P_TOKEN+"&", shell=True)
+startup_futures = run_startup_steps(STARTUP_STEPS)
+for step_name, (_, _, required) in STARTUP_STEPS.items():
+    if required:
+        startup_futures[step_name].exception()
 
-startup_custom_script = os.path.join(WORKSPACE_HOME, "on_startup.sh")
-if os.path.exists(startup_custom_script):
-    log.info("Run on_startup.sh user script from workspace folder")
-    # run startup script from workspace folder - can be used to run installation routines on workspace updates
-    call("/bin/bash " + startup_custom_script, shell=True)
+supervisor_start = startup_trace.now()
+readiness_thread = threading.Thread(target=trace_service_readiness, args=(supervisor_start,))
+readiness_thread.daemon = True
+readiness_thread.start()
 
 # Run supervisor process - main container process
 call('supervisord -n -c /etc/supervisor/supervisord.conf', shell=True)
@@ -0,0 +1,115 @@
+"""
+Startup trace utilities
+
+Collects timing events of the workspace startup from multiple processes
+(docker-entrypoint, run_workspace, configuration steps, supervisor programs)
+and writes them as Chrome trace-event JSON (chrome://tracing or https://ui.perfetto.dev).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+HOME = os.getenv("HOME", "/root")
+
+# events of all startup processes are appended to this file (one json event per line)
+TRACE_EVENTS_FILE = "/tmp/workspace-startup-trace.jsonl"
+STARTUP_PROFILE_FILE = os.path.join(HOME, ".workspace", "startup-profile.json")
+
+_write_lock = threading.Lock()
+
+
+def now() -> float:
+    return time.time()
+
+
+def reset_trace() -> None:
+    """Remove all events of a previous startup."""
+    with _write_lock:
+        with open(TRACE_EVENTS_FILE, "w"):
+            pass
+
+
+def add_event(name: str, start: float, end: float, category: str = "startup", args: dict = None) -> None:
+    """Add a completed span. Start and end are unix timestamps in seconds."""
+    event = {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": int(start * 1000000),
+        "dur": int(max(end - start, 0) * 1000000),
+        "pid": os.getpid(),
+        "tid": threading.get_native_id(),
+    }
+    if args:
+        event["args"] = args
+
+    try:
+        with _write_lock:
+            with open(TRACE_EVENTS_FILE, "a") as f:
+                f.write(json.dumps(event) + "\n")
+    except Exception:
+        # tracing should never break the startup
+        pass
+
+
+@contextmanager
+def trace(name: str, category: str = "startup", args: dict = None):
+    start = now()
+    try:
+        yield
+    finally:
+        add_event(name, start, now(), category=category, args=args)
+
+
+def load_events() -> list:
+    events = []
+    if not os.path.isfile(TRACE_EVENTS_FILE):
+        return events
+
+    with open(TRACE_EVENTS_FILE, "r") as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events
+
+
+def write_startup_profile(profile_file: str = STARTUP_PROFILE_FILE) -> str:
+    """Write all collected events as Chrome trace JSON and return a one-line summary."""
+    events = sorted(load_events(), key=lambda event: event["ts"])
+    if not events:
+        return "No startup events recorded."
+
+    trace_start = events[0]["ts"]
+    trace_end = max(event["ts"] + event["dur"] for event in events)
+
+    profile_folder = os.path.dirname(profile_file)
+    if not os.path.exists(profile_folder):
+        os.makedirs(profile_folder)
+
+    with open(profile_file, "w") as f:
+        json.dump(
+            {
+                "traceEvents": events,
+                "displayTimeUnit": "ms",
+                "otherData": {"workspace_version": os.getenv("WORKSPACE_VERSION", "unknown")},
+            },
+            f,
+        )
+
+    # summarize with the end of each event relative to the first event
+    steps = [
+        event["name"] + "=" + str(round((event["ts"] + event["dur"] - trace_start) / 1000000, 1)) + "s"
+        for event in events
+    ]
+    return (
+        "Startup finished in "
+        + str(round((trace_end - trace_start) / 1000000, 1))
+        + "s ("
+        + ", ".join(steps)
+        + ")"
+    )
@@ -0,0 +1,182 @@
+"""
+Thread count calibration
+
+Runs a short NumPy matmul and memory bandwidth benchmark for a few candidate
+thread counts and selects the fastest one. The result is cached per CPU model
+and available CPU resources, so the benchmark only runs on the first start.
+Activated via MAX_NUM_THREADS=calibrate (see docker-entrypoint.py).
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+from typing import Optional
+
+import resource_topology
+
+log = logging.getLogger(__name__)
+
+HOME = os.getenv("HOME", "/root")
+CALIBRATION_CACHE_FILE = os.path.join(HOME, ".workspace", "thread-calibration.json")
+
+# Environment variables that control the thread pools of the benchmarked libraries
+BENCHMARK_THREAD_VARIABLES = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+]
+
+# Prints the matmul and memory bandwidth time in seconds (best of three runs)
+BENCHMARK_CODE = """
+import time
+import numpy as np
+
+def best_time(function, repeats=3):
+    function()  # warmup
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+a = np.random.rand(1024, 1024)
+b = np.random.rand(1024, 1024)
+matmul_time = best_time(lambda: a @ b)
+
+try:
+    import numexpr
+    x = np.random.rand(16 * 1024 * 1024)
+    y = np.random.rand(16 * 1024 * 1024)
+    bandwidth_time = best_time(lambda: numexpr.evaluate("x * 2.0 + y"))
+except ImportError:
+    bandwidth_time = 0.0
+
+print(matmul_time, bandwidth_time)
+"""
+
+BENCHMARK_TIMEOUT = 60  # seconds per candidate
+
+
+def get_cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", "r") as file:
+            for line in file:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except Exception:
+        pass
+    return "unknown"
+
+
+def get_calibration_key(topology: dict) -> str:
+    return "{} | cpus={} | quota={}".format(
+        get_cpu_model(), len(topology["cpuset"]), topology["cpu_quota"]
+    )
+
+
+def get_candidate_thread_counts(topology: dict) -> list:
+    """Thread counts to benchmark: the default heuristic, half of it (e.g. physical cores with SMT), and the full cpu count."""
+    default_threads = resource_topology.get_max_num_threads(topology)
+    candidates = {
+        default_threads,
+        max(1, default_threads // 2),
+        max(1, default_threads // 4),
+        max(1, min(int(topology["available_cpus"] or 1), 32)),
+    }
+    return sorted(candidates)
+
+
+def run_benchmark(num_threads: int) -> Optional[tuple]:
+    env = os.environ.copy()
+    for variable in BENCHMARK_THREAD_VARIABLES:
+        env[variable] = str(num_threads)
+
+    try:
+        output = subprocess.check_output(
+            [sys.executable, "-c", BENCHMARK_CODE],
+            env=env,
+            timeout=BENCHMARK_TIMEOUT,
+            stderr=subprocess.DEVNULL,
+        )
+        matmul_time, bandwidth_time = output.decode("utf-8").split()
+        return float(matmul_time), float(bandwidth_time)
+    except Exception as ex:
+        log.warning("Thread calibration benchmark failed for " + str(num_threads) + " threads: " + str(ex))
+        return None
+
+
+def load_calibration_cache() -> dict:
+    if os.path.isfile(CALIBRATION_CACHE_FILE):
+        try:
+            with open(CALIBRATION_CACHE_FILE, "r") as file:
+                return json.load(file)
+        except Exception:
+            pass
+    return {}
+
+
+def save_calibration_cache(calibration_cache: dict) -> None:
+    cache_folder = os.path.dirname(CALIBRATION_CACHE_FILE)
+    if not os.path.exists(cache_folder):
+        os.makedirs(cache_folder)
+
+    with open(CALIBRATION_CACHE_FILE, "w") as file:
+        json.dump(calibration_cache, file, indent=4)
+
+
+def calibrate_num_threads(topology: dict) -> int:
+    """Return the fastest thread count for this machine, runs the benchmark only if no cached result exists."""
+    calibration_key = get_calibration_key(topology)
+    calibration_cache = load_calibration_cache()
+    if calibration_key in calibration_cache:
+        return int(calibration_cache[calibration_key]["num_threads"])
+
+    candidates = get_candidate_thread_counts(topology)
+    if len(candidates) == 1:
+        # nothing to compare (e.g. single cpu)
+        return candidates[0]
+
+    log.info("Calibrating number of threads. Candidates: " + str(candidates))
+
+    results = {}
+    for num_threads in candidates:
+        result = run_benchmark(num_threads)
+        if result:
+            results[num_threads] = result
+
+    if not results:
+        # benchmark not possible (e.g. numpy not installed) -> use heuristic
+        return resource_topology.get_max_num_threads(topology)
+
+    # score relative to the best time of each benchmark -> both benchmarks are weighted equally
+    best_matmul_time = min(result[0] for result in results.values())
+    best_bandwidth_time = min(result[1] for result in results.values())
+
+    def score(num_threads: int) -> float:
+        matmul_time, bandwidth_time = results[num_threads]
+        relative_time = matmul_time / best_matmul_time
+        if best_bandwidth_time > 0:
+            relative_time += bandwidth_time / best_bandwidth_time
+        return relative_time
+
+    best_num_threads = min(results, key=score)
+    log.info(
+        "Calibrated number of threads: " + str(best_num_threads)
+        + " (matmul, bandwidth in seconds: " + str(results) + ")"
+    )
+
+    calibration_cache[calibration_key] = {
+        "num_threads": best_num_threads,
+        "results": {str(num_threads): result for num_threads, result in results.items()},
+    }
+    try:
+        save_calibration_cache(calibration_cache)
+    except Exception:
+        log.warning("Failed to cache thread calibration.", exc_info=True)
+
+    return best_num_threads
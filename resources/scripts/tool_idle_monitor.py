@@ -0,0 +1,154 @@
+#!/usr/bin/python
+
+"""
+Stop proxied tools that have not been accessed for a configurable time.
+Stopped tools are started again on the next access (see nginx.conf).
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+import urllib.request
+import xmlrpc.client
+
+import psutil
+
+# Enable logging
+logging.basicConfig(
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    level=logging.INFO,
+    stream=sys.stdout)
+
+log = logging.getLogger(__name__)
+
+# Tool name (as in /tools/<tool>/) -> supervisor programs of the tool
+TOOL_PROGRAMS = {
+    "vnc": ["vncserver", "novnc"],
+    "vscode": ["vscode"],
+    "netdata": ["netdata"],
+    "ungit": ["ungit"],
+    "glances": ["glances"],
+}
+
+TOOL_ACTIVITY_URL = "http://127.0.0.1:8093/tool-activity"
+TOOL_STATUS_URL = "http://127.0.0.1:8093/tool-status"
+SUPERVISOR_RPC_URL = "http://127.0.0.1:8059/RPC2"
+CHECK_INTERVAL = 60  # seconds
+
+TOOLS_IDLE_TIMEOUT = os.getenv("TOOLS_IDLE_TIMEOUT", "false")
+
+
+def get_tool_activity() -> dict:
+    """Return the last access timestamp and the number of open connections per tool from nginx."""
+    with urllib.request.urlopen(TOOL_ACTIVITY_URL, timeout=5) as response:
+        activity = json.loads(response.read().decode("utf-8"))
+
+    tool_activity = {}
+    for key, value in activity.items():
+        metric, tool = key.split(":", 1)
+        tool_activity.setdefault(tool, {})[metric] = value
+    return tool_activity
+
+
+def invalidate_tool_status(tool: str) -> None:
+    """Remove the cached reachability of the tool in nginx, the next access starts the tool again."""
+    request = urllib.request.Request(TOOL_STATUS_URL + "?tool=" + tool, method="DELETE")
+    with urllib.request.urlopen(request, timeout=5):
+        pass
+
+
+def get_memory_usage(pid: int) -> int:
+    """Resident memory of a process including all of its child processes in bytes."""
+    try:
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+    except psutil.Error:
+        return 0
+
+    memory = 0
+    for process in processes:
+        try:
+            memory += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return memory
+
+
+def stop_idle_tools(supervisor, idle_timeout: int) -> int:
+    """Stop all running tools that are idle for longer than the timeout and return the reclaimed memory in bytes."""
+    tool_activity = get_tool_activity()
+    process_infos = {info["name"]: info for info in supervisor.supervisor.getAllProcessInfo()}
+    reclaimed_memory = 0
+
+    for tool, programs in TOOL_PROGRAMS.items():
+        running_programs = [
+            program for program in programs
+            if program in process_infos and process_infos[program]["statename"] == "RUNNING"
+        ]
+        if not running_programs:
+            continue
+
+        activity = tool_activity.get(tool, {})
+        if activity.get("connections", 0) > 0:
+            # tool has open connections (e.g. websocket of an open browser tab)
+            continue
+
+        # tools that were never accessed are idle since they got started
+        last_access = activity.get("last_access") or max(
+            process_infos[program]["start"] for program in running_programs
+        )
+        idle_time = time.time() - last_access
+        if idle_time < idle_timeout:
+            continue
+
+        tool_memory = 0
+        for program in running_programs:
+            tool_memory += get_memory_usage(process_infos[program]["pid"])
+            try:
+                supervisor.supervisor.stopProcess(program)
+            except xmlrpc.client.Fault as ex:
+                log.warning("Failed to stop " + program + ": " + str(ex))
+
+        try:
+            invalidate_tool_status(tool)
+        except Exception as ex:
+            log.warning("Failed to invalidate the status of " + tool + " in nginx: " + str(ex))
+
+        reclaimed_memory += tool_memory
+        log.info(
+            "Stopped " + tool + " after " + str(int(idle_time)) + "s of inactivity. Reclaimed "
+            + str(round(tool_memory / 1024 / 1024)) + " MB of memory."
+        )
+    return reclaimed_memory
+
+
+if __name__ == "__main__":
+    if not TOOLS_IDLE_TIMEOUT or TOOLS_IDLE_TIMEOUT.lower().strip() == "false":
+        log.info("Tool idle monitor is not activated.")
+        sys.exit()
+
+    try:
+        idle_timeout = int(TOOLS_IDLE_TIMEOUT)
+    except ValueError:
+        idle_timeout = 3600  # default is one hour
+
+    log.info("Stopping tools after " + str(idle_timeout) + "s of inactivity.")
+
+    supervisor = xmlrpc.client.ServerProxy(SUPERVISOR_RPC_URL)
+    total_reclaimed_memory = 0
+    while True:
+        time.sleep(CHECK_INTERVAL)
+        try:
+            reclaimed_memory = stop_idle_tools(supervisor, idle_timeout)
+        except Exception:
+            log.warning("Failed to check tool activity.", exc_info=True)
+            continue
+
+        if reclaimed_memory:
+            total_reclaimed_memory += reclaimed_memory
+            log.info(
+                "Reclaimed " + str(round(total_reclaimed_memory / 1024 / 1024))
+                + " MB of memory from idle tools since workspace start."
+            )
@@ -0,0 +1,104 @@
+import importlib.util
+import os
+import stat
+import sys
+
+import pytest
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "backup_restore_config.py")
+
+
+@pytest.fixture
+def backup(tmp_path, monkeypatch):
+    """Backup script with the user home in a tmp dir (loaded in list mode, which only reads the store)."""
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("CONFIG_BACKUP_ENABLED", "true")
+    monkeypatch.setattr(sys, "argv", ["backup_restore_config.py", "list"])
+    spec = importlib.util.spec_from_file_location("backup_restore_config", SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    _write(module, ".gitconfig", "[user]\n\tname = test\n")
+    _write(module, ".ssh/id_rsa", "private key")
+    _write(module, ".jupyter/jupyter_notebook_config.json", "{}")
+    return module
+
+
+def _write(backup, path: str, content: str) -> None:
+    os_path = os.path.join(backup.USER_HOME, path)
+    os.makedirs(os.path.dirname(os_path), exist_ok=True)
+    with open(os_path, "w") as file:
+        file.write(content)
+
+
+def _read(backup, path: str) -> str:
+    with open(os.path.join(backup.USER_HOME, path), "r") as file:
+        return file.read()
+
+
+def _list_objects(backup) -> set:
+    return {
+        object_name
+        for prefix in os.listdir(backup.OBJECTS_FOLDER)
+        for object_name in os.listdir(os.path.join(backup.OBJECTS_FOLDER, prefix))
+    }
+
+
+class TestSnapshots:
+    def test_snapshot_and_restore(self, backup):
+        snapshot_id = backup.create_snapshot()
+        assert backup.list_snapshots() == [snapshot_id]
+
+        _write(backup, ".gitconfig", "changed")
+        os.remove(os.path.join(backup.USER_HOME, ".ssh/id_rsa"))
+        backup.restore_snapshot(snapshot_id)
+        assert _read(backup, ".gitconfig") == "[user]\n\tname = test\n"
+        assert _read(backup, ".ssh/id_rsa") == "private key"
+
+    def test_store_is_private(self, backup):
+        backup.create_snapshot()
+        for dirname, _, files in os.walk(backup.CONFIG_BACKUP_FOLDER):
+            assert stat.S_IMODE(os.stat(dirname).st_mode) == backup.STORE_FOLDER_MODE
+            for file_name in files:
+                assert stat.S_IMODE(os.stat(os.path.join(dirname, file_name)).st_mode) == backup.STORE_FILE_MODE
+
+    def test_unchanged_configuration(self, backup):
+        backup.create_snapshot()
+        assert backup.create_snapshot() is None
+        assert backup.create_snapshot(changed_paths={".gitconfig"}) is None
+
+    def test_incremental_snapshot_only_scans_changed_paths(self, backup):
+        first_snapshot = backup.load_snapshot(backup.create_snapshot())
+
+        _write(backup, ".gitconfig", "changed")
+        # not reported as changed -> not scanned, the previous entry is kept
+        _write(backup, ".ssh/id_rsa", "other key")
+        os.remove(os.path.join(backup.USER_HOME, ".jupyter/jupyter_notebook_config.json"))
+        snapshot = backup.load_snapshot(
+            backup.create_snapshot(changed_paths={".gitconfig", ".jupyter/jupyter_notebook_config.json"})
+        )
+
+        assert snapshot["files"][".gitconfig"]["hash"] != first_snapshot["files"][".gitconfig"]["hash"]
+        assert snapshot["files"][".ssh/id_rsa"] == first_snapshot["files"][".ssh/id_rsa"]
+        assert ".jupyter/jupyter_notebook_config.json" not in snapshot["files"]
+        assert snapshot["folders"] == first_snapshot["folders"]
+
+    def test_prune_snapshots(self, backup, monkeypatch):
+        monkeypatch.setattr(backup, "SNAPSHOT_RETENTION", 1)
+        monkeypatch.setattr(backup, "DAILY_SNAPSHOT_RETENTION_DAYS", 2)
+        snapshot_ids = ["20240101-120000", "20240101-130000", "20240102-120000", "20240103-120000", "20240103-130000"]
+        for index, snapshot_id in enumerate(snapshot_ids):
+            monkeypatch.setattr(backup.time, "strftime", lambda *args: snapshot_id)
+            _write(backup, ".gitconfig", "version " + str(index))
+            backup.create_snapshot()
+
+        # latest snapshot and the last snapshot of the last two days
+        assert backup.list_snapshots() == ["20240102-120000", "20240103-130000"]
+        used_objects = {
+            file_info["hash"]
+            for snapshot_id in backup.list_snapshots()
+            for file_info in backup.load_snapshot(snapshot_id)["files"].values()
+        }
+        assert _list_objects(backup) == used_objects
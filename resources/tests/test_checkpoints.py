@@ -0,0 +1,135 @@
+import os
+import random
+
+import pytest
+from notebook.services.contents.filemanager import FileContentsManager
+
+from jupyter_tooling import checkpoints
+
+
+def _text_data(line_count: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    return b"".join(b"line %d %x\n" % (line, rng.getrandbits(128)) for line in range(line_count))
+
+
+def _list_chunks(root_dir) -> set:
+    chunks_folder = os.path.join(str(root_dir), "chunks")
+    if not os.path.isdir(chunks_folder):
+        return set()
+    return {
+        chunk_hash
+        for prefix in os.listdir(chunks_folder)
+        for chunk_hash in os.listdir(os.path.join(chunks_folder, prefix))
+    }
+
+
+def _referenced_chunks(store, *paths) -> set:
+    return {
+        chunk_hash
+        for path in paths
+        for checkpoint in store._load_index(path)["checkpoints"]
+        for chunk_hash in checkpoint["chunks"]
+    }
+
+
+@pytest.fixture
+def contents_manager(tmp_path):
+    root_dir = tmp_path / "workspace"
+    root_dir.mkdir()
+    return FileContentsManager(root_dir=str(root_dir))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return checkpoints.CompressedCheckpoints(root_dir=str(tmp_path / "checkpoints"), retention=3)
+
+
+def _write(contents_manager, path: str, data: bytes) -> None:
+    with open(contents_manager._get_os_path(path), "wb") as file:
+        file.write(data)
+
+
+class TestChunking:
+    def test_chunks_are_cut_at_lines(self):
+        data = _text_data(100000)
+        chunks = checkpoints.split_chunks(data)
+        assert b"".join(chunks) == data
+        assert len(chunks) > 1
+        assert all(chunk.endswith(b"\n") for chunk in chunks)
+        assert all(len(chunk) >= checkpoints.MIN_CHUNK_SIZE for chunk in chunks[:-1])
+
+    def test_edit_only_changes_nearby_chunks(self):
+        lines = _text_data(100000).splitlines(keepends=True)
+        chunks = checkpoints.split_chunks(b"".join(lines))
+        lines[50000] = b"changed line\n"
+        changed_chunks = checkpoints.split_chunks(b"".join(lines))
+        assert len(set(changed_chunks) - set(chunks)) <= 2
+
+
+class TestCompressedCheckpoints:
+    def test_restore_checkpoint(self, contents_manager, store):
+        data = _text_data(20000)
+        _write(contents_manager, "file.txt", data)
+        checkpoint = store.create_checkpoint(contents_manager, "file.txt")
+
+        _write(contents_manager, "file.txt", b"changed")
+        store.restore_checkpoint(contents_manager, checkpoint["id"], "file.txt")
+        with open(contents_manager._get_os_path("file.txt"), "rb") as file:
+            assert file.read() == data
+        assert [model["id"] for model in store.list_checkpoints("file.txt")] == [checkpoint["id"]]
+
+    def test_versions_share_chunks(self, contents_manager, store):
+        lines = _text_data(100000).splitlines(keepends=True)
+        _write(contents_manager, "file.txt", b"".join(lines))
+        store.create_checkpoint(contents_manager, "file.txt")
+        first_version_chunks = _list_chunks(store.root_dir)
+
+        lines[50000] = b"changed line\n"
+        _write(contents_manager, "file.txt", b"".join(lines))
+        store.create_checkpoint(contents_manager, "file.txt")
+        assert len(_list_chunks(store.root_dir) - first_version_chunks) <= 2
+
+    def test_retention(self, contents_manager, store):
+        checkpoint_ids = []
+        for version in range(5):
+            _write(contents_manager, "file.txt", _text_data(10000, seed=version))
+            checkpoint_ids.append(store.create_checkpoint(contents_manager, "file.txt")["id"])
+
+        assert [model["id"] for model in store.list_checkpoints("file.txt")] == checkpoint_ids[-store.retention:]
+        # chunks of the removed versions are deleted
+        assert _list_chunks(store.root_dir) == _referenced_chunks(store, "file.txt")
+
+    def test_shared_chunks_are_kept_until_last_reference_is_deleted(self, contents_manager, store):
+        data = _text_data(50000)
+        _write(contents_manager, "first.txt", data)
+        _write(contents_manager, "second.txt", data)
+        first_checkpoint = store.create_checkpoint(contents_manager, "first.txt")
+        second_checkpoint = store.create_checkpoint(contents_manager, "second.txt")
+        shared_chunks = _list_chunks(store.root_dir)
+        assert all(store._chunk_references[chunk_hash] == 2 for chunk_hash in shared_chunks)
+
+        store.delete_checkpoint(first_checkpoint["id"], "first.txt")
+        assert _list_chunks(store.root_dir) == shared_chunks
+        assert all(store._chunk_references[chunk_hash] == 1 for chunk_hash in shared_chunks)
+        assert store._read_checkpoint(second_checkpoint["id"], "second.txt") == data
+
+        store.delete_checkpoint(second_checkpoint["id"], "second.txt")
+        assert _list_chunks(store.root_dir) == set()
+        assert not store._chunk_references
+
+    def test_sweep_removes_unreferenced_chunks(self, contents_manager, store):
+        _write(contents_manager, "file.txt", _text_data(10000))
+        store.create_checkpoint(contents_manager, "file.txt")
+        referenced_chunks = _list_chunks(store.root_dir)
+
+        # e.g. chunk of an interrupted save
+        stray_chunk = store._chunk_path("ff" + "0" * 62)
+        os.makedirs(os.path.dirname(stray_chunk), exist_ok=True)
+        open(stray_chunk, "wb").close()
+
+        # a new instance (server restart) rebuilds the references on the first write
+        restarted_store = checkpoints.CompressedCheckpoints(root_dir=store.root_dir, retention=store.retention)
+        _write(contents_manager, "other.txt", b"other")
+        restarted_store.create_checkpoint(contents_manager, "other.txt")
+        assert referenced_chunks < _list_chunks(store.root_dir)
+        assert not os.path.exists(stray_chunk)
@@ -0,0 +1,59 @@
+import os
+
+import nbformat
+import pytest
+from nbconvert import HTMLExporter
+
+from jupyter_tooling import contents_manager
+
+LARGE_OUTPUT = "large output line\n" * 20000
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    lazy_outputs_folder = tmp_path / "lazy-outputs"
+    monkeypatch.setattr(contents_manager, "LAZY_OUTPUTS_FOLDER", str(lazy_outputs_folder))
+    monkeypatch.setattr(contents_manager, "LAZY_OUTPUT_REFERENCES_FOLDER", str(lazy_outputs_folder / "references"))
+
+    root_dir = tmp_path / "workspace"
+    root_dir.mkdir()
+    manager = contents_manager.WorkspaceContentsManager(root_dir=str(root_dir), lazy_notebook_size=1024)
+
+    notebook = nbformat.v4.new_notebook()
+    notebook.cells.append(
+        nbformat.v4.new_code_cell(
+            "print('large output')",
+            outputs=[nbformat.v4.new_output("stream", name="stdout", text=LARGE_OUTPUT)],
+        )
+    )
+    nbformat.write(notebook, os.path.join(str(root_dir), "large.ipynb"))
+    return manager
+
+
+def _get_stream_text(model: dict) -> str:
+    output = model["content"]["cells"][0]["outputs"][0]
+    return output.get("text") or output["data"]["text/plain"]
+
+
+class TestLazyNotebookOutputs:
+    def test_editor_gets_stripped_notebook(self, manager):
+        model = manager.get_lazy_notebook("large.ipynb")
+        assert _get_stream_text(model) != LARGE_OUTPUT
+        assert "not loaded" in _get_stream_text(model)
+
+    def test_export_contains_full_outputs(self, manager):
+        # the editor opened the notebook before -> stripped notebook is cached
+        manager.get_lazy_notebook("large.ipynb")
+
+        # same call as the nbconvert handler (Download as HTML/PDF)
+        model = manager.get(path="large.ipynb")
+        assert _get_stream_text(model) == LARGE_OUTPUT
+
+        html, _ = HTMLExporter().from_notebook_node(model["content"])
+        assert html.count("large output line") == 20000
+        assert "not loaded" not in html
+
+    def test_save_restores_outputs(self, manager):
+        model = manager.get_lazy_notebook("large.ipynb")
+        manager.save(model, "large.ipynb")
+        assert _get_stream_text(manager.get("large.ipynb")) == LARGE_OUTPUT
@@ -0,0 +1,71 @@
+import importlib.util
+import os
+import random
+
+import pytest
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "process_leak_watchdog.py")
+
+MB = 1024 * 1024
+
+
+@pytest.fixture(scope="module")
+def watchdog():
+    spec = importlib.util.spec_from_file_location("process_leak_watchdog", SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestMemoryTrend:
+    def test_linear_growth(self, watchdog):
+        # 50 MB per hour, sampled every 30 seconds
+        samples = [(time, 200 * MB + time * 50 * MB / 3600) for time in range(0, 1800, 30)]
+        slope, fit = watchdog.get_memory_trend(samples)
+        assert slope == pytest.approx(50 * MB / 3600)
+        assert fit == pytest.approx(1.0)
+
+    def test_noisy_growth(self, watchdog):
+        rng = random.Random(0)
+        samples = [(time, 200 * MB + time * 100 * MB / 3600 + rng.uniform(-MB, MB)) for time in range(0, 1800, 30)]
+        slope, fit = watchdog.get_memory_trend(samples)
+        assert slope == pytest.approx(100 * MB / 3600, rel=0.05)
+        assert fit > watchdog.MIN_TREND_FIT
+
+    def test_fluctuating_memory_is_no_trend(self, watchdog):
+        # e.g. a cache that is filled and cleared regularly
+        samples = [(time, 200 * MB + (50 * MB if (time // 300) % 2 else 0)) for time in range(0, 1800, 30)]
+        _, fit = watchdog.get_memory_trend(samples)
+        assert fit < watchdog.MIN_TREND_FIT
+
+    def test_constant_memory(self, watchdog):
+        samples = [(time, 200 * MB) for time in range(0, 1800, 30)]
+        assert watchdog.get_memory_trend(samples) == (0.0, 0.0)
+
+
+class TestParseWatchedProcesses:
+    def test_default_configuration(self, watchdog):
+        watched_processes = watchdog.parse_watched_processes(
+            "xfdesktop=kill:250,xfsettingsd=kill:250,xfce4-panel=restart:250"
+        )
+        assert [
+            (watched_process.pattern.pattern, watched_process.action, watched_process.max_memory)
+            for watched_process in watched_processes
+        ] == [("xfdesktop", "kill", 250 * MB), ("xfsettingsd", "kill", 250 * MB), ("xfce4-panel", "restart", 250 * MB)]
+
+    def test_actions(self, watchdog):
+        watched_processes = watchdog.parse_watched_processes(
+            "cmd:code-server.*--port=restart, xfdesktop , filebrowser=supervisor:filebrowser:500, ,"
+        )
+        assert len(watched_processes) == 3
+
+        code_server, xfdesktop, filebrowser = watched_processes
+        assert code_server.match_cmdline
+        assert code_server.pattern.search("/usr/bin/code-server --port=8054")
+        assert (code_server.action, code_server.max_memory) == ("restart", None)
+
+        assert not xfdesktop.match_cmdline
+        assert (xfdesktop.action, xfdesktop.max_memory) == ("kill", None)
+
+        # the action can contain ":" as well
+        assert (filebrowser.action, filebrowser.max_memory) == ("supervisor:filebrowser", 500 * MB)
@@ -76,6 +76,19 @@ class TestTooling:
         assert result.status_code == 200
         assert "Microsoft Corporation" in result.text
 
+    def test_startup_profile(self):
+        # the profile is written after all programs are ready (or after the 300 second readiness timeout)
+        timeout = time.time() + 330
+        while True:
+            result = requests.get(
+                f"http://{workspace_host}:{workspace_port}/tooling/startup-profile"
+            )
+            if result.status_code != 404 or time.time() > timeout:
+                break
+            time.sleep(5)
+        assert result.status_code == 200
+        assert "traceEvents" in result.json()
+
     def test_ssh(self, ssh_connection: str):
 
         completed_process = run(
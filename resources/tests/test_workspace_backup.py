@@ -0,0 +1,120 @@
+import hashlib
+import io
+import os
+import random
+
+import pytest
+
+from jupyter_tooling import workspace_backup
+
+
+def _random_bytes(size: int, seed: int = 0) -> bytes:
+    return random.Random(seed).getrandbits(size * 8).to_bytes(size, "little")
+
+
+class TestChunking:
+    def test_file_without_newlines_is_split(self):
+        data = bytes(64 * 1024 * 1024)
+        chunks = list(workspace_backup.iter_chunks(io.BytesIO(data)))
+        assert b"".join(chunks) == data
+        assert max(len(chunk) for chunk in chunks) == workspace_backup.MAX_CHUNK_SIZE
+        assert len(chunks) == 16
+
+    def test_chunk_sizes(self):
+        data = _random_bytes(12 * 1024 * 1024)
+        chunks = list(workspace_backup.iter_chunks(io.BytesIO(data)))
+        assert b"".join(chunks) == data
+        assert all(len(chunk) <= workspace_backup.MAX_CHUNK_SIZE for chunk in chunks)
+        assert all(len(chunk) >= workspace_backup.MIN_CHUNK_SIZE for chunk in chunks[:-1])
+
+    def test_chunks_do_not_depend_on_read_blocks(self, monkeypatch):
+        data = _random_bytes(10 * 1024 * 1024)
+        chunks = list(workspace_backup.iter_chunks(io.BytesIO(data)))
+        monkeypatch.setattr(workspace_backup, "READ_BLOCK_SIZE", 1024 * 1024 + 17)
+        assert list(workspace_backup.iter_chunks(io.BytesIO(data))) == chunks
+
+    def test_insert_only_changes_nearby_chunks(self):
+        data = _random_bytes(12 * 1024 * 1024)
+        changed_data = data[:5000000] + b"inserted" + data[5000000:]
+        chunks = list(workspace_backup.iter_chunks(io.BytesIO(data)))
+        changed_chunks = list(workspace_backup.iter_chunks(io.BytesIO(changed_data)))
+        assert len(set(changed_chunks) - set(chunks)) <= 2
+
+    def test_python_boundaries_match_numpy(self):
+        pytest.importorskip("numpy")
+        data = _random_bytes(3 * 1024 * 1024, seed=1)
+        assert workspace_backup._find_boundaries_python(data) == workspace_backup._find_boundaries_numpy(data)
+
+
+class FailingTarget(workspace_backup.DirectoryTarget):
+    """Directory target whose connection is lost on the upload of a chunk."""
+
+    def __init__(self, path: str, failing_chunk_hash: str):
+        super().__init__(path)
+        self.failing_chunk_key = workspace_backup.get_chunk_key(failing_chunk_hash)
+
+    def upload(self, key: str, data: bytes) -> None:
+        if key == self.failing_chunk_key:
+            raise ConnectionError("Connection lost")
+        super().upload(key, data)
+
+
+class TestBackup:
+    @pytest.fixture
+    def workspace(self, tmp_path):
+        workspace = tmp_path / "workspace"
+        (workspace / "data").mkdir(parents=True)
+        # files of the root folder are backed up before the files of subfolders
+        (workspace / "first.bin").write_bytes(_random_bytes(2 * 1024 * 1024, seed=1))
+        (workspace / "data" / "second.bin").write_bytes(_random_bytes(2 * 1024 * 1024, seed=2))
+        os.symlink("data/second.bin", str(workspace / "link.bin"))
+        return workspace
+
+    def test_backup_and_restore(self, tmp_path, workspace):
+        target = workspace_backup.DirectoryTarget(str(tmp_path / "target"))
+        backup_id = workspace_backup.backup_workspace(target, str(workspace))
+        assert workspace_backup.list_backups(target) == ([backup_id], [])
+
+        restored = tmp_path / "restored"
+        workspace_backup.restore_workspace(target, folder_path=str(restored))
+        assert (restored / "first.bin").read_bytes() == (workspace / "first.bin").read_bytes()
+        assert (restored / "data" / "second.bin").read_bytes() == (workspace / "data" / "second.bin").read_bytes()
+        assert os.readlink(str(restored / "link.bin")) == "data/second.bin"
+
+    def test_interrupted_backup_is_resumed(self, tmp_path, workspace, monkeypatch):
+        # the manifest is uploaded after every file
+        monkeypatch.setattr(workspace_backup, "MANIFEST_INTERVAL", -1)
+        second_file = io.BytesIO((workspace / "data" / "second.bin").read_bytes())
+        second_file_chunk = next(workspace_backup.iter_chunks(second_file))
+        failing_target = FailingTarget(str(tmp_path / "target"), hashlib.sha256(second_file_chunk).hexdigest())
+        with pytest.raises(ConnectionError):
+            workspace_backup.backup_workspace(failing_target, str(workspace))
+
+        target = workspace_backup.DirectoryTarget(str(tmp_path / "target"))
+        complete_backups, partial_backups = workspace_backup.list_backups(target)
+        assert complete_backups == [] and len(partial_backups) == 1
+        partial_manifest = workspace_backup.download_manifest(
+            target, workspace_backup.get_manifest_key(partial_backups[0], partial=True)
+        )
+        assert "first.bin" in partial_manifest["files"]
+        assert "data/second.bin" not in partial_manifest["files"]
+
+        read_files = []
+        iter_chunks = workspace_backup.iter_chunks
+
+        def track_iter_chunks(file):
+            read_files.append(os.path.relpath(file.name, str(workspace)))
+            return iter_chunks(file)
+
+        monkeypatch.setattr(workspace_backup, "iter_chunks", track_iter_chunks)
+        backup_id = workspace_backup.backup_workspace(target, str(workspace))
+
+        # the resumed backup keeps its id, only the files that were not backed up before are read
+        assert backup_id == partial_backups[0]
+        assert read_files == ["data/second.bin"]
+        assert workspace_backup.list_backups(target) == ([backup_id], [])
+
+        restored = tmp_path / "restored"
+        workspace_backup.restore_workspace(target, folder_path=str(restored))
+        assert (restored / "first.bin").read_bytes() == (workspace / "first.bin").read_bytes()
+        assert (restored / "data" / "second.bin").read_bytes() == (workspace / "data" / "second.bin").read_bytes()